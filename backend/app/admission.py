@@ -0,0 +1,198 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, status
+from app.auth import get_current_active_user
+from app.config import settings
+from app.metrics import registry, Counter, Gauge
+
+admission_rejected = registry.register(Counter(
+    "admission_rejected_total", "Requests shed by admission control", ("route_class", "reason")))
+admission_in_flight = registry.register(Gauge(
+    "admission_in_flight", "Admitted requests currently running", ("route_class",)))
+admission_waiting = registry.register(Gauge(
+    "admission_waiting", "Requests waiting for an admission slot", ("route_class",)))
+vote_rate_limited = registry.register(Counter(
+    "vote_rate_limited_total", "Vote requests rejected by the per-user token bucket"))
+
+
+class Overloaded(Exception):
+    """Raised when a route class has no free slot and its wait queue is full or timed out"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """At most `limit` concurrent holders, at most `queue` waiters for `timeout` seconds"""
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._released = asyncio.Condition()
+
+    async def acquire(self):
+        if self.active >= self.limit:
+            if self.waiting >= self.queue:
+                admission_rejected.inc(self.name, "queue_full")
+                raise Overloaded("queue_full")
+            self.waiting += 1
+            admission_waiting.inc(self.name)
+            try:
+                async with self._released:
+                    await asyncio.wait_for(
+                        self._released.wait_for(lambda: self.active < self.limit), self.timeout)
+            except asyncio.TimeoutError:
+                admission_rejected.inc(self.name, "timeout")
+                raise Overloaded("timeout")
+            finally:
+                self.waiting -= 1
+                admission_waiting.dec(self.name)
+        self.active += 1
+        admission_in_flight.inc(self.name)
+
+    async def release(self):
+        self.active -= 1
+        admission_in_flight.dec(self.name)
+        async with self._released:
+            self._released.notify(1)
+
+
+def classify(scope) -> Optional[str]:
+    """Route class of a request, None for paths that are not limited"""
+    path = scope["path"]
+    if scope["type"] == "websocket":
+        return "websocket"
+    if scope["method"] == "OPTIONS":
+        # CORS preflights are answered by CORSMiddleware without touching the app
+        return None
+    if not path.startswith("/api/") or path.startswith(("/api/admin", "/api/events")):
+        # Metrics and admin must work under load, SSE streams are long-lived
+        return None
+    if path in ("/api/auth/login", "/api/auth/register") and scope["method"] == "POST":
+        # Only these hash a password, refresh and logout are cheap writes
+        return "auth"
+    if scope["method"] in ("GET", "HEAD"):
+        return "read"
+    return "write"
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying per-route-class concurrency limits.
+
+    Shed requests get 503 with Retry-After; WebSocket handshakes are limited
+    until they are accepted or closed, and shed ones are closed with 1013
+    (try again later).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        timeout = settings.ADMISSION_QUEUE_TIMEOUT
+        self.limiters: Dict[str, ConcurrencyLimiter] = {
+            "auth": ConcurrencyLimiter("auth", settings.ADMISSION_AUTH_LIMIT, settings.ADMISSION_AUTH_QUEUE, timeout),
+            "read": ConcurrencyLimiter("read", settings.ADMISSION_READ_LIMIT, settings.ADMISSION_READ_QUEUE, timeout),
+            "write": ConcurrencyLimiter("write", settings.ADMISSION_WRITE_LIMIT, settings.ADMISSION_WRITE_QUEUE, timeout),
+            "websocket": ConcurrencyLimiter("websocket", settings.ADMISSION_WS_ACCEPT_LIMIT,
+                                            settings.ADMISSION_WS_ACCEPT_QUEUE, timeout),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        route_class = classify(scope)
+        if route_class is None:
+            return await self.app(scope, receive, send)
+        limiter = self.limiters[route_class]
+        try:
+            await limiter.acquire()
+        except Overloaded:
+            return await self._reject(scope, send)
+
+        if scope["type"] == "http":
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                await limiter.release()
+
+        # WebSocket slots cover the handshake only, not the connection lifetime
+        released = False
+
+        async def send_releasing(message):
+            nonlocal released
+            if not released and message["type"] in ("websocket.accept", "websocket.close"):
+                released = True
+                await limiter.release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_releasing)
+        finally:
+            if not released:
+                await limiter.release()
+
+    async def _reject(self, scope, send):
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1013})
+            return
+        body = b'{"detail":"Server is overloaded, retry later"}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(settings.ADMISSION_RETRY_AFTER)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class TokenBucket:
+    """Per-key token buckets refilled at `rate` tokens per second up to `burst`"""
+
+    MAX_KEYS = 10000
+
+    def __init__(self):
+        # key -> (tokens, last refill), least recently used first
+        self._buckets: "OrderedDict[int, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: int, rate: float, burst: float) -> float:
+        """Take one token, returning 0 on success or the seconds until one is available"""
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.MAX_KEYS:
+            # A bucket idle long enough to be evicted is full again anyway
+            self._buckets.popitem(last=False)
+        return wait
+
+
+vote_buckets = TokenBucket()
+
+
+async def limit_vote_rate(current_user: dict = Depends(get_current_active_user)):
+    """Per-user token bucket for vote writes, 429 with Retry-After when exhausted"""
+    if settings.VOTE_RATE_PER_SECOND <= 0:
+        return current_user
+    wait = vote_buckets.take(current_user["id"], settings.VOTE_RATE_PER_SECOND, settings.VOTE_RATE_BURST)
+    if wait > 0:
+        vote_rate_limited.inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many votes, slow down",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+    return current_user
@@ -0,0 +1,331 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import get_db_path
+from app.metrics import registry, Gauge
+
+# Imported on first use: numpy is only needed for the /api/analytics endpoints
+# and would add ~100 ms to importing app.main
+np = None
+
+
+def _import_numpy():
+    """Bind the module-level np, RuntimeError when numpy is not installed"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("Vote analytics require numpy")
+        np = numpy
+
+
+# z for a 95% Wilson confidence interval
+WILSON_Z = 1.96
+# Largest category x voter bitmap for distinct voter counts, larger inputs sort pairs instead
+BITMAP_MAX_CELLS = 100_000_000
+
+# Pending change values: a vote direction or a removal
+UPVOTE, DOWNVOTE, REMOVED = 1, 0, -1
+
+
+class VoteColumns:
+    """Every hot vote as columnar NumPy arrays, for whole-table analytics.
+
+    Rows are sorted by (suggestion_id, user_id) so a suggestion's voters are
+    one slice. Published arrays are never modified in place: vote events from
+    the outbox only append to a pending list, which is merged (copy on write)
+    before each computation or once ANALYTICS_FLUSH_PENDING changes are
+    queued, so a computation running in a worker thread always sees a
+    consistent set.
+    About 13 bytes per vote.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        # Changes are only queued once a load started, earlier ones are in the load itself
+        self.loading = False
+        self._load_lock = asyncio.Lock()
+        self._merge_lock = threading.Lock()
+        self._pending: List[Tuple[int, int, int, int]] = []
+        self._dropped: List[int] = []
+        self._flushing = False
+        self._set_arrays((), (), (), ())
+
+    def _set_arrays(self, suggestion_ids, user_ids, is_upvote, created_at):
+        self.columns = (suggestion_ids, user_ids, is_upvote, created_at)
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+    def apply_event(self, event_type: str, data: dict, created_at: int):
+        """Catch up with a vote change seen in the outbox, which may come from another worker"""
+        if event_type == "suggestion_deleted":
+            self.forget_suggestions([data["id"]])
+        elif event_type == "vote_update" and data.get("user_id") is not None:
+            if data.get("is_upvote") is None:
+                self.remove_vote(data["suggestion_id"], data["user_id"])
+            else:
+                self.record_vote(data["suggestion_id"], data["user_id"], data["is_upvote"], created_at)
+
+    # Change hooks, called for every vote_update and suggestion_deleted event
+    def record_vote(self, suggestion_id: int, user_id: int, is_upvote: bool, created_at: int):
+        """Queue a new or changed vote"""
+        self._queue((suggestion_id, user_id, UPVOTE if is_upvote else DOWNVOTE, created_at))
+
+    def remove_vote(self, suggestion_id: int, user_id: int):
+        """Queue a removed vote"""
+        self._queue((suggestion_id, user_id, REMOVED, 0))
+
+    def forget_suggestions(self, suggestion_ids: List[int]):
+        """Queue dropping every vote of deleted or archived suggestions"""
+        if self.loading:
+            self._dropped.extend(suggestion_ids)
+
+    def _queue(self, change: Tuple[int, int, int, int]):
+        if not self.loading:
+            return
+        self._pending.append(change)
+        if self.loaded and len(self._pending) >= settings.ANALYTICS_FLUSH_PENDING and not self._flushing:
+            # Merge in a worker thread, the copies are O(votes)
+            self._flushing = True
+            asyncio.get_running_loop().run_in_executor(None, self.merge_pending)
+
+    def merge_pending(self):
+        """Apply queued changes to new arrays and publish them (worker thread)"""
+        with self._merge_lock:
+            self._flushing = False
+            pending, self._pending = self._pending, []
+            dropped, self._dropped = self._dropped, []
+            if pending or dropped:
+                self._set_arrays(*_merge(self.columns, pending, dropped))
+            return self.columns
+
+    async def ensure_loaded(self):
+        """Load all hot votes once, concurrent callers wait for the same load"""
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            _import_numpy()
+            self.loading = True
+            columns = await run_in_threadpool(load_columns, get_db_path())
+            with self._merge_lock:
+                # Changes queued while loading are merged on top; replaying one
+                # that the load already saw gives the same row
+                self._set_arrays(*columns)
+            self.loaded = True
+
+    async def snapshot(self):
+        """Current arrays with every queued change merged"""
+        await self.ensure_loaded()
+        return await run_in_threadpool(self.merge_pending)
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the arrays"""
+        return sum(getattr(column, "nbytes", 0) for column in self.columns)
+
+
+def _empty_columns():
+    _import_numpy()
+    return (np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.int8), np.empty(0, np.uint32))
+
+
+def load_columns(db_path: str, batch_size: int = 500000):
+    """Read every vote on an existing suggestion into sorted columns (blocking)"""
+    _import_numpy()
+    parts = []
+    with sqlite3.connect(db_path) as db:
+        # The primary key order is (suggestion_id, user_id), no sort needed
+        cursor = db.execute(
+            """
+            SELECT suggestion_id, user_id, is_upvote, created_at FROM votes
+            WHERE suggestion_id IN (SELECT id FROM suggestions)
+            ORDER BY suggestion_id, user_id
+            """
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            parts.append(np.array(rows, dtype=np.int64))
+    if not parts:
+        return _empty_columns()
+    table = np.concatenate(parts)
+    return (table[:, 0].astype(np.int32), table[:, 1].astype(np.int32),
+            table[:, 2].astype(np.int8), table[:, 3].astype(np.uint32))
+
+
+def _merge(columns, pending, dropped):
+    """New columns with pending (suggestion_id, user_id, value, created_at) changes applied"""
+    _import_numpy()
+    suggestion_ids, user_ids, is_upvote, created_at = columns
+    keep = np.ones(len(suggestion_ids), dtype=bool)
+    if pending:
+        # Last change per vote wins
+        latest: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for suggestion_id, user_id, value, timestamp in pending:
+            latest[(suggestion_id, user_id)] = (value, timestamp)
+        changes = sorted(latest.items())
+        change_keys = np.array([(s << 32) | u for (s, u), _ in changes], dtype=np.int64)
+        values = np.array([v for _, (v, _) in changes], dtype=np.int8)
+        timestamps = np.array([t for _, (_, t) in changes], dtype=np.uint32)
+        # Rows are sorted by (suggestion_id, user_id), so the packed keys are sorted too
+        keys = (suggestion_ids.astype(np.int64) << 32) | user_ids
+        positions = np.searchsorted(keys, change_keys)
+        exists = positions < len(keys)
+        exists[exists] = keys[positions[exists]] == change_keys[exists]
+        removed = values == REMOVED
+        updated = exists & ~removed
+        is_upvote = is_upvote.copy()
+        created_at = created_at.copy()
+        is_upvote[positions[updated]] = values[updated]
+        created_at[positions[updated]] = timestamps[updated]
+        keep[positions[exists & removed]] = False
+        inserted = ~exists & ~removed
+        if inserted.any():
+            at = positions[inserted]
+            suggestion_ids = np.insert(suggestion_ids, at, (change_keys[inserted] >> 32).astype(np.int32))
+            user_ids = np.insert(user_ids, at, (change_keys[inserted] & 0xFFFFFFFF).astype(np.int32))
+            is_upvote = np.insert(is_upvote, at, values[inserted])
+            created_at = np.insert(created_at, at, timestamps[inserted])
+            keep = np.insert(keep, at, True)
+    if dropped:
+        keep &= ~np.isin(suggestion_ids, np.array(dropped, dtype=np.int32))
+    if not keep.all():
+        suggestion_ids, user_ids = suggestion_ids[keep], user_ids[keep]
+        is_upvote, created_at = is_upvote[keep], created_at[keep]
+    return suggestion_ids, user_ids, is_upvote, created_at
+
+
+def _window(columns, since: Optional[int]):
+    """Columns limited to votes cast at or after a Unix time"""
+    if since is None:
+        return columns
+    mask = columns[3] >= since
+    return tuple(column[mask] for column in columns)
+
+
+def suggestion_metrics(columns, since: Optional[int] = None) -> Dict[str, "np.ndarray"]:
+    """Vote counts, Wilson lower bound and controversy of every suggestion, indexed by id"""
+    _import_numpy()
+    suggestion_ids, _, is_upvote, _ = _window(columns, since)
+    size = int(columns[0].max()) + 1 if len(columns[0]) else 1
+    votes = np.bincount(suggestion_ids, minlength=size)
+    upvotes = np.bincount(suggestion_ids, weights=is_upvote, minlength=size).astype(np.int64)
+    downvotes = votes - upvotes
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = votes.astype(np.float64)
+        p = upvotes / n
+        z2 = WILSON_Z * WILSON_Z
+        wilson = (p + z2 / (2 * n) - WILSON_Z * np.sqrt((p * (1 - p) + z2 / (4 * n)) / n)) / (1 + z2 / n)
+        # Many votes split close to evenly: magnitude ** balance
+        balance = np.minimum(upvotes, downvotes) / np.maximum(upvotes, downvotes)
+        controversy = np.where((upvotes > 0) & (downvotes > 0), n ** balance, 0.0)
+    return {
+        "votes": votes,
+        "upvotes": upvotes,
+        "downvotes": downvotes,
+        "wilson": np.nan_to_num(wilson),
+        "controversy": controversy,
+    }
+
+
+def top_suggestions(columns, sort: str, limit: int, since: Optional[int] = None) -> List[dict]:
+    """Suggestions with votes ranked by one metric, best first"""
+    metrics = suggestion_metrics(columns, since)
+    voted = np.flatnonzero(metrics["votes"])
+    order = voted[np.argsort(-metrics[sort][voted], kind="stable")][:limit]
+    return [
+        {
+            "suggestion_id": int(suggestion_id),
+            "votes": int(metrics["votes"][suggestion_id]),
+            "upvotes": int(metrics["upvotes"][suggestion_id]),
+            "downvotes": int(metrics["downvotes"][suggestion_id]),
+            "wilson": float(metrics["wilson"][suggestion_id]),
+            "controversy": float(metrics["controversy"][suggestion_id]),
+        }
+        for suggestion_id in order
+    ]
+
+
+def category_participation(columns, categories: Dict[int, str], since: Optional[int] = None) -> List[dict]:
+    """Votes, distinct voters and the share of all voters per category"""
+    _import_numpy()
+    suggestion_ids, user_ids, _, _ = _window(columns, since)
+    names = sorted(set(categories.values()))
+    name_codes = {name: code for code, name in enumerate(names)}
+    size = max(max(categories, default=0), int(suggestion_ids.max()) if len(suggestion_ids) else 0) + 1
+    # Category code per suggestion id, -1 for suggestions without a category row
+    codes = np.full(size, -1, dtype=np.int32)
+    for suggestion_id, category in categories.items():
+        codes[suggestion_id] = name_codes[category]
+    vote_codes = codes[suggestion_ids]
+    known = vote_codes >= 0
+    vote_codes, voters = vote_codes[known], user_ids[known]
+    votes = np.bincount(vote_codes, minlength=len(names))
+    width = int(voters.max()) + 1 if len(voters) else 1
+    if len(names) * width <= BITMAP_MAX_CELLS:
+        # Category x voter bitmap, much cheaper than sorting (category, voter) pairs
+        seen = np.zeros((len(names), width), dtype=bool)
+        seen[vote_codes, voters] = True
+        distinct_voters = seen.sum(axis=1)
+        total_voters = int(seen.any(axis=0).sum())
+    else:
+        pairs = np.unique(vote_codes.astype(np.int64) << 32 | voters)
+        distinct_voters = np.bincount((pairs >> 32).astype(np.int64), minlength=len(names))
+        total_voters = len(np.unique(voters))
+    suggestions = np.bincount(codes[codes >= 0], minlength=len(names))
+    return [
+        {
+            "category": name,
+            "suggestions": int(suggestions[code]),
+            "votes": int(votes[code]),
+            "voters": int(distinct_voters[code]),
+            "participation": float(distinct_voters[code] / total_voters) if total_voters else 0.0,
+        }
+        for code, name in enumerate(names)
+    ]
+
+
+def voter_overlap(columns, suggestion_id: int, limit: int) -> List[dict]:
+    """Suggestions sharing the most voters with one suggestion, by Jaccard similarity"""
+    _import_numpy()
+    suggestion_ids, user_ids, _, _ = columns
+    if not 0 < suggestion_id < 2 ** 31:
+        return []
+    # Search with a matching dtype, a Python int would make NumPy cast the whole column
+    key = np.int32(suggestion_id)
+    lo = np.searchsorted(suggestion_ids, key, "left")
+    hi = np.searchsorted(suggestion_ids, key, "right")
+    if lo == hi:
+        return []
+    voters = user_ids[lo:hi]
+    shared = np.bincount(suggestion_ids[np.isin(user_ids, voters)])
+    totals = np.bincount(suggestion_ids, minlength=len(shared))[:len(shared)]
+    shared[suggestion_id] = 0
+    jaccard = shared / np.maximum(totals + len(voters) - shared, 1)
+    candidates = np.flatnonzero(shared)
+    order = candidates[np.argsort(-jaccard[candidates], kind="stable")][:limit]
+    return [
+        {"suggestion_id": int(other), "shared_voters": int(shared[other]), "jaccard": float(jaccard[other])}
+        for other in order
+    ]
+
+
+def since_days(days: Optional[float]) -> Optional[int]:
+    """Unix time `days` ago, None for all time"""
+    return int(time.time() - days * 86400) if days is not None else None
+
+
+# Global columnar vote store shared by the analytics endpoints
+vote_columns = VoteColumns()
+
+vote_columns_bytes = registry.register(Gauge(
+    "analytics_vote_columns_bytes", "Memory held by the analytics vote arrays",
+    callback=vote_columns.memory_bytes))
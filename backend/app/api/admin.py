@@ -0,0 +1,70 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.auth import get_current_admin_user
+from app.backup import backup_manager, list_backups
+from app.config import settings
+from app.maintenance import maintenance
+from app.profiling import sampling_profiler
+from app.timing import TimedRoute
+
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=TimedRoute)
+
+
+@router.post("/profile")
+async def profile_process(
+    seconds: float = Query(10, gt=0),
+    interval: float = Query(0.005, ge=0.001, le=1),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Sample the event loop thread for a number of seconds (admin only)"""
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.PROFILE_MAX_SECONDS}"
+        )
+    if sampling_profiler.running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running"
+        )
+    return await sampling_profiler.profile(seconds, interval)
+
+
+@router.post("/backup")
+async def backup_database(
+    compress: Optional[bool] = None,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Take an online backup of the database now (admin only)"""
+    if backup_manager.running:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A backup is already running"
+        )
+    return await backup_manager.run(compress)
+
+
+@router.get("/backups")
+async def read_backups(current_user: dict = Depends(get_current_admin_user)):
+    """List backups, newest first (admin only)"""
+    return list_backups()
+
+
+@router.get("/maintenance")
+async def read_maintenance(current_user: dict = Depends(get_current_admin_user)):
+    """Schedule and last-run stats of the database maintenance tasks (admin only)"""
+    return maintenance.stats()
+
+
+@router.post("/maintenance/{task}")
+async def run_maintenance_task(
+    task: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """Run a maintenance task now, outside its schedule and window (admin only)"""
+    if task not in maintenance.tasks:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown maintenance task"
+        )
+    return await maintenance.run_task(task)
@@ -0,0 +1,59 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from starlette.concurrency import run_in_threadpool
+from app.analytics import vote_columns, top_suggestions, category_participation, voter_overlap, since_days
+from app.auth import get_current_active_user
+from app.config import settings
+from app.database import get_db
+from app.timing import TimedRoute
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=TimedRoute)
+
+
+async def _columns():
+    """Vote arrays with pending changes merged, 503 when analytics are unavailable"""
+    if not settings.ANALYTICS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics are disabled"
+        )
+    try:
+        return await vote_columns.snapshot()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
+@router.get("/suggestions")
+async def read_suggestion_metrics(
+    sort: Literal["wilson", "controversy", "votes"] = "wilson",
+    limit: int = Query(20, ge=1, le=500),
+    days: Optional[float] = Query(None, gt=0),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Rank suggestions by Wilson lower bound, controversy or votes, optionally over the last days (async)"""
+    columns = await _columns()
+    return await run_in_threadpool(top_suggestions, columns, sort, limit, since_days(days))
+
+
+@router.get("/categories")
+async def read_category_participation(
+    days: Optional[float] = Query(None, gt=0),
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Votes, distinct voters and share of all voters per category (async)"""
+    columns = await _columns()
+    cursor = await db.execute("SELECT id, category FROM suggestions")
+    categories = {row["id"]: row["category"] for row in await cursor.fetchall()}
+    return await run_in_threadpool(category_participation, columns, categories, since_days(days))
+
+
+@router.get("/overlap/{suggestion_id}")
+async def read_voter_overlap(
+    suggestion_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Suggestions whose voters overlap most with this suggestion's (async)"""
+    columns = await _columns()
+    return await run_in_threadpool(voter_overlap, columns, suggestion_id, limit)
@@ -1,13 +1,19 @@
-from datetime import timedelta
+import time
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from app.database import get_db
-from app.auth import authenticate_user, create_access_token, get_current_active_user, get_password_hash
-from app.crud import get_user_by_username, create_user, create_user_async
-from app.schemas import User, UserCreate, Token
+from app.auth import (
+    authenticate_user, get_current_active_user, get_current_token, get_password_hash,
+    issue_access_token
+)
+from app.crud import get_user_by_username, create_user_async
+from app.schemas import User, UserCreate, Token, TokenData, RefreshRequest
+from app.sessions import session_store, logins, refreshes
 from app.config import settings
+from app.timing import TimedRoute
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], route_class=TimedRoute)
 
 
 @router.post("/register", response_model=User)
@@ -30,7 +36,7 @@ async def register(user: UserCreate, db = Depends(get_db)):
             detail="Email already registered"
         )
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = await create_user_async(db=db, user=user, hashed_password=hashed_password)
     return db_user
 
@@ -40,18 +46,57 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db = Depends(g
     """Login and get access token (async)"""
     user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
+        logins.inc("failure")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    logins.inc("success")
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user["username"]}, expires_delta=access_token_expires
-    )
+    access_token = issue_access_token(user["username"])
+    refresh_token = await session_store.create(user["id"], user["username"])
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(request: RefreshRequest, db = Depends(get_db)):
+    """Exchange a refresh token for a new access token, without a password check (async)"""
+    result = await session_store.refresh(request.refresh_token)
+    user = None
+    if result is not None:
+        session, refresh_token = result
+        user = await get_user_by_username(db, session["username"])
+        if user is None or user["id"] != session["user_id"] or not user["is_active"]:
+            # The user was deleted or deactivated since logging in, end the session
+            await session_store.delete(refresh_token)
+            user = None
+    if user is None:
+        refreshes.inc("failure")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    refreshes.inc("success")
+    access_token = issue_access_token(session["username"])
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/logout")
+async def logout(
+    request: RefreshRequest,
+    token_data: TokenData = Depends(get_current_token),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """End the session and revoke the current access token (async)"""
+    # get_current_active_user already validated this token, FastAPI reuses the decoded result
+    await session_store.delete(request.refresh_token)
+    if token_data.jti:
+        expires_at = token_data.expires_at or time.time() + settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        await session_store.revoke(token_data.jti, expires_at)
+    return {"message": "Logged out"}
 
 
 @router.get("/me", response_model=User)
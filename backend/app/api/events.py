@@ -0,0 +1,100 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from app.auth import get_user_for_token
+from app.config import settings
+from app.database import connect_db
+from app.websocket_manager import manager, SSEChannel
+from app.ws_protocol import SSE_CODEC
+from app.timing import TimedRoute
+
+router = APIRouter(tags=["events"], route_class=TimedRoute)
+
+# Event types a read-only client can filter on
+TOPICS = {"vote_update", "suggestion_update", "new_suggestion"}
+
+
+def _parse_list(value: Optional[str]) -> Optional[list]:
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+async def _authenticate(request: Request, access_token: Optional[str]) -> dict:
+    """EventSource cannot set headers, so the token may also come as ?access_token="""
+    token = access_token
+    authorization = request.headers.get("authorization", "")
+    if token is None and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    async with connect_db() as db:
+        user = await get_user_for_token(db, token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+@router.get("/events")
+async def event_stream(
+    request: Request,
+    topics: Optional[str] = None,
+    suggestion_ids: Optional[str] = None,
+    access_token: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """Read-only Server-Sent Events feed of realtime updates"""
+    user = await _authenticate(request, access_token)
+    topic_list = _parse_list(topics)
+    if topic_list is not None and not set(topic_list) <= TOPICS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Topics must be among {', '.join(sorted(TOPICS))}"
+        )
+    try:
+        id_list = [int(i) for i in _parse_list(suggestion_ids)] if suggestion_ids else None
+        since = last_event_id_header or last_event_id
+        since = int(since) if since else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="suggestion_ids and Last-Event-ID must be integers"
+        )
+
+    channel = SSEChannel(settings.SSE_MAX_QUEUE)
+    connection = await manager.connect(channel, user["id"], SSE_CODEC)
+    connection.topics = frozenset(topic_list) if topic_list is not None else None
+    manager.subscribe(channel, user["id"], id_list)
+    # No await between connect and replay, so every event is either replayed or queued
+    replay = manager.replay(since, connection.topics, connection.subscriptions) if since is not None else []
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            if replay is None:
+                # Events were missed, the client has to refetch its state
+                yield SSE_CODEC.encode({"type": "reset", "data": {}}, manager.last_event_id)
+            for frame in replay or []:
+                yield frame
+            while True:
+                try:
+                    frame = await channel.next_frame(timeout=settings.WS_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            manager.disconnect(channel, user["id"])
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.metrics import registry, Counter, Gauge
+from app.outbox import outbox
+from app.websocket_manager import manager
+
+router = APIRouter(tags=["metrics"])
+
+# Realtime gauges are read from their owners at scrape time
+registry.register(Gauge(
+    "ws_connections", "Open WebSocket and SSE connections",
+    callback=lambda: sum(len(c) for c in manager.active_connections.values())))
+registry.register(Counter(
+    "ws_reaped_total", "Connections dropped by the heartbeat or after failed sends",
+    callback=lambda: manager.reaped_total))
+registry.register(Gauge(
+    "outbox_depth", "Realtime events committed but not yet dispatched",
+    callback=lambda: outbox.stats()["depth"]))
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,17 +1,29 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
 from app.database import get_db
-from app.auth import get_current_active_user
+from app.auth import get_current_active_user, is_admin
+from app.config import settings
 from app.crud import (
     get_suggestions, get_suggestion, create_suggestion, update_suggestion,
-    delete_suggestion, get_suggestions_by_category, get_top_suggestions, get_user, get_suggestion_vote_count
+    delete_suggestion, get_suggestions_by_category, get_top_suggestions, get_user,
+    get_suggestion_changes, get_suggestions_by_ids, update_suggestion_statuses, get_users_by_ids,
+    get_unvoted_suggestions, get_similar_suggestions
 )
-from app.schemas import Suggestion, SuggestionCreate, SuggestionUpdate, User
-from app.websocket_manager import manager
-from app.schemas import SuggestionUpdateMessage
+from app.schemas import (
+    Suggestion, SuggestionCreate, SuggestionCreated, SuggestionUpdate, User, SuggestionChanges, SuggestionFeed,
+    SimilarSuggestion
+)
+from app.outbox import outbox, record_event
+from app.schemas import (
+    SuggestionUpdateMessage, SuggestionBatchUpdateMessage, BulkStatusUpdate, BulkStatusResult, StatusTransitionResult
+)
+from app.timing import TimedRoute
+from app.singleflight import SingleFlight
+
+router = APIRouter(prefix="/suggestions", tags=["suggestions"], route_class=TimedRoute)
 
-router = APIRouter(prefix="/suggestions", tags=["suggestions"])
+top_flight = SingleFlight("read_top_suggestions")
+categories_flight = SingleFlight("read_suggestion_categories")
 
 
 @router.get("/", response_model=List[Suggestion])
@@ -20,19 +32,21 @@ async def read_suggestions(
     limit: Optional[int] = Query(None, ge=1, le=100),
     category: Optional[str] = None,
     status: Optional[str] = None,
+    include_archived: bool = False,
     db = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get all suggestions with optional filtering and limit, sorted by upvotes if limit is set (async)"""
     if limit is not None:
-        suggestions = await get_top_suggestions(db=db, limit=limit)
+        suggestions = await get_top_suggestions(db=db, limit=limit, include_archived=include_archived)
     else:
         suggestions = await get_suggestions(
             db=db,
             skip=skip,
             limit=100,
             category=category if category is not None else None,
-            status=status if status is not None else None
+            status=status if status is not None else None,
+            include_archived=include_archived
         )
     enriched = []
     for s in suggestions:
@@ -48,8 +62,6 @@ async def read_suggestions(
             }
         else:
             s["author"] = None
-        # Add vote_count
-        s["vote_count"] = await get_suggestion_vote_count(db, s["id"])
         enriched.append(s)
     return enriched
 
@@ -57,42 +69,91 @@ async def read_suggestions(
 @router.get("/top", response_model=List[Suggestion])
 async def read_top_suggestions(
     limit: int = Query(10, ge=1, le=50),
+    include_archived: bool = False,
     db = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get top suggestions by vote count (async)"""
-    suggestions = await get_top_suggestions(db=db, limit=limit)
-    enriched = []
-    for s in suggestions:
-        author = await get_user(db, s["author_id"]) if s else None
-        s = dict(s) if s else {}
-        if author:
-            s["author"] = {
-                "id": author["id"],
-                "username": author["username"],
-                "email": author["email"],
-                "is_active": author["is_active"],
-                "created_at": author["created_at"]
-            }
-        else:
-            s["author"] = None
-        # Add vote_count
-        s["vote_count"] = await get_suggestion_vote_count(db, s["id"])
-        enriched.append(s)
-    return enriched
+    async def compute():
+        suggestions = await get_top_suggestions(db=db, limit=limit, include_archived=include_archived)
+        enriched = []
+        for s in suggestions:
+            author = await get_user(db, s["author_id"]) if s else None
+            s = dict(s) if s else {}
+            if author:
+                s["author"] = {
+                    "id": author["id"],
+                    "username": author["username"],
+                    "email": author["email"],
+                    "is_active": author["is_active"],
+                    "created_at": author["created_at"]
+                }
+            else:
+                s["author"] = None
+            enriched.append(s)
+        return enriched
+    # Dashboards poll this together, the response has no per-user fields
+    return await top_flight.do((limit, include_archived), compute)
 
 
 @router.get("/categories")
 async def read_suggestion_categories(
+    include_archived: bool = False,
     db = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get suggestion count by category (async)"""
-    categories = await get_suggestions_by_category(db=db)
-    return categories
+    return await categories_flight.do(
+        include_archived, lambda: get_suggestions_by_category(db=db, include_archived=include_archived)
+    )
+
+
+@router.get("/unvoted", response_model=SuggestionFeed)
+async def read_unvoted_suggestions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get active suggestions the caller has not authored or voted on, best score first (async)"""
+    after = None
+    if cursor is not None:
+        try:
+            vote_count, suggestion_id = cursor.split(":")
+            after = (int(vote_count), int(suggestion_id))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    suggestions = await get_unvoted_suggestions(db=db, user_id=current_user["id"], limit=limit, after=after)
+    authors = await get_users_by_ids(db, list({s["author_id"] for s in suggestions}))
+    for s in suggestions:
+        s["author"] = authors.get(s["author_id"])
+    next_cursor = None
+    if len(suggestions) == limit:
+        last = suggestions[-1]
+        next_cursor = f"{last['vote_count']}:{last['id']}"
+    return {"items": suggestions, "next_cursor": next_cursor}
 
 
-@router.post("/", response_model=Suggestion)
+@router.get("/changes", response_model=SuggestionChanges)
+async def read_suggestion_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get suggestions changed or deleted after a change version, for polling clients (async)"""
+    changes = await get_suggestion_changes(db=db, since=since, limit=limit)
+    # One batch query for the whole page instead of one per changed row
+    authors = await get_users_by_ids(db, list({s["author_id"] for s in changes["changed"]}))
+    for s in changes["changed"]:
+        s["author"] = authors.get(s["author_id"])
+    return changes
+
+
+@router.post("/", response_model=SuggestionCreated)
 async def create_new_suggestion(
     suggestion: SuggestionCreate,
     db = Depends(get_db),
@@ -102,7 +163,8 @@ async def create_new_suggestion(
     db_suggestion = await create_suggestion(
         db=db,
         suggestion=suggestion,
-        author_id=current_user["id"]
+        author_id=current_user["id"],
+        commit=False
     )
     db_suggestion = dict(db_suggestion) if db_suggestion else {}
     db_suggestion["author"] = {
@@ -112,30 +174,103 @@ async def create_new_suggestion(
         "is_active": current_user["is_active"],
         "created_at": current_user["created_at"]
     }
-    # Add vote_count
-    db_suggestion["vote_count"] = await get_suggestion_vote_count(db, db_suggestion["id"])
-    # Broadcast new suggestion to all connected clients
-    suggestion_data = dict(db_suggestion)
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(manager.broadcast_new_suggestion(suggestion_data))
-        else:
-            asyncio.run(manager.broadcast_new_suggestion(suggestion_data))
-    except RuntimeError:
-        pass
+    # Broadcast new suggestion to all connected clients once committed
+    event_id = await record_event(db, "new_suggestion", dict(db_suggestion))
+    await db.commit()
+    outbox.notify(event_id)
+    # Likely re-submissions of an existing idea, so the client can point the author at them
+    db_suggestion["possible_duplicates"] = []
+    if settings.DEDUP_ENABLED:
+        try:
+            db_suggestion["possible_duplicates"] = await get_similar_suggestions(
+                db, suggestion.title, suggestion.description, exclude_id=db_suggestion["id"]
+            )
+        except RuntimeError:
+            # numpy is not installed, the suggestion is created without the check
+            pass
     return db_suggestion
 
 
+def _check_transition(db_suggestion: Optional[dict], new_status: str, current_user: dict, admin: bool):
+    """Status code and detail of an invalid status transition, None if it may be applied"""
+    if db_suggestion is None:
+        return status.HTTP_404_NOT_FOUND, "Suggestion not found"
+    if db_suggestion["status"] != "active":
+        return status.HTTP_400_BAD_REQUEST, "Only active suggestions can be updated"
+    if new_status not in ["implemented", "rejected"]:
+        return status.HTTP_400_BAD_REQUEST, "Status must be 'implemented' or 'rejected'"
+    if db_suggestion["author_id"] != current_user["id"] and not admin:
+        return status.HTTP_403_FORBIDDEN, "Not authorized to update this suggestion's status"
+    return None
+
+
+@router.patch("/status", response_model=BulkStatusResult)
+async def update_suggestion_statuses_bulk(
+    bulk_update: BulkStatusUpdate,
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Apply many status transitions in one transaction with a result per item (async)"""
+    transitions = bulk_update.transitions
+    if len(transitions) > settings.BULK_STATUS_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BULK_STATUS_MAX_ITEMS} transitions per request"
+        )
+    # Validate everything against one read of the affected suggestions
+    existing = await get_suggestions_by_ids(db, list({t.id for t in transitions}))
+    admin = is_admin(current_user["username"])
+    failures = {}
+    accepted = {}
+    for index, transition in enumerate(transitions):
+        if transition.id in accepted:
+            failures[index] = (status.HTTP_400_BAD_REQUEST, "Duplicate transition for this suggestion")
+            continue
+        failure = _check_transition(existing.get(transition.id), transition.status, current_user, admin)
+        if failure is None:
+            accepted[transition.id] = transition.status
+        else:
+            failures[index] = failure
+
+    enriched = {}
+    if accepted:
+        updated = await update_suggestion_statuses(db, accepted, commit=False)
+        # Validation ran before the write lock, a suggestion closed or deleted meanwhile is skipped
+        for index, transition in enumerate(transitions):
+            if index not in failures and transition.id not in updated:
+                failures[index] = (status.HTTP_409_CONFLICT, "Suggestion changed while the batch was applied")
+        authors = await get_users_by_ids(db, list({s["author_id"] for s in updated.values()}))
+        for suggestion_id, s in updated.items():
+            s["author"] = authors.get(s["author_id"])
+            enriched[suggestion_id] = s
+    if enriched:
+        # One event for the whole batch instead of one broadcast per suggestion
+        batch_msg = SuggestionBatchUpdateMessage(suggestions=list(enriched.values()))
+        event_id = await record_event(db, "suggestion_update", batch_msg.dict())
+        await db.commit()
+        outbox.notify(event_id)
+
+    results = []
+    for index, transition in enumerate(transitions):
+        if index in failures:
+            status_code, detail = failures[index]
+            results.append(StatusTransitionResult(id=transition.id, ok=False, status_code=status_code, detail=detail))
+        else:
+            results.append(StatusTransitionResult(
+                id=transition.id, ok=True, status_code=status.HTTP_200_OK, suggestion=enriched[transition.id]
+            ))
+    return BulkStatusResult(applied=len(enriched), failed=len(failures), results=results)
+
+
 @router.get("/{suggestion_id}", response_model=Suggestion)
 async def read_suggestion(
     suggestion_id: int,
+    include_archived: bool = False,
     db = Depends(get_db),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get a specific suggestion by ID (async)"""
-    suggestion = await get_suggestion(db=db, suggestion_id=suggestion_id)
+    suggestion = await get_suggestion(db=db, suggestion_id=suggestion_id, include_archived=include_archived)
     if suggestion is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -153,11 +288,36 @@ async def read_suggestion(
         }
     else:
         suggestion["author"] = None
-    # Add vote_count
-    suggestion["vote_count"] = await get_suggestion_vote_count(db, suggestion["id"])
     return suggestion
 
 
+@router.get("/{suggestion_id}/similar", response_model=List[SimilarSuggestion])
+async def read_similar_suggestions(
+    suggestion_id: int,
+    limit: int = Query(5, ge=1, le=50),
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Near-duplicates of a suggestion, most similar first (async)"""
+    if not settings.DEDUP_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Duplicate detection is disabled"
+        )
+    suggestion = await get_suggestion(db=db, suggestion_id=suggestion_id)
+    if suggestion is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Suggestion not found"
+        )
+    try:
+        return await get_similar_suggestions(
+            db, suggestion["title"], suggestion["description"], limit=limit, exclude_id=suggestion_id
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+
 @router.put("/{suggestion_id}", response_model=Suggestion)
 async def update_suggestion_by_id(
     suggestion_id: int,
@@ -180,7 +340,8 @@ async def update_suggestion_by_id(
     updated_suggestion = await update_suggestion(
         db=db,
         suggestion_id=suggestion_id,
-        suggestion_update=suggestion_update.dict(exclude_unset=True)
+        suggestion_update=suggestion_update.dict(exclude_unset=True),
+        commit=False
     )
     author = await get_user(db, updated_suggestion["author_id"]) if updated_suggestion else None
     updated_suggestion = dict(updated_suggestion) if updated_suggestion else {}
@@ -194,18 +355,10 @@ async def update_suggestion_by_id(
         }
     else:
         updated_suggestion["author"] = None
-    # Add vote_count
-    updated_suggestion["vote_count"] = await get_suggestion_vote_count(db, updated_suggestion["id"])
     suggestion_update_msg = SuggestionUpdateMessage(suggestion=updated_suggestion)
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(manager.broadcast_suggestion_update(suggestion_update_msg))
-        else:
-            asyncio.run(manager.broadcast_suggestion_update(suggestion_update_msg))
-    except RuntimeError:
-        pass
+    event_id = await record_event(db, "suggestion_update", suggestion_update_msg.dict()["suggestion"])
+    await db.commit()
+    outbox.notify(event_id)
     return updated_suggestion
 
 
@@ -218,30 +371,16 @@ async def update_suggestion_status(
 ):
     """Update the status of a suggestion (active -> implemented/rejected) (async)"""
     db_suggestion = await get_suggestion(db=db, suggestion_id=suggestion_id)
-    if db_suggestion is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Suggestion not found"
-        )
-    if db_suggestion["status"] != "active":
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Only active suggestions can be updated"
-        )
-    if new_status not in ["implemented", "rejected"]:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Status must be 'implemented' or 'rejected'"
-        )
-    if db_suggestion["author_id"] != current_user["id"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to update this suggestion's status"
-        )
+    # Same rules as the bulk endpoint, admins may move any suggestion
+    failure = _check_transition(db_suggestion, new_status, current_user, is_admin(current_user["username"]))
+    if failure is not None:
+        status_code, detail = failure
+        raise HTTPException(status_code=status_code, detail=detail)
     updated_suggestion = await update_suggestion(
         db=db,
         suggestion_id=suggestion_id,
-        suggestion_update={"status": new_status}
+        suggestion_update={"status": new_status},
+        commit=False
     )
     author = await get_user(db, updated_suggestion["author_id"]) if updated_suggestion else None
     updated_suggestion = dict(updated_suggestion) if updated_suggestion else {}
@@ -255,19 +394,10 @@ async def update_suggestion_status(
         }
     else:
         updated_suggestion["author"] = None
-    # Add vote_count
-    updated_suggestion["vote_count"] = await get_suggestion_vote_count(db, updated_suggestion["id"])
-    from app.schemas import SuggestionUpdateMessage
-    import asyncio
     suggestion_update_msg = SuggestionUpdateMessage(suggestion=updated_suggestion)
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(manager.broadcast_suggestion_update(suggestion_update_msg))
-        else:
-            asyncio.run(manager.broadcast_suggestion_update(suggestion_update_msg))
-    except RuntimeError:
-        pass
+    event_id = await record_event(db, "suggestion_update", suggestion_update_msg.dict()["suggestion"])
+    await db.commit()
+    outbox.notify(event_id)
     return updated_suggestion
 
 
@@ -289,5 +419,8 @@ async def delete_suggestion_by_id(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to delete this suggestion"
         )
-    await delete_suggestion(db=db, suggestion_id=suggestion_id)
+    await delete_suggestion(db=db, suggestion_id=suggestion_id, commit=False)
+    event_id = await record_event(db, "suggestion_deleted", {"id": suggestion_id})
+    await db.commit()
+    outbox.notify(event_id)
     return {"message": "Suggestion deleted successfully"} 
\ No newline at end of file
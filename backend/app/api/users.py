@@ -0,0 +1,71 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.database import get_db
+from app.auth import get_current_active_user
+from app.crud import get_user, get_user_stats, get_user_suggestions, get_user_votes
+from app.schemas import Suggestion, UserStats, Vote
+from app.timing import TimedRoute
+
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
+
+
+@router.get("/me/suggestions", response_model=List[Suggestion])
+async def read_my_suggestions(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    include_archived: bool = False,
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get the caller's suggestions, newest first (async)"""
+    suggestions = await get_user_suggestions(
+        db=db, user_id=current_user["id"], skip=skip, limit=limit, include_archived=include_archived
+    )
+    author = {
+        "id": current_user["id"],
+        "username": current_user["username"],
+        "email": current_user["email"],
+        "is_active": current_user["is_active"],
+        "created_at": current_user["created_at"]
+    }
+    for s in suggestions:
+        s["author"] = author
+    return suggestions
+
+
+@router.get("/me/votes", response_model=List[Vote])
+async def read_my_votes(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    include_archived: bool = False,
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get the votes the caller cast, most recent first (async)"""
+    return await get_user_votes(
+        db=db, user_id=current_user["id"], skip=skip, limit=limit, include_archived=include_archived
+    )
+
+
+@router.get("/me/stats", response_model=UserStats)
+async def read_my_stats(
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get the caller's activity counters (async)"""
+    return await get_user_stats(db=db, user_id=current_user["id"])
+
+
+@router.get("/{user_id}/stats", response_model=UserStats)
+async def read_user_stats(
+    user_id: int,
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get a user's activity counters (async)"""
+    if await get_user(db, user_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return await get_user_stats(db=db, user_id=user_id)
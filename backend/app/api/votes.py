@@ -1,31 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
 from app.database import get_db
 from app.auth import get_current_active_user
-from app.crud import (
-    get_suggestion, get_user_vote, create_or_update_vote,
-    delete_vote, get_suggestion_vote_count
-)
+from app.crud import get_user_vote, create_or_update_vote, delete_vote, get_suggestion_vote_count
 from app.schemas import VoteCreate, User, VoteUpdateMessage
-from app.websocket_manager import manager
+from app.outbox import outbox, record_event
+from app.timing import TimedRoute
+from app.admission import limit_vote_rate
+from app.suggestion_meta import suggestion_meta
 
-router = APIRouter(prefix="/votes", tags=["votes"])
+router = APIRouter(prefix="/votes", tags=["votes"], route_class=TimedRoute)
 
 
 @router.post("/")
 async def create_vote(
     vote: VoteCreate,
     db = Depends(get_db),
-    current_user: dict = Depends(get_current_active_user)
+    current_user: dict = Depends(limit_vote_rate)
 ):
     """Create or update a vote on a suggestion (async)"""
-    suggestion = await get_suggestion(db=db, suggestion_id=vote.suggestion_id)
+    suggestion = await suggestion_meta.get(db, vote.suggestion_id)
     if suggestion is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Suggestion not found"
         )
-    if suggestion["author_id"] == current_user["id"]:
+    if suggestion.author_id == current_user["id"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot vote on your own suggestion"
@@ -33,25 +32,28 @@ async def create_vote(
     db_vote = await create_or_update_vote(
         db=db,
         vote=vote,
-        user_id=current_user["id"]
+        user_id=current_user["id"],
+        commit=False
     )
+    if db_vote is None:
+        suggestion_meta.remove(vote.suggestion_id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Suggestion not found"
+        )
     new_vote_count = await get_suggestion_vote_count(db=db, suggestion_id=vote.suggestion_id)
     user_vote = await get_user_vote(db=db, user_id=current_user["id"], suggestion_id=vote.suggestion_id)
     user_vote_value = user_vote["is_upvote"] if user_vote else None
     vote_update = VoteUpdateMessage(
         suggestion_id=vote.suggestion_id,
         new_vote_count=new_vote_count,
-        user_vote=user_vote_value
+        user_vote=user_vote_value,
+        user_id=current_user["id"],
+        is_upvote=user_vote_value
     )
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(manager.broadcast_vote_update(vote_update))
-        else:
-            asyncio.run(manager.broadcast_vote_update(vote_update))
-    except RuntimeError:
-        pass
+    event_id = await record_event(db, "vote_update", vote_update.dict())
+    await db.commit()
+    outbox.notify(event_id)
     return {
         "message": "Vote recorded successfully",
         "suggestion_id": vote.suggestion_id,
@@ -64,10 +66,10 @@ async def create_vote(
 async def remove_vote(
     suggestion_id: int,
     db = Depends(get_db),
-    current_user: dict = Depends(get_current_active_user)
+    current_user: dict = Depends(limit_vote_rate)
 ):
     """Remove a user's vote on a suggestion (async)"""
-    suggestion = await get_suggestion(db=db, suggestion_id=suggestion_id)
+    suggestion = await suggestion_meta.get(db, suggestion_id)
     if suggestion is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -79,22 +81,18 @@ async def remove_vote(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No vote found for this suggestion"
         )
-    await delete_vote(db=db, user_id=current_user["id"], suggestion_id=suggestion_id)
+    await delete_vote(db=db, user_id=current_user["id"], suggestion_id=suggestion_id, commit=False)
     new_vote_count = await get_suggestion_vote_count(db=db, suggestion_id=suggestion_id)
     vote_update = VoteUpdateMessage(
         suggestion_id=suggestion_id,
         new_vote_count=new_vote_count,
-        user_vote=None
+        user_vote=None,
+        user_id=current_user["id"],
+        is_upvote=None
     )
-    import asyncio
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(manager.broadcast_vote_update(vote_update))
-        else:
-            asyncio.run(manager.broadcast_vote_update(vote_update))
-    except RuntimeError:
-        pass
+    event_id = await record_event(db, "vote_update", vote_update.dict())
+    await db.commit()
+    outbox.notify(event_id)
     return {
         "message": "Vote removed successfully",
         "suggestion_id": suggestion_id,
@@ -110,7 +108,7 @@ async def get_vote_info(
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get vote information for a suggestion (async)"""
-    suggestion = await get_suggestion(db=db, suggestion_id=suggestion_id)
+    suggestion = await suggestion_meta.get(db, suggestion_id)
     if suggestion is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
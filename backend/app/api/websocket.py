@@ -1,48 +1,73 @@
-import json
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
-from app.auth import get_current_user
+from app.auth import get_current_user, get_current_active_user, get_user_for_token
 from app.websocket_manager import manager
-from app.database import get_db
+from app.snapshot import snapshot
+from app.outbox import outbox
+from app.database import get_db, connect_db
+from app.ws_protocol import negotiate, send_message, receive_message
+from app.timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+
+async def _token_user_id(websocket: WebSocket) -> Optional[int]:
+    """Id of the user the connection's bearer token (?access_token= or Authorization header) belongs to"""
+    token = websocket.query_params.get("access_token")
+    authorization = websocket.headers.get("authorization", "")
+    if token is None and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        return None
+    async with connect_db() as db:
+        user = await get_user_for_token(db, token)
+    return user["id"] if user else None
+
+
+@router.get("/ws/stats")
+async def websocket_stats(current_user: dict = Depends(get_current_active_user)):
+    """Get live vs zombie connection counts and outbox depth/latency"""
+    stats = manager.stats()
+    stats["outbox"] = outbox.stats()
+    return stats
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time communication"""
-    await websocket.accept()
+    codec, subprotocol = negotiate(websocket)
+    await websocket.accept(subprotocol=subprotocol)
     
     try:
         # Send connection confirmation
-        await websocket.send_text(json.dumps({
+        await send_message(websocket, codec, {
             "type": "connection_established",
             "message": "Connected to voting system"
-        }))
+        })
         
         # Keep connection alive and handle incoming messages
         while True:
             # Wait for messages from client
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            message = await receive_message(websocket, codec)
             
             # Handle different message types
             if message.get("type") == "ping":
-                await websocket.send_text(json.dumps({
+                await send_message(websocket, codec, {
                     "type": "pong",
                     "timestamp": message.get("timestamp")
-                }))
+                })
             elif message.get("type") == "subscribe":
                 # Client wants to subscribe to updates
-                await websocket.send_text(json.dumps({
+                await send_message(websocket, codec, {
                     "type": "subscribed",
                     "message": "Subscribed to real-time updates"
-                }))
+                })
             else:
                 # Unknown message type
-                await websocket.send_text(json.dumps({
+                await send_message(websocket, codec, {
                     "type": "error",
                     "message": "Unknown message type"
-                }))
+                })
                 
     except WebSocketDisconnect:
         # Handle client disconnection
@@ -50,10 +75,10 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         # Handle other errors
         try:
-            await websocket.send_text(json.dumps({
+            await send_message(websocket, codec, {
                 "type": "error",
                 "message": f"Error: {str(e)}"
-            }))
+            })
         except:
             pass
 
@@ -61,46 +86,63 @@ async def websocket_endpoint(websocket: WebSocket):
 @router.websocket("/ws/{user_id}")
 async def authenticated_websocket_endpoint(websocket: WebSocket, user_id: int):
     """Authenticated WebSocket endpoint for real-time communication"""
-    await websocket.accept()
+    codec, subprotocol = negotiate(websocket)
+    await websocket.accept(subprotocol=subprotocol)
     
     try:
-        # Connect to manager with user ID
-        await manager.connect(websocket, user_id)
+        # The path user_id is not authenticated: snapshots only carry a user's
+        # own votes when the connection's token belongs to that user
+        votes_user_id = user_id if await _token_user_id(websocket) == user_id else None
+
+        # Connect to manager with user ID and the negotiated encoding
+        await manager.connect(websocket, user_id, codec)
         
         # Send connection confirmation
-        await websocket.send_text(json.dumps({
+        await send_message(websocket, codec, {
             "type": "connection_established",
             "message": f"Connected as user {user_id}",
             "user_id": user_id
-        }))
+        })
+        # Optional initial state so clients do not need REST calls before rendering
+        if websocket.query_params.get("snapshot") in ("1", "true"):
+            await send_message(websocket, codec, await snapshot.message_for(votes_user_id))
         
         # Keep connection alive and handle incoming messages
         while True:
             # Wait for messages from client
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            message = await receive_message(websocket, codec)
+            manager.touch(websocket, user_id)
             
             # Handle different message types
             if message.get("type") == "ping":
-                await websocket.send_text(json.dumps({
+                await send_message(websocket, codec, {
                     "type": "pong",
                     "timestamp": message.get("timestamp"),
                     "user_id": user_id
-                }))
+                })
+            elif message.get("type") == "pong":
+                # Reply to a server heartbeat, touch() already recorded it
+                pass
             elif message.get("type") == "subscribe":
-                # Client wants to subscribe to updates
-                await websocket.send_text(json.dumps({
+                # Client wants to subscribe to updates, optionally for some suggestions only
+                suggestion_ids = message.get("suggestion_ids")
+                if suggestion_ids is not None:
+                    suggestion_ids = [int(i) for i in suggestion_ids]
+                manager.subscribe(websocket, user_id, suggestion_ids)
+                await send_message(websocket, codec, {
                     "type": "subscribed",
                     "message": "Subscribed to real-time updates",
                     "user_id": user_id
-                }))
+                })
+                if message.get("snapshot"):
+                    await send_message(websocket, codec, await snapshot.message_for(votes_user_id, suggestion_ids))
             else:
                 # Unknown message type
-                await websocket.send_text(json.dumps({
+                await send_message(websocket, codec, {
                     "type": "error",
                     "message": "Unknown message type",
                     "user_id": user_id
-                }))
+                })
                 
     except WebSocketDisconnect:
         # Handle client disconnection
@@ -108,11 +150,11 @@ async def authenticated_websocket_endpoint(websocket: WebSocket, user_id: int):
     except Exception as e:
         # Handle other errors
         try:
-            await websocket.send_text(json.dumps({
+            await send_message(websocket, codec, {
                 "type": "error",
                 "message": f"Error: {str(e)}",
                 "user_id": user_id
-            }))
+            })
         except:
             pass
         finally:
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from app.config import settings
+from app.crud import SUGGESTION_COLUMNS, VOTE_COLUMNS, next_change_version
+from app.database import connect_db
+from app.metrics import registry, Counter
+from app.outbox import outbox, record_event
+from app.suggestion_meta import suggestion_meta
+
+logger = logging.getLogger(__name__)
+
+CLOSED_STATUSES = ("implemented", "rejected")
+
+archived_suggestions = registry.register(Counter(
+    "archive_suggestions_total", "Closed suggestions moved to the archive tables"))
+archived_votes = registry.register(Counter(
+    "archive_votes_total", "Votes moved to the archive tables"))
+
+
+async def _archivable_ids(db, grace_days: float, limit: int) -> List[int]:
+    cursor = await db.execute(
+        f"""
+        SELECT id FROM suggestions
+        WHERE status IN ({', '.join('?' for _ in CLOSED_STATUSES)})
+          AND COALESCE(updated_at, created_at) < datetime('now', ?)
+        ORDER BY id
+        LIMIT ?
+        """,
+        (*CLOSED_STATUSES, f"-{grace_days} days", limit)
+    )
+    return [row["id"] for row in await cursor.fetchall()]
+
+
+def _forget_archived(suggestion_ids: List[int]):
+    """Drop archived suggestions from this worker's metadata cache"""
+    for suggestion_id in suggestion_ids:
+        suggestion_meta.remove(suggestion_id)
+
+
+async def archive_chunk(db, suggestion_ids: List[int]) -> Tuple[int, int]:
+    """Move suggestions and their votes to the archive tables in one transaction (async)
+
+    Returns the number of suggestions and votes moved.
+    """
+    # Every worker runs the archiver; taking the write lock up front and checking
+    # the rows again means a chunk another worker already moved is skipped instead
+    # of getting a second set of tombstones and events
+    await db.execute("BEGIN IMMEDIATE")
+    marks = ", ".join("?" for _ in suggestion_ids)
+    cursor = await db.execute(
+        f"SELECT id FROM suggestions WHERE id IN ({marks}) "
+        f"AND status IN ({', '.join('?' for _ in CLOSED_STATUSES)}) ORDER BY id",
+        (*suggestion_ids, *CLOSED_STATUSES)
+    )
+    suggestion_ids = [row["id"] for row in await cursor.fetchall()]
+    if not suggestion_ids:
+        await db.rollback()
+        return 0, 0
+    marks = ", ".join("?" for _ in suggestion_ids)
+    params = tuple(suggestion_ids)
+    # The final tally is stored with the row, archived suggestions never change again
+    await db.execute(
+        f"""
+        INSERT OR REPLACE INTO suggestions_archive ({SUGGESTION_COLUMNS}, vote_count, archived_at)
+        SELECT s.id, s.title, s.description, s.category, s.status, s.author_id,
+               s.created_at, s.updated_at, s.version,
+               COALESCE(t.vote_count, 0), CURRENT_TIMESTAMP
+        FROM suggestions s
+        LEFT JOIN (
+            SELECT suggestion_id, SUM(CASE WHEN is_upvote THEN 1 ELSE -1 END) AS vote_count
+            FROM votes WHERE suggestion_id IN ({marks}) GROUP BY suggestion_id
+        ) t ON t.suggestion_id = s.id
+        WHERE s.id IN ({marks})
+        """,
+        params + params
+    )
+    await db.execute(
+        f"INSERT OR REPLACE INTO votes_archive ({VOTE_COLUMNS}) "
+        f"SELECT {VOTE_COLUMNS} FROM votes WHERE suggestion_id IN ({marks})",
+        params
+    )
+    votes = await db.execute(f"DELETE FROM votes WHERE suggestion_id IN ({marks})", params)
+    await db.execute(f"DELETE FROM suggestions WHERE id IN ({marks})", params)
+    db.after_commit(lambda: _forget_archived(suggestion_ids))
+    # Delta-sync clients and other workers drop archived suggestions like deleted ones
+    event_id = None
+    for suggestion_id in suggestion_ids:
+        await db.execute(
+            "INSERT OR REPLACE INTO suggestion_tombstones (suggestion_id, version) VALUES (?, ?)",
+            (suggestion_id, await next_change_version(db))
+        )
+        event_id = await record_event(db, "suggestion_deleted", {"id": suggestion_id})
+    await db.commit()
+    outbox.notify(event_id)
+    archived_suggestions.inc(amount=len(suggestion_ids))
+    archived_votes.inc(amount=max(votes.rowcount, 0))
+    return len(suggestion_ids), max(votes.rowcount, 0)
+
+
+async def archive_closed_suggestions(db=None, grace_days: Optional[float] = None,
+                                     chunk_size: Optional[int] = None) -> dict:
+    """Archive every closed suggestion past the grace period, one chunk per transaction (async)"""
+    if db is None:
+        async with connect_db() as db:
+            return await archive_closed_suggestions(db, grace_days, chunk_size)
+    grace_days = settings.ARCHIVE_GRACE_DAYS if grace_days is None else grace_days
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+    totals = {"suggestions": 0, "votes": 0}
+    while True:
+        suggestion_ids = await _archivable_ids(db, grace_days, chunk_size)
+        if not suggestion_ids:
+            return totals
+        moved, votes = await archive_chunk(db, suggestion_ids)
+        totals["suggestions"] += moved
+        totals["votes"] += votes
+        # Short transactions, let request handlers take the write lock in between
+        await asyncio.sleep(0)
+
+
+class Archiver:
+    """Background task that archives closed suggestions every ARCHIVE_INTERVAL seconds"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            try:
+                totals = await archive_closed_suggestions()
+                if totals["suggestions"]:
+                    logger.info("Archived %d suggestions and %d votes", totals["suggestions"], totals["votes"])
+            except Exception:
+                # Database busy or locked, retry on the next run
+                logger.exception("Archiving closed suggestions failed")
+            await asyncio.sleep(settings.ARCHIVE_INTERVAL)
+
+    def start(self):
+        """Start the archiver task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the archiver task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global archiver instance
+archiver = Archiver()
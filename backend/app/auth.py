@@ -1,14 +1,17 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
 from app.database import get_db
 from app.schemas import TokenData
 from app.crud import get_user_by_username
+from app.timing import timed
+from app.sessions import session_store
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -35,11 +38,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # jti lets a single access token be revoked before it expires
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+def issue_access_token(username: str) -> str:
+    """Access token for a user who just logged in or refreshed a session"""
+    return create_access_token(
+        data={"sub": username}, expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
 def verify_token(token: str) -> Optional[TokenData]:
     """Verify and decode a JWT token"""
     try:
@@ -47,29 +58,53 @@ def verify_token(token: str) -> Optional[TokenData]:
         username = payload.get("sub")
         if username is None:
             return None
-        token_data = TokenData(username=username)
+        token_data = TokenData(username=username, jti=payload.get("jti"), expires_at=payload.get("exp"))
         return token_data
     except JWTError:
         return None
 
 
-async def get_current_user(
+async def get_user_for_token(db, token: Optional[str]):
+    """Active user a bearer token belongs to, None if it is invalid, revoked or the user inactive (async)"""
+    token_data = verify_token(token) if token else None
+    if token_data is None:
+        return None
+    if token_data.jti and await session_store.is_revoked(token_data.jti, db):
+        return None
+    user = await get_user_by_username(db, token_data.username)
+    if user is None or not user["is_active"]:
+        return None
+    return user
+
+
+async def get_current_token(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db = Depends(get_db)
-):
-    """Get the current authenticated user (async)"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    token = credentials.credentials
-    token_data = verify_token(token)
+) -> TokenData:
+    """Decoded bearer token of the request, rejected if invalid or revoked (async)"""
+    with timed("auth"):
+        token_data = verify_token(credentials.credentials)
+        if token_data is not None and token_data.jti and await session_store.is_revoked(token_data.jti, db):
+            token_data = None
     if token_data is None:
-        raise credentials_exception
-    user = await get_user_by_username(db, token_data.username)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+
+async def get_current_user(token_data: TokenData = Depends(get_current_token), db = Depends(get_db)):
+    """Get the current authenticated user (async)"""
+    with timed("auth"):
+        user = await get_user_by_username(db, token_data.username)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 async def get_current_active_user(current_user: dict = Depends(get_current_user)):
@@ -78,11 +113,24 @@ async def get_current_active_user(current_user: dict = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def is_admin(username: Optional[str]) -> bool:
+    """Whether a username is listed in ADMIN_USERNAMES"""
+    admins = [name.strip() for name in settings.ADMIN_USERNAMES.split(",")]
+    return bool(username) and username in admins
+
+async def get_current_admin_user(current_user: dict = Depends(get_current_active_user)):
+    """Get the current user if they are an administrator (async)"""
+    if not is_admin(current_user["username"]):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
+
 async def authenticate_user(db, username: str, password: str):
     """Authenticate a user with username and password (async)"""
-    user = await get_user_by_username(db, username)
-    if not user:
-        return None
-    if not verify_password(password, user["hashed_password"]):
-        return None
+    with timed("auth"):
+        user = await get_user_by_username(db, username)
+        if not user:
+            return None
+        # bcrypt takes ~100 ms of CPU, keep it off the event loop
+        if not await run_in_threadpool(verify_password, password, user["hashed_password"]):
+            return None
     return user 
\ No newline at end of file
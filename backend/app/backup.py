@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import get_db_path
+from app.metrics import registry, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+backups = registry.register(Counter(
+    "db_backups_total", "Online database backups by result", ("result",)))
+backup_in_progress = registry.register(Gauge(
+    "db_backup_in_progress", "1 while a backup is copying pages, to line up with request latency"))
+backup_duration = registry.register(Gauge(
+    "db_backup_duration_seconds", "Duration of the last successful backup"))
+backup_size = registry.register(Gauge(
+    "db_backup_size_bytes", "Size of the last successful backup file"))
+backup_last_success = registry.register(Gauge(
+    "db_backup_last_success_timestamp_seconds", "Unix time of the last successful backup"))
+
+
+# <database name>-YYYYmmdd-HHMMSS[-n].db[.gz]
+BACKUP_NAME = re.compile(r"(\d{8}-\d{6})(?:-(\d+))?\.db(?:\.gz)?")
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _backup_prefix(db_path: str) -> str:
+    return os.path.splitext(os.path.basename(db_path))[0] + "-"
+
+
+def list_backups(backup_dir: Optional[str] = None, db_path: Optional[str] = None) -> List[dict]:
+    """Backups of the database in backup_dir, newest first"""
+    backup_dir = backup_dir or settings.BACKUP_DIR
+    prefix = _backup_prefix(db_path or get_db_path())
+    if not os.path.isdir(backup_dir):
+        return []
+    found = []
+    for name in os.listdir(backup_dir):
+        match = BACKUP_NAME.fullmatch(name[len(prefix):]) if name.startswith(prefix) else None
+        if match is None:
+            continue
+        path = os.path.join(backup_dir, name)
+        stat = os.stat(path)
+        # Names embed the UTC time and a counter for backups taken in the same second
+        order = (match.group(1), int(match.group(2) or 0))
+        found.append((order, {"file": name, "path": path, "size": stat.st_size, "created_at": stat.st_mtime}))
+    found.sort(key=lambda item: item[0], reverse=True)
+    return [backup for _, backup in found]
+
+
+def prune_backups(keep: int, backup_dir: Optional[str] = None, db_path: Optional[str] = None) -> List[str]:
+    """Delete all but the newest `keep` backups (0 keeps everything)"""
+    if keep <= 0:
+        return []
+    removed = []
+    for backup in list_backups(backup_dir, db_path)[keep:]:
+        os.remove(backup["path"])
+        removed.append(backup["file"])
+    return removed
+
+
+def _copy_pages(source: sqlite3.Connection, target: sqlite3.Connection, pages: int, sleep: float,
+                max_restarts: int) -> dict:
+    stats = {"steps": 0, "restarts": 0, "pages": 0}
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal last_remaining
+        stats["steps"] += 1
+        stats["pages"] = total
+        # A write from another connection makes SQLite start the copy over
+        if last_remaining is not None and remaining > last_remaining:
+            stats["restarts"] += 1
+            if stats["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining = remaining
+
+    try:
+        source.backup(target, pages=pages, progress=progress, sleep=sleep)
+        stats["mode"] = "stepped"
+    except _TooManyRestarts:
+        # Writers keep invalidating the copy: take it in one step under a read lock instead
+        source.backup(target, pages=-1)
+        stats["mode"] = "single_step"
+    return stats
+
+
+def create_backup(db_path: Optional[str] = None, backup_dir: Optional[str] = None,
+                  compress: Optional[bool] = None) -> dict:
+    """Copy the live database page by page into a new backup file (blocking)"""
+    db_path = db_path or get_db_path()
+    backup_dir = backup_dir or settings.BACKUP_DIR
+    compress = settings.BACKUP_COMPRESS if compress is None else compress
+    os.makedirs(backup_dir, exist_ok=True)
+    name = _backup_prefix(db_path) + time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+    path = os.path.join(backup_dir, name + ".db")
+    suffix = 1
+    while os.path.exists(path) or os.path.exists(path + ".gz"):
+        path = os.path.join(backup_dir, f"{name}-{suffix}.db")
+        suffix += 1
+    partial = path + ".partial"
+
+    start = time.perf_counter()
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(partial)
+    try:
+        stats = _copy_pages(source, target, settings.BACKUP_PAGES_PER_STEP, settings.BACKUP_STEP_SLEEP,
+                            settings.BACKUP_MAX_RESTARTS)
+        check = target.execute("PRAGMA quick_check").fetchone()[0]
+        if check != "ok":
+            raise RuntimeError(f"backup failed quick_check: {check}")
+    except BaseException:
+        target.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        source.close()
+    target.close()
+
+    if compress:
+        with open(partial, "rb") as src, gzip.open(path + ".gz.partial", "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.remove(partial)
+        partial, path = path + ".gz.partial", path + ".gz"
+    # Only complete backups ever carry the final name
+    os.replace(partial, path)
+    stats.update({
+        "file": os.path.basename(path),
+        "path": path,
+        "size": os.path.getsize(path),
+        "compressed": compress,
+        "seconds": time.perf_counter() - start,
+    })
+    return stats
+
+
+def restore_backup(backup_path: str, db_path: Optional[str] = None) -> str:
+    """Replace the database with a backup, keeping the current file next to it (blocking)"""
+    db_path = db_path or get_db_path()
+    source_path = backup_path
+    previous = db_path + ".before-restore"
+    if backup_path.endswith(".gz"):
+        source_path = db_path + ".restore"
+        with gzip.open(backup_path, "rb") as src, open(source_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    source = None
+    try:
+        source = sqlite3.connect(source_path)
+        if source.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+            raise RuntimeError(f"{backup_path} failed integrity_check")
+        if os.path.exists(db_path):
+            current, copy = sqlite3.connect(db_path), sqlite3.connect(previous)
+            try:
+                current.backup(copy)
+            finally:
+                copy.close()
+                current.close()
+        target = sqlite3.connect(db_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        if source is not None:
+            source.close()
+        if source_path != backup_path and os.path.exists(source_path):
+            os.remove(source_path)
+    return previous
+
+
+class BackupManager:
+    """Runs one backup at a time in a worker thread, on demand or every BACKUP_INTERVAL seconds"""
+
+    def __init__(self):
+        self.running = False
+        self.last: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self, compress: Optional[bool] = None) -> dict:
+        """Take a backup and apply the retention policy"""
+        self.running = True
+        backup_in_progress.set(1)
+        try:
+            result = await run_in_threadpool(create_backup, None, None, compress)
+            result["pruned"] = await run_in_threadpool(prune_backups, settings.BACKUP_RETENTION)
+        except Exception:
+            backups.inc("failure")
+            raise
+        finally:
+            backup_in_progress.set(0)
+            self.running = False
+        backups.inc("success")
+        backup_duration.set(result["seconds"])
+        backup_size.set(result["size"])
+        backup_last_success.set(time.time())
+        self.last = result
+        return result
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.BACKUP_INTERVAL)
+            if self.running:
+                continue
+            try:
+                result = await self.run()
+                logger.info("Backup %s written in %.1f s", result["file"], result["seconds"])
+            except Exception:
+                logger.exception("Scheduled backup failed")
+
+    def start(self):
+        """Start scheduled backups"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop scheduled backups"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global backup manager instance
+backup_manager = BackupManager()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Online backups of the voting database. create and list are safe while the API "
+                    "is serving traffic, stop the API before restore."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="take a backup now")
+    create.add_argument("--compress", action="store_true", default=None)
+    commands.add_parser("list", help="list backups, newest first")
+    restore = commands.add_parser("restore", help="replace the database with a backup (stop the API first)")
+    restore.add_argument("backup")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        result = create_backup(compress=args.compress)
+        pruned = prune_backups(settings.BACKUP_RETENTION)
+        print(f"{result['path']} ({result['size']} bytes, {result['seconds']:.1f} s, "
+              f"{result['restarts']} restarts, {result['mode']})")
+        for name in pruned:
+            print(f"removed {name}")
+    elif args.command == "list":
+        for backup in list_backups():
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(backup["created_at"]))
+            print(f"{created}  {backup['size']:>12}  {backup['path']}")
+    else:
+        previous = restore_backup(args.backup)
+        print(f"restored {args.backup} into {get_db_path()}, previous database kept as {previous}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,117 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173,https://advanced-voting-system.netlify.app").split(",")
     
+    # WebSocket (permessage-deflate is negotiated per connection by the client)
+    WS_PER_MESSAGE_DEFLATE: bool = os.getenv("WS_PER_MESSAGE_DEFLATE", "True").lower() == "true"
+    # Server pings clients idle for this long and drops them after WS_IDLE_TIMEOUT seconds
+    WS_HEARTBEAT_INTERVAL: float = float(os.getenv("WS_HEARTBEAT_INTERVAL", "25"))
+    WS_IDLE_TIMEOUT: float = float(os.getenv("WS_IDLE_TIMEOUT", "60"))
+    WS_HEARTBEAT_TICK: float = float(os.getenv("WS_HEARTBEAT_TICK", "1"))
+    # A client that takes longer than this to accept one frame is dropped
+    WS_SEND_TIMEOUT: float = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+    
+    # Server-Sent Events: events kept for Last-Event-ID resumption, frames queued per client
+    SSE_REPLAY_BUFFER: int = int(os.getenv("SSE_REPLAY_BUFFER", "1000"))
+    SSE_MAX_QUEUE: int = int(os.getenv("SSE_MAX_QUEUE", "256"))
+    
+    # Realtime outbox dispatcher
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+    # Seconds dispatched events are kept so every worker's dispatcher can read them
+    OUTBOX_RETENTION: float = float(os.getenv("OUTBOX_RETENTION", "3600"))
+    
+    # Statements at least this slow are logged with their query plan
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "200"))
+    SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "True").lower() == "true"
+    
+    # Per-route latency histograms and Server-Timing response headers
+    TIMING_ENABLED: bool = os.getenv("TIMING_ENABLED", "True").lower() == "true"
+    
+    # Comma separated usernames allowed to use the /api/admin endpoints and X-Profile
+    ADMIN_USERNAMES: str = os.getenv("ADMIN_USERNAMES", "")
+    
+    # Profiling: functions listed in reports, longest sampling run, event loop block warning (0 disables)
+    PROFILE_TOP_FUNCTIONS: int = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+    LOOP_BLOCK_THRESHOLD_MS: float = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+    
+    # Admission control: concurrent requests and queued waiters per route class
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "True").lower() == "true"
+    ADMISSION_AUTH_LIMIT: int = int(os.getenv("ADMISSION_AUTH_LIMIT", "4"))
+    ADMISSION_AUTH_QUEUE: int = int(os.getenv("ADMISSION_AUTH_QUEUE", "32"))
+    ADMISSION_READ_LIMIT: int = int(os.getenv("ADMISSION_READ_LIMIT", "64"))
+    ADMISSION_READ_QUEUE: int = int(os.getenv("ADMISSION_READ_QUEUE", "256"))
+    ADMISSION_WRITE_LIMIT: int = int(os.getenv("ADMISSION_WRITE_LIMIT", "8"))
+    ADMISSION_WRITE_QUEUE: int = int(os.getenv("ADMISSION_WRITE_QUEUE", "128"))
+    ADMISSION_WS_ACCEPT_LIMIT: int = int(os.getenv("ADMISSION_WS_ACCEPT_LIMIT", "32"))
+    ADMISSION_WS_ACCEPT_QUEUE: int = int(os.getenv("ADMISSION_WS_ACCEPT_QUEUE", "256"))
+    # Longest wait for a slot before shedding, and the Retry-After sent with 503
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+    ADMISSION_RETRY_AFTER: float = float(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+    
+    # Per-user vote token bucket (0 disables)
+    VOTE_RATE_PER_SECOND: float = float(os.getenv("VOTE_RATE_PER_SECOND", "5"))
+    VOTE_RATE_BURST: float = float(os.getenv("VOTE_RATE_BURST", "20"))
+    
+    # Load caches (vote tallies) during startup instead of on the first request
+    STARTUP_PREWARM: bool = os.getenv("STARTUP_PREWARM", "True").lower() == "true"
+    
+    # Hot/archive partitioning: closed suggestions move to the archive tables after the grace period
+    ARCHIVE_ENABLED: bool = os.getenv("ARCHIVE_ENABLED", "True").lower() == "true"
+    ARCHIVE_GRACE_DAYS: float = float(os.getenv("ARCHIVE_GRACE_DAYS", "30"))
+    ARCHIVE_CHUNK_SIZE: int = int(os.getenv("ARCHIVE_CHUNK_SIZE", "50"))
+    ARCHIVE_INTERVAL: float = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+    
+    # Online backups: destination, schedule (0 = on demand only), files kept (0 = all), gzip
+    BACKUP_DIR: str = os.getenv("BACKUP_DIR", "./backups")
+    BACKUP_INTERVAL: float = float(os.getenv("BACKUP_INTERVAL", "0"))
+    BACKUP_RETENTION: int = int(os.getenv("BACKUP_RETENTION", "7"))
+    BACKUP_COMPRESS: bool = os.getenv("BACKUP_COMPRESS", "False").lower() == "true"
+    # Pages copied per backup step and the pause between steps, during which writers run;
+    # after BACKUP_MAX_RESTARTS restarts caused by writes the copy is taken in one step
+    BACKUP_PAGES_PER_STEP: int = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+    BACKUP_STEP_SLEEP: float = float(os.getenv("BACKUP_STEP_SLEEP", "0.005"))
+    BACKUP_MAX_RESTARTS: int = int(os.getenv("BACKUP_MAX_RESTARTS", "20"))
+    
+    # Database maintenance: seconds between runs of each task (0 disables it). analyze and
+    # incremental_vacuum only run inside MAINTENANCE_WINDOW ("HH:MM-HH:MM" local time, empty = any
+    # time), and no task runs while more than MAINTENANCE_MAX_IN_FLIGHT requests are being served
+    MAINTENANCE_ENABLED: bool = os.getenv("MAINTENANCE_ENABLED", "True").lower() == "true"
+    MAINTENANCE_TICK: float = float(os.getenv("MAINTENANCE_TICK", "10"))
+    MAINTENANCE_WINDOW: str = os.getenv("MAINTENANCE_WINDOW", "02:00-05:00")
+    MAINTENANCE_MAX_IN_FLIGHT: int = int(os.getenv("MAINTENANCE_MAX_IN_FLIGHT", "4"))
+    MAINTENANCE_CHECKPOINT_INTERVAL: float = float(os.getenv("MAINTENANCE_CHECKPOINT_INTERVAL", "60"))
+    MAINTENANCE_OPTIMIZE_INTERVAL: float = float(os.getenv("MAINTENANCE_OPTIMIZE_INTERVAL", "3600"))
+    MAINTENANCE_ANALYZE_INTERVAL: float = float(os.getenv("MAINTENANCE_ANALYZE_INTERVAL", "86400"))
+    MAINTENANCE_VACUUM_INTERVAL: float = float(os.getenv("MAINTENANCE_VACUUM_INTERVAL", "3600"))
+    MAINTENANCE_PURGE_INTERVAL: float = float(os.getenv("MAINTENANCE_PURGE_INTERVAL", "3600"))
+    # WAL checkpoints are PASSIVE until the log reaches this size, then TRUNCATE
+    MAINTENANCE_WAL_TRUNCATE_BYTES: int = int(os.getenv("MAINTENANCE_WAL_TRUNCATE_BYTES", str(64 * 1024 * 1024)))
+    # Incremental vacuum starts at this many free pages and frees at most MAINTENANCE_VACUUM_PAGES per run
+    MAINTENANCE_VACUUM_MIN_FREE_PAGES: int = int(os.getenv("MAINTENANCE_VACUUM_MIN_FREE_PAGES", "1000"))
+    MAINTENANCE_VACUUM_PAGES: int = int(os.getenv("MAINTENANCE_VACUUM_PAGES", "5000"))
+    
+    # Most status transitions accepted by one bulk moderation request
+    BULK_STATUS_MAX_ITEMS: int = int(os.getenv("BULK_STATUS_MAX_ITEMS", "500"))
+    
+    # Columnar vote analytics (/api/analytics, needs numpy): loaded at startup, queued vote
+    # changes are merged into the arrays before each query or once this many are pending
+    ANALYTICS_ENABLED: bool = os.getenv("ANALYTICS_ENABLED", "True").lower() == "true"
+    ANALYTICS_FLUSH_PENDING: int = int(os.getenv("ANALYTICS_FLUSH_PENDING", "10000"))
+    
+    # Near-duplicate detection (MinHash/LSH, needs numpy): suggestions whose shingle Jaccard
+    # similarity reaches DEDUP_THRESHOLD are reported; index edits are merged in batches
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "True").lower() == "true"
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.5"))
+    DEDUP_FLUSH_PENDING: int = int(os.getenv("DEDUP_FLUSH_PENDING", "1000"))
+    
     # Redis (for session storage)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     
+    # Refresh-token sessions: memory (single process), sqlite (single node) or redis
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "sqlite")
+    REFRESH_TOKEN_EXPIRE_DAYS: float = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+    
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "production")
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
@@ -1,7 +1,10 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func, select, case
-from typing import List, Optional, Dict
+import functools
+import time
+from typing import List, Optional, Dict, Tuple
 from app.schemas import UserCreate, SuggestionCreate, VoteCreate
+from app.config import settings
+from app.dedup import similarity_index, shingles, jaccard
+from app.suggestion_meta import suggestion_meta
 import aiosqlite
 
 
@@ -12,6 +15,16 @@ async def get_user(db, user_id: int):
     row = await cursor.fetchone()
     return dict(row) if row else None
 
+async def get_users_by_ids(db, user_ids: List[int]) -> Dict[int, Dict]:
+    """Get id -> user for a batch of ids in one query (async)"""
+    if not user_ids:
+        return {}
+    placeholders = ", ".join("?" * len(user_ids))
+    cursor = await db.execute(
+        f"SELECT id, username, email, is_active, created_at FROM users WHERE id IN ({placeholders})", tuple(user_ids)
+    )
+    return {row["id"]: dict(row) for row in await cursor.fetchall()}
+
 async def get_user_by_username(db, username: str):
     """Get user by username (async)"""
     cursor = await db.execute("SELECT id, username, email, is_active, created_at, hashed_password FROM users WHERE username = ?", (username,))
@@ -25,19 +38,6 @@ async def get_user_by_email(db, email: str):
     return dict(row) if row else None
 
 
-def create_user(db: Session, user: UserCreate, hashed_password: str) -> Dict:
-    """Create a new user"""
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return dict(db_user)
-
-
 async def create_user_async(db, user: UserCreate, hashed_password: str) -> Dict:
     """Create a new user asynchronously using aiosqlite"""
     query = """
@@ -54,16 +54,65 @@ async def create_user_async(db, user: UserCreate, hashed_password: str) -> Dict:
     return None
 
 
+# Change versions for delta sync
+async def next_change_version(db) -> int:
+    """Take the next change version inside the caller's write transaction (async)"""
+    await db.execute("UPDATE sync_state SET version = version + 1 WHERE id = 1")
+    cursor = await db.execute("SELECT version FROM sync_state WHERE id = 1")
+    row = await cursor.fetchone()
+    return row[0]
+
+async def get_suggestion_changes(db, since: int, limit: int = 500) -> Dict:
+    """Get suggestions changed and ids deleted after a change version (async)"""
+    cursor = await db.execute(
+        "SELECT * FROM suggestions WHERE version > ? ORDER BY version LIMIT ?", (since, limit + 1)
+    )
+    changed = [dict(row) for row in await cursor.fetchall()]
+    cursor = await db.execute(
+        "SELECT suggestion_id, version FROM suggestion_tombstones WHERE version > ? ORDER BY version LIMIT ?",
+        (since, limit + 1)
+    )
+    deleted = [dict(row) for row in await cursor.fetchall()]
+    # Merge both streams by version and cut at the limit
+    merged = sorted(
+        [(s["version"], "changed", s) for s in changed] + [(d["version"], "deleted", d) for d in deleted],
+        key=lambda item: item[0]
+    )
+    page = merged[:limit]
+    return {
+        "version": page[-1][0] if page else since,
+        "has_more": len(merged) > limit,
+        "changed": [item for _, kind, item in page if kind == "changed"],
+        "deleted": [item["suggestion_id"] for _, kind, item in page if kind == "deleted"],
+    }
+
+
 # Suggestion CRUD operations (async)
-async def get_suggestion(db, suggestion_id: int):
-    """Get suggestion by ID (async)"""
+# Hot and archived suggestions as one relation, for explicit include_archived reads. Hot rows
+# carry the tally the vote write paths keep current, archived rows the final one.
+SUGGESTION_COLUMNS = "id, title, description, category, status, author_id, created_at, updated_at, version"
+VOTE_COLUMNS = "suggestion_id, user_id, is_upvote, created_at"
+ALL_SUGGESTIONS = f"""
+    (SELECT {SUGGESTION_COLUMNS}, vote_count, 0 AS archived FROM suggestions
+     UNION ALL
+     SELECT {SUGGESTION_COLUMNS}, vote_count, 1 AS archived FROM suggestions_archive)
+"""
+
+async def get_suggestion(db, suggestion_id: int, include_archived: bool = False):
+    """Get suggestion by ID, falling back to the archive if asked to (async)"""
     cursor = await db.execute("SELECT * FROM suggestions WHERE id = ?", (suggestion_id,))
     row = await cursor.fetchone()
+    if row is None and include_archived:
+        cursor = await db.execute(
+            f"SELECT {SUGGESTION_COLUMNS}, vote_count, 1 AS archived FROM suggestions_archive WHERE id = ?",
+            (suggestion_id,)
+        )
+        row = await cursor.fetchone()
     return dict(row) if row else None
 
-async def get_suggestions(db, skip: int = 0, limit: int = 100, category: Optional[str] = None, status: Optional[str] = None, user_id: int = None):
+async def get_suggestions(db, skip: int = 0, limit: int = 100, category: Optional[str] = None, status: Optional[str] = None, user_id: int = None, include_archived: bool = False):
     """Get suggestions with optional filtering (async)"""
-    query = "SELECT * FROM suggestions WHERE 1=1"
+    query = f"SELECT * FROM {ALL_SUGGESTIONS if include_archived else 'suggestions'} WHERE 1=1"
     params = []
     if category is not None:
         query += " AND category = ?"
@@ -80,19 +129,26 @@ async def get_suggestions(db, skip: int = 0, limit: int = 100, category: Optiona
     rows = await cursor.fetchall()
     return [dict(row) for row in rows]
 
-async def create_suggestion(db, suggestion: SuggestionCreate, author_id: int):
+async def create_suggestion(db, suggestion: SuggestionCreate, author_id: int, commit: bool = True):
     """Create a new suggestion (async)"""
     query = """
-        INSERT INTO suggestions (title, description, category, author_id, status, created_at)
-        VALUES (?, ?, ?, ?, 'active', CURRENT_TIMESTAMP)
+        INSERT INTO suggestions (title, description, category, author_id, status, created_at, version)
+        VALUES (?, ?, ?, ?, 'active', CURRENT_TIMESTAMP, ?)
     """
-    await db.execute(query, (suggestion.title, suggestion.description, suggestion.category, author_id))
-    await db.commit()
-    cursor = await db.execute("SELECT * FROM suggestions WHERE rowid = last_insert_rowid()")
+    version = await next_change_version(db)
+    cursor = await db.execute(query, (suggestion.title, suggestion.description, suggestion.category, author_id, version))
+    suggestion_id = cursor.lastrowid
+    await _bump_user_stats(db, author_id, suggestions=1)
+    cursor = await db.execute("SELECT * FROM suggestions WHERE id = ?", (suggestion_id,))
     row = await cursor.fetchone()
+    if row:
+        db.after_commit(functools.partial(
+            suggestion_meta.set, row["id"], row["author_id"], row["status"], row["version"]))
+    if commit:
+        await db.commit()
     return dict(row) if row else None
 
-async def update_suggestion(db, suggestion_id: int, suggestion_update: dict):
+async def update_suggestion(db, suggestion_id: int, suggestion_update: dict, commit: bool = True):
     """Update a suggestion (async)"""
     # Build dynamic update query
     fields = []
@@ -104,45 +160,214 @@ async def update_suggestion(db, suggestion_id: int, suggestion_update: dict):
     if not fields:
         return await get_suggestion(db, suggestion_id)
     fields.append("updated_at = CURRENT_TIMESTAMP")
+    fields.append("version = ?")
+    values.append(await next_change_version(db))
     query = f"UPDATE suggestions SET {', '.join(fields)} WHERE id = ?"
     values.append(suggestion_id)
     await db.execute(query, tuple(values))
-    await db.commit()
-    return await get_suggestion(db, suggestion_id)
+    suggestion = await get_suggestion(db, suggestion_id)
+    if suggestion:
+        db.after_commit(functools.partial(
+            suggestion_meta.set, suggestion_id, suggestion["author_id"], suggestion["status"], suggestion["version"]))
+    if commit:
+        await db.commit()
+    return suggestion
 
-async def delete_suggestion(db, suggestion_id: int):
+async def delete_suggestion(db, suggestion_id: int, commit: bool = True):
     """Delete a suggestion (async)"""
+    # Take the version (and the write lock) before reading the tally the author loses
+    version = await next_change_version(db)
+    cursor = await db.execute("SELECT author_id FROM suggestions WHERE id = ?", (suggestion_id,))
+    row = await cursor.fetchone()
+    if row is not None:
+        score = await get_suggestion_vote_count(db, suggestion_id)
+        await _bump_user_stats(db, row["author_id"], suggestions=-1, score_received=-score)
     await db.execute("DELETE FROM suggestions WHERE id = ?", (suggestion_id,))
-    await db.commit()
+    db.after_commit(functools.partial(suggestion_meta.remove, suggestion_id))
+    await db.execute(
+        "INSERT OR REPLACE INTO suggestion_tombstones (suggestion_id, version) VALUES (?, ?)",
+        (suggestion_id, version)
+    )
+    if commit:
+        await db.commit()
     return True
 
 
+async def get_similar_suggestions(db, title: str, description: str, limit: int = 5, exclude_id: Optional[int] = None) -> List[Dict]:
+    """Suggestions whose text is nearly the same, most similar first (async)"""
+    await similarity_index.ensure_loaded()
+    candidates = similarity_index.candidates(title, description, exclude_id)
+    if not candidates:
+        return []
+    # LSH candidates are verified against the exact shingle Jaccard similarity
+    marks = ",".join("?" * len(candidates))
+    cursor = await db.execute(
+        f"SELECT id, title, description, category, status FROM suggestions WHERE id IN ({marks})",
+        candidates
+    )
+    target = shingles(title, description)
+    similar = []
+    for row in await cursor.fetchall():
+        similarity = jaccard(target, shingles(row["title"], row["description"]))
+        if similarity >= settings.DEDUP_THRESHOLD:
+            similar.append({
+                "id": row["id"], "title": row["title"], "category": row["category"],
+                "status": row["status"], "similarity": round(similarity, 3)
+            })
+    similar.sort(key=lambda s: (-s["similarity"], s["id"]))
+    return similar[:limit]
+
+async def get_suggestions_by_ids(db, suggestion_ids: List[int]) -> Dict[int, Dict]:
+    """Get id -> suggestion for a batch of ids in one query (async)"""
+    if not suggestion_ids:
+        return {}
+    placeholders = ", ".join("?" * len(suggestion_ids))
+    cursor = await db.execute(f"SELECT * FROM suggestions WHERE id IN ({placeholders})", tuple(suggestion_ids))
+    return {row["id"]: dict(row) for row in await cursor.fetchall()}
+
+async def update_suggestion_statuses(db, statuses: Dict[int, str], commit: bool = True) -> Dict[int, Dict]:
+    """Close many active suggestions in one transaction, returning the ones changed (async)"""
+    if not statuses:
+        return {}
+    # One contiguous block of change versions, one per suggestion, so delta sync pages stay exact
+    await db.execute("UPDATE sync_state SET version = version + ? WHERE id = 1", (len(statuses),))
+    cursor = await db.execute("SELECT version FROM sync_state WHERE id = 1")
+    first = (await cursor.fetchone())[0] - len(statuses) + 1
+    versions = {suggestion_id: first + i for i, suggestion_id in enumerate(statuses)}
+    # Suggestions closed since the caller validated them are left alone
+    await db.executemany(
+        "UPDATE suggestions SET status = ?, updated_at = CURRENT_TIMESTAMP, version = ? WHERE id = ? AND status = 'active'",
+        [(new_status, versions[suggestion_id], suggestion_id) for suggestion_id, new_status in statuses.items()]
+    )
+    # executemany only reports the total rowcount, changed rows carry their new version
+    suggestions = {
+        suggestion_id: suggestion
+        for suggestion_id, suggestion in (await get_suggestions_by_ids(db, list(statuses))).items()
+        if suggestion["version"] == versions[suggestion_id]
+    }
+    for suggestion in suggestions.values():
+        db.after_commit(functools.partial(
+            suggestion_meta.set, suggestion["id"], suggestion["author_id"], suggestion["status"], suggestion["version"]))
+    if commit:
+        await db.commit()
+    return suggestions
+
+
+# Per-user activity counters (async)
+async def _bump_user_stats(db, user_id: int, suggestions: int = 0, votes_cast: int = 0, score_received: int = 0):
+    """Add deltas to a user's counters inside the caller's write transaction (async)"""
+    await db.execute(
+        """
+        INSERT INTO user_stats (user_id, suggestions, votes_cast, score_received) VALUES (?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            suggestions = suggestions + excluded.suggestions,
+            votes_cast = votes_cast + excluded.votes_cast,
+            score_received = score_received + excluded.score_received
+        """,
+        (user_id, suggestions, votes_cast, score_received)
+    )
+
+def _vote_score(is_upvote: Optional[bool]) -> int:
+    if is_upvote is None:
+        return 0
+    return 1 if is_upvote else -1
+
+async def _count_vote_change(db, suggestion_id: int, voter_id: int, before: Optional[bool], after: Optional[bool]):
+    """Update the voter's and the author's counters for a vote going from before to after (async)"""
+    cast = (after is not None) - (before is not None)
+    if cast:
+        await _bump_user_stats(db, voter_id, votes_cast=cast)
+    score = _vote_score(after) - _vote_score(before)
+    if score:
+        await db.execute("UPDATE suggestions SET vote_count = vote_count + ? WHERE id = ?", (score, suggestion_id))
+        meta = await suggestion_meta.get(db, suggestion_id)
+        if meta is not None:
+            await _bump_user_stats(db, meta.author_id, score_received=score)
+
+async def get_user_stats(db, user_id: int) -> Dict:
+    """Get a user's suggestion, vote and score counters (async)"""
+    cursor = await db.execute(
+        "SELECT suggestions, votes_cast, score_received FROM user_stats WHERE user_id = ?", (user_id,)
+    )
+    row = await cursor.fetchone()
+    stats = dict(row) if row else {"suggestions": 0, "votes_cast": 0, "score_received": 0}
+    stats["user_id"] = user_id
+    return stats
+
+async def get_user_suggestions(db, user_id: int, skip: int = 0, limit: int = 20, include_archived: bool = False) -> List[Dict]:
+    """Get a user's suggestions, newest first (async)"""
+    source = ALL_SUGGESTIONS if include_archived else "suggestions"
+    cursor = await db.execute(
+        f"SELECT * FROM {source} WHERE author_id = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+        (user_id, limit, skip)
+    )
+    return [dict(row) for row in await cursor.fetchall()]
+
+async def get_user_votes(db, user_id: int, skip: int = 0, limit: int = 20, include_archived: bool = False) -> List[Dict]:
+    """Get the votes a user cast, most recent first (async)"""
+    query = f"SELECT {VOTE_COLUMNS}, 0 AS archived FROM votes WHERE user_id = ?"
+    params = [user_id]
+    if include_archived:
+        # Both sides are read through their user_id index, then merged by time
+        query = f"""
+            SELECT * FROM (
+                {query}
+                UNION ALL
+                SELECT {VOTE_COLUMNS}, 1 AS archived FROM votes_archive WHERE user_id = ?
+            )
+        """
+        params.append(user_id)
+    cursor = await db.execute(f"{query} ORDER BY created_at DESC LIMIT ? OFFSET ?", (*params, limit, skip))
+    return [dict(row) for row in await cursor.fetchall()]
+
+
 # Vote CRUD operations (async)
+async def _touch_suggestion_version(db, suggestion_id: int) -> bool:
+    """Stamp a suggestion whose tally changed with a new change version, False if it is gone (async)"""
+    version = await next_change_version(db)
+    cursor = await db.execute("UPDATE suggestions SET version = ? WHERE id = ?", (version, suggestion_id))
+    db.after_commit(functools.partial(suggestion_meta.set_version, suggestion_id, version))
+    return cursor.rowcount > 0
+
 async def get_user_vote(db, user_id: int, suggestion_id: int):
     """Get user's vote on a specific suggestion (async)"""
-    cursor = await db.execute("SELECT * FROM votes WHERE user_id = ? AND suggestion_id = ?", (user_id, suggestion_id))
+    cursor = await db.execute(
+        "SELECT suggestion_id, user_id, is_upvote, created_at FROM votes WHERE suggestion_id = ? AND user_id = ?",
+        (suggestion_id, user_id)
+    )
     row = await cursor.fetchone()
     return dict(row) if row else None
 
-async def create_or_update_vote(db, vote: VoteCreate, user_id: int):
-    """Create or update a user's vote on a suggestion (async)"""
-    existing_vote = await get_user_vote(db, user_id, vote.suggestion_id)
-    if existing_vote:
-        await db.execute("UPDATE votes SET is_upvote = ?, created_at = CURRENT_TIMESTAMP WHERE id = ?", (vote.is_upvote, existing_vote['id']))
-        await db.commit()
-        return await get_user_vote(db, user_id, vote.suggestion_id)
-    else:
-        await db.execute(
-            "INSERT INTO votes (user_id, suggestion_id, is_upvote, created_at) VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
-            (user_id, vote.suggestion_id, vote.is_upvote)
-        )
+async def create_or_update_vote(db, vote: VoteCreate, user_id: int, commit: bool = True):
+    """Create or update a user's vote on a suggestion, None if the suggestion is gone (async)"""
+    # The version bump takes the write lock, so the previous vote read next cannot go stale,
+    # and tells whether another worker deleted the suggestion after suggestion_meta was read
+    if not await _touch_suggestion_version(db, vote.suggestion_id):
+        return None
+    previous = await get_user_vote(db, user_id, vote.suggestion_id)
+    created_at = int(time.time())
+    # One statement keyed on the primary key, concurrent first votes cannot collide
+    await db.execute(
+        """
+        INSERT INTO votes (suggestion_id, user_id, is_upvote, created_at) VALUES (?, ?, ?, ?)
+        ON CONFLICT(suggestion_id, user_id) DO UPDATE SET is_upvote = excluded.is_upvote, created_at = excluded.created_at
+        """,
+        (vote.suggestion_id, user_id, vote.is_upvote, created_at)
+    )
+    await _count_vote_change(db, vote.suggestion_id, user_id, previous["is_upvote"] if previous else None, vote.is_upvote)
+    if commit:
         await db.commit()
-        return await get_user_vote(db, user_id, vote.suggestion_id)
+    return await get_user_vote(db, user_id, vote.suggestion_id)
 
-async def delete_vote(db, user_id: int, suggestion_id: int):
+async def delete_vote(db, user_id: int, suggestion_id: int, commit: bool = True):
     """Delete a user's vote on a suggestion (async)"""
-    await db.execute("DELETE FROM votes WHERE user_id = ? AND suggestion_id = ?", (user_id, suggestion_id))
-    await db.commit()
+    await _touch_suggestion_version(db, suggestion_id)
+    previous = await get_user_vote(db, user_id, suggestion_id)
+    await db.execute("DELETE FROM votes WHERE suggestion_id = ? AND user_id = ?", (suggestion_id, user_id))
+    if previous is not None:
+        await _count_vote_change(db, suggestion_id, user_id, previous["is_upvote"], None)
+    if commit:
+        await db.commit()
     return True
 
 async def get_suggestion_vote_count(db, suggestion_id: int):
@@ -154,37 +379,79 @@ async def get_suggestion_vote_count(db, suggestion_id: int):
     row = await cursor.fetchone()
     return row["vote_count"] if row and row["vote_count"] is not None else 0
 
-
-# Statistics and analytics
-async def get_suggestions_by_category(db) -> list:
-    """Get suggestion count by category (async)"""
+async def get_all_vote_counts(db) -> Dict[int, int]:
+    """Get the vote count of every suggestion in one pass (async)"""
     cursor = await db.execute(
-        "SELECT category, COUNT(id) as count FROM suggestions GROUP BY category"
+        """
+        SELECT s.id, COALESCE(SUM(CASE WHEN v.is_upvote THEN 1 ELSE -1 END), 0) as vote_count
+        FROM suggestions s
+        LEFT JOIN votes v ON s.id = v.suggestion_id
+        GROUP BY s.id
+        """
     )
     rows = await cursor.fetchall()
-    return [{"category": row["category"], "count": row["count"]} for row in rows]
+    return {row["id"]: row["vote_count"] for row in rows}
 
-async def get_top_suggestions(db, limit: int = 10) -> list:
-    """Get top suggestions by vote count (descending) (async)"""
-    # Get suggestions with vote counts
+async def get_vote_counts(db, suggestion_ids: List[int]) -> Dict[int, int]:
+    """Get id -> vote count for a batch of suggestions in one query (async)"""
+    if not suggestion_ids:
+        return {}
+    placeholders = ", ".join("?" * len(suggestion_ids))
+    cursor = await db.execute(
+        f"""
+        SELECT suggestion_id, SUM(CASE WHEN is_upvote THEN 1 ELSE -1 END) as vote_count
+        FROM votes WHERE suggestion_id IN ({placeholders}) GROUP BY suggestion_id
+        """,
+        tuple(suggestion_ids)
+    )
+    counts = {row["suggestion_id"]: row["vote_count"] for row in await cursor.fetchall()}
+    return {suggestion_id: counts.get(suggestion_id, 0) for suggestion_id in suggestion_ids}
+
+async def get_unvoted_suggestions(db, user_id: int, limit: int = 20, after: Optional[Tuple[int, int]] = None) -> list:
+    """Active suggestions a user neither authored nor voted on, best score first (async)"""
+    # The scan walks idx_suggestions_status_votes backwards from the cursor, so a page
+    # costs the same at any depth; NOT EXISTS probes the votes primary key per row
     query = '''
-        SELECT s.*, COALESCE(SUM(CASE WHEN v.is_upvote THEN 1 ELSE -1 END), 0) as vote_count
-        FROM suggestions s
-        LEFT JOIN votes v ON s.id = v.suggestion_id
-        GROUP BY s.id
-        ORDER BY vote_count DESC, s.created_at DESC
-        LIMIT ?
+        SELECT s.* FROM suggestions s
+        WHERE s.status = 'active' AND s.author_id != ?
+          AND NOT EXISTS (SELECT 1 FROM votes v WHERE v.suggestion_id = s.id AND v.user_id = ?)
     '''
-    cursor = await db.execute(query, (limit,))
+    params = [user_id, user_id]
+    if after is not None:
+        # Keyset cursor: (vote_count, id) of the last row of the previous page
+        query += " AND (s.vote_count, s.id) < (?, ?)"
+        params.extend([after[0], after[1]])
+    query += " ORDER BY s.vote_count DESC, s.id DESC LIMIT ?"
+    params.append(limit)
+    cursor = await db.execute(query, tuple(params))
+    return [dict(row) for row in await cursor.fetchall()]
+
+async def get_user_vote_values(db, user_id: int) -> Dict[int, bool]:
+    """Get suggestion_id -> is_upvote for every vote cast by a user (async)"""
+    cursor = await db.execute("SELECT suggestion_id, is_upvote FROM votes WHERE user_id = ?", (user_id,))
     rows = await cursor.fetchall()
-    return [dict(row) for row in rows]
+    return {row["suggestion_id"]: bool(row["is_upvote"]) for row in rows}
 
 
-def get_user_suggestions(db: Session, user_id: int) -> List[Dict]:
-    """Get all suggestions by a specific user"""
-    return db.query(Suggestion).filter(Suggestion.author_id == user_id).all()
+# Statistics and analytics
+async def get_suggestions_by_category(db, include_archived: bool = False) -> list:
+    """Get suggestion count by category (async)"""
+    if include_archived:
+        query = f"SELECT category, COUNT(id) as count FROM {ALL_SUGGESTIONS} GROUP BY category"
+    else:
+        query = "SELECT category, COUNT(id) as count FROM suggestions GROUP BY category"
+    cursor = await db.execute(query)
+    rows = await cursor.fetchall()
+    return [{"category": row["category"], "count": row["count"]} for row in rows]
 
+async def get_top_suggestions(db, limit: int = 10, include_archived: bool = False) -> list:
+    """Get top suggestions by vote count (descending) (async)"""
+    # Tallies are stored on both sides, nothing is aggregated per request
+    if include_archived:
+        query = f"SELECT * FROM {ALL_SUGGESTIONS} ORDER BY vote_count DESC, created_at DESC LIMIT ?"
+    else:
+        query = f"SELECT {SUGGESTION_COLUMNS}, vote_count FROM suggestions ORDER BY vote_count DESC, created_at DESC LIMIT ?"
+    cursor = await db.execute(query, (limit,))
+    rows = await cursor.fetchall()
+    return [dict(row) for row in rows]
 
-def get_user_votes(db: Session, user_id: int) -> List[Dict]:
-    """Get all votes by a specific user"""
-    return db.query(Vote).filter(Vote.user_id == user_id).all() 
\ No newline at end of file
@@ -1,5 +1,12 @@
 import aiosqlite
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, List
 from app.config import settings
+from app.metrics import db_connections_open, db_connections_opened, db_slow_queries, record_query
+
+logger = logging.getLogger(__name__)
 
 # Async dependency for aiosqlite connection
 def get_db_path():
@@ -11,17 +18,191 @@ def get_db_path():
     else:
         raise RuntimeError("aiosqlite is only supported for SQLite databases.")
 
-async def get_db():
-    """Async dependency to get aiosqlite connection"""
+class InstrumentedConnection:
+    """aiosqlite connection that times every statement for app.metrics.
+
+    Everything except execute/executemany and commit/rollback is passed
+    through to the wrapped connection. Timings cover execution up to the first
+    row, fetches are not included. In-memory indexes mirroring the tables are
+    updated from after_commit callbacks, so a rolled back or abandoned
+    transaction never shows up in them.
+    """
+
+    def __init__(self, db: aiosqlite.Connection):
+        self._db = db
+        self._after_commit: List[Callable[[], None]] = []
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Run callback once the current transaction commits, drop it on rollback"""
+        self._after_commit.append(callback)
+
+    async def commit(self):
+        await self._db.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # The rows are committed, a failing cache update must not turn that into an error
+                logger.exception("after_commit callback failed")
+
+    async def rollback(self):
+        self._after_commit = []
+        await self._db.rollback()
+
+    async def execute(self, sql: str, parameters=None):
+        start = time.perf_counter()
+        cursor = await self._db.execute(sql, parameters)
+        await self._record(sql, parameters, time.perf_counter() - start)
+        return cursor
+
+    async def executemany(self, sql: str, parameters):
+        start = time.perf_counter()
+        cursor = await self._db.executemany(sql, parameters)
+        await self._record(sql, None, time.perf_counter() - start)
+        return cursor
+
+    async def _record(self, sql: str, parameters, seconds: float):
+        statement = record_query(sql, seconds)
+        if seconds * 1000 >= settings.SLOW_QUERY_MS:
+            db_slow_queries.inc(statement)
+            plan = await self._query_plan(sql, parameters) if settings.SLOW_QUERY_EXPLAIN else None
+            logger.warning("Slow query (%.1f ms): %s | plan: %s", seconds * 1000, statement, plan)
+
+    async def _query_plan(self, sql: str, parameters) -> str:
+        """EXPLAIN QUERY PLAN of a data statement, empty for anything else"""
+        if sql.lstrip().split(None, 1)[0].upper() not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+            return ""
+        try:
+            cursor = await self._db.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            return "; ".join(row[3] for row in await cursor.fetchall())
+        except Exception as e:
+            return f"unavailable ({e})"
+
+
+@asynccontextmanager
+async def connect_db():
+    """Open an aiosqlite connection outside of a request (background tasks, websockets)"""
     db_path = get_db_path()
     async with aiosqlite.connect(db_path) as db:
         db.row_factory = aiosqlite.Row
+        db_connections_opened.inc()
+        db_connections_open.inc()
+        try:
+            yield InstrumentedConnection(db)
+        finally:
+            db_connections_open.dec()
+
+async def get_db():
+    """Async dependency to get aiosqlite connection"""
+    async with connect_db() as db:
         yield db
 
+async def _add_column_if_missing(db, table: str, column: str, definition: str) -> bool:
+    """Add a column to a table created by an older version of init_db, True if it was added"""
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in await cursor.fetchall()]
+    if column not in columns:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+    return False
+
+# Recomputes suggestions.vote_count from the votes, for the upgrade and for seeded databases
+RECOUNT_VOTES = '''
+    UPDATE suggestions SET vote_count = (
+        SELECT COALESCE(SUM(CASE WHEN v.is_upvote THEN 1 ELSE -1 END), 0)
+        FROM votes v WHERE v.suggestion_id = suggestions.id
+    )
+'''
+
+# Votes and archived votes; created_at is Unix time in seconds
+VOTES_LAYOUT = '''(
+    suggestion_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    is_upvote BOOLEAN NOT NULL,
+    created_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    PRIMARY KEY (suggestion_id, user_id)
+) WITHOUT ROWID'''
+
+async def _migrate_votes_layout(db, table: str):
+    """Rewrite a votes table from the old rowid layout (surrogate id, text timestamps).
+
+    Runs inside init_db's transaction. A `{table}_legacy` table left behind by an
+    interrupted upgrade is copied over again instead of being ignored.
+    """
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{table}_legacy",))
+    if await cursor.fetchone() is None:
+        cursor = await db.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in await cursor.fetchall()]
+        if "id" not in columns:
+            return
+        await db.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+    await db.execute(f"CREATE TABLE IF NOT EXISTS {table} {VOTES_LAYOUT}")
+    # Rows a resumed table already holds were cast after the legacy copy, they win
+    await db.execute(f'''
+        INSERT OR IGNORE INTO {table} (suggestion_id, user_id, is_upvote, created_at)
+        SELECT suggestion_id, user_id, is_upvote,
+               COALESCE(CAST(strftime('%s', created_at) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))
+        FROM {table}_legacy ORDER BY id
+    ''')
+    await db.execute(f"DROP TABLE {table}_legacy")
+
+async def _create_user_stats(db):
+    """Create the per-user counters and fill them from the existing rows"""
+    cursor = await db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'user_stats'")
+    if await cursor.fetchone() is not None:
+        return
+    await db.execute('''
+        CREATE TABLE user_stats (
+            user_id INTEGER PRIMARY KEY,
+            suggestions INTEGER NOT NULL DEFAULT 0,
+            votes_cast INTEGER NOT NULL DEFAULT 0,
+            score_received INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    await db.execute('''
+        INSERT INTO user_stats (user_id, suggestions, votes_cast, score_received)
+        SELECT u.id,
+            (SELECT COUNT(*) FROM suggestions WHERE author_id = u.id)
+                + (SELECT COUNT(*) FROM suggestions_archive WHERE author_id = u.id),
+            (SELECT COUNT(*) FROM votes WHERE user_id = u.id)
+                + (SELECT COUNT(*) FROM votes_archive WHERE user_id = u.id),
+            (SELECT COALESCE(SUM(CASE WHEN v.is_upvote THEN 1 ELSE -1 END), 0)
+                FROM suggestions s JOIN votes v ON v.suggestion_id = s.id WHERE s.author_id = u.id)
+                + (SELECT COALESCE(SUM(vote_count), 0) FROM suggestions_archive WHERE author_id = u.id)
+        FROM users u
+    ''')
+
+# Bump whenever the DDL in init_db changes so existing databases run it once more
+SCHEMA_VERSION = 6
+
+# Seconds a worker waits for another worker's schema upgrade before giving up
+INIT_LOCK_TIMEOUT = 300
+
 async def init_db():
     """Create tables if they do not exist (for aiosqlite)"""
     db_path = get_db_path()
-    async with aiosqlite.connect(db_path) as db:
+    # Workers waiting for another one's upgrade block on the write lock, give them time
+    async with aiosqlite.connect(db_path, timeout=INIT_LOCK_TIMEOUT) as db:
+        cursor = await db.execute("PRAGMA user_version")
+        if (await cursor.fetchone())[0] == SCHEMA_VERSION:
+            # Schema is current, skip the DDL on warm restarts
+            return
+        # Takes effect when a new database gets its first table; an existing database
+        # only switches over after the full VACUUM below
+        await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # Workers started together all get here; the write lock lets one of them run the
+        # upgrade while the others wait for its commit and then find the schema current.
+        # Every statement up to the commit is one transaction, an interrupted upgrade
+        # leaves the old schema behind
+        await db.execute("BEGIN IMMEDIATE")
+        cursor = await db.execute("PRAGMA user_version")
+        if (await cursor.fetchone())[0] == SCHEMA_VERSION:
+            await db.rollback()
+            return
         await db.execute('''
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -46,16 +227,93 @@ async def init_db():
                 FOREIGN KEY(author_id) REFERENCES users(id)
             )
         ''')
+        # One row per (suggestion, user) stored in the primary key b-tree itself, so a
+        # suggestion's votes are contiguous and the pair lookup needs no second index
+        await _migrate_votes_layout(db, "votes")
+        await db.execute(f"CREATE TABLE IF NOT EXISTS votes {VOTES_LAYOUT}")
+        # Change versions for delta sync: every suggestion/tally mutation takes the next
+        # value of sync_state.version, deletes leave a tombstone
+        await _add_column_if_missing(db, "suggestions", "version", "INTEGER NOT NULL DEFAULT 0")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_version ON suggestions(version)")
+        # Vote score kept current by the vote write paths, so feeds ranked by it can
+        # seek (status, vote_count, id) instead of summing votes for every candidate
+        if await _add_column_if_missing(db, "suggestions", "vote_count", "INTEGER NOT NULL DEFAULT 0"):
+            await db.execute(RECOUNT_VOTES)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_suggestions_status_votes ON suggestions(status, vote_count, id)"
+        )
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        await db.execute("INSERT OR IGNORE INTO sync_state (id, version) VALUES (1, 0)")
         await db.execute('''
-            CREATE TABLE IF NOT EXISTS votes (
+            CREATE TABLE IF NOT EXISTS suggestion_tombstones (
+                suggestion_id INTEGER PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        ''')
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_suggestion_tombstones_version ON suggestion_tombstones(version)")
+        # Realtime events written in the same transaction as the change they describe
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS outbox_events (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        # Refresh-token sessions (hashed tokens) and revoked access tokens for SESSION_STORE=sqlite
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS refresh_sessions (
+                token_hash TEXT PRIMARY KEY,
                 user_id INTEGER NOT NULL,
-                suggestion_id INTEGER NOT NULL,
-                is_upvote BOOLEAN NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(user_id, suggestion_id),
-                FOREIGN KEY(user_id) REFERENCES users(id),
-                FOREIGN KEY(suggestion_id) REFERENCES suggestions(id)
+                username TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                jti TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        # Closed suggestions and their votes after the archive grace period, kept out
+        # of the hot tables; vote_count is the final tally at archive time
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS suggestions_archive (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                category TEXT NOT NULL,
+                status TEXT NOT NULL,
+                author_id INTEGER NOT NULL,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                version INTEGER NOT NULL DEFAULT 0,
+                vote_count INTEGER NOT NULL DEFAULT 0,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        await db.commit() 
\ No newline at end of file
+        await _migrate_votes_layout(db, "votes_archive")
+        await db.execute(f"CREATE TABLE IF NOT EXISTS votes_archive {VOTES_LAYOUT}")
+        await db.execute("DROP INDEX IF EXISTS idx_votes_archive_suggestion")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_votes_archive_user ON votes_archive(user_id)")
+        # Per-user activity: the "my suggestions / my votes" lists page through these
+        # indexes, the counters in user_stats are kept current by the crud write paths
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_author ON suggestions(author_id)")
+        await db.execute("DROP INDEX IF EXISTS idx_votes_user")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_votes_user_created ON votes(user_id, created_at)")
+        await _create_user_stats(db)
+        await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        await db.commit()
+        # Incremental auto-vacuum lets app.maintenance hand pages freed by deletes back to
+        # the filesystem. VACUUM cannot run in a transaction, only the worker that ran the
+        # upgrade gets here
+        cursor = await db.execute("PRAGMA auto_vacuum")
+        if (await cursor.fetchone())[0] != 2:
+            await db.execute("VACUUM")
+        # WAL: readers (and backups) do not block the writer, checkpoints run from app.maintenance
+        await db.execute("PRAGMA journal_mode = WAL")
@@ -0,0 +1,268 @@
+import asyncio
+import sqlite3
+import string
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import get_db_path
+from app.metrics import registry, Gauge
+
+# Bound on first use, like app.analytics, so importing app.main does not load numpy
+np = None
+
+
+def _import_numpy():
+    """Bind the module-level np, RuntimeError when numpy is not installed"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("Duplicate detection requires numpy")
+        np = numpy
+
+
+# Shingles are 5-byte windows of the normalized "title description" text
+SHINGLE = 5
+# 16 bands of 4 MinHash rows: texts with Jaccard 0.5 share a band ~64% of the
+# time, 0.7 ~99%, unrelated ones (< 0.1) almost never
+BANDS, ROWS = 16, 4
+# Candidates verified per lookup, the most frequent first
+MAX_CANDIDATES = 200
+
+# Punctuation becomes whitespace; a translate table is ~3x faster than a \W regex
+_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation + "‘’“”–—…«»¿¡"})
+
+
+def normalize(title: str, description: str) -> bytes:
+    """Lowercased words separated by single spaces, padded to at least one shingle"""
+    text = " ".join(f"{title} {description}".lower().translate(_PUNCTUATION).split())
+    return text.encode().ljust(SHINGLE)
+
+
+def shingles(title: str, description: str) -> Set[bytes]:
+    """Shingle set of a suggestion, for exact Jaccard similarity"""
+    text = normalize(title, description)
+    return {text[i:i + SHINGLE] for i in range(len(text) - SHINGLE + 1)}
+
+
+def jaccard(a: Set[bytes], b: Set[bytes]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class MinHasher:
+    """MinHash signatures and LSH band keys for batches of texts.
+
+    Each shingle is packed into a uint64 and hashed once to 32 bits
+    (multiply-shift), then permuted BANDS * ROWS times with a * h + b mod 2**32;
+    a signature is the minimum of each permutation over the shingles of a
+    text. Staying in uint32 halves the memory traffic of the permutation
+    passes, which dominate building the index. The ROWS minimums of a band
+    are folded into one uint32 key, two texts are candidates when any band
+    key matches.
+    """
+
+    def __init__(self, seed: int = 20240611):
+        _import_numpy()
+        rng = np.random.default_rng(seed)
+        count = BANDS * ROWS
+        self.mix = np.uint64(rng.integers(0, 2 ** 63, dtype=np.uint64) * np.uint64(2) + np.uint64(1))
+        # Odd multipliers make every a * h + b a permutation of the 32-bit hashes
+        self.a = (rng.integers(0, 2 ** 31, count, dtype=np.uint32) * np.uint32(2) + np.uint32(1))
+        self.b = rng.integers(0, 2 ** 32, count, dtype=np.uint32)
+        self.fold = rng.integers(0, 2 ** 63, ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def band_keys(self, texts: List[bytes]):
+        """(len(texts), BANDS) uint32 band keys of normalized texts"""
+        if not texts:
+            return np.empty((0, BANDS), np.uint32)
+        buffer = np.frombuffer(b"".join(texts), dtype=np.uint8).astype(np.uint64)
+        lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+        # Pack every 5-byte window, then keep the ones inside a single text
+        grams = np.zeros(len(buffer) - SHINGLE + 1, dtype=np.uint64)
+        for offset in range(SHINGLE):
+            grams <<= np.uint64(8)
+            grams |= buffer[offset:len(buffer) - SHINGLE + 1 + offset]
+        counts = lengths - SHINGLE + 1
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        grams = grams[np.arange(counts.sum()) + np.repeat(starts - offsets, counts)]
+        shift = np.uint64(32)
+        base = ((grams * self.mix) >> shift).astype(np.uint32)
+        signature = np.empty((len(texts), BANDS * ROWS), dtype=np.uint64)
+        hashed = np.empty_like(base)
+        for i in range(BANDS * ROWS):
+            np.multiply(base, self.a[i], out=hashed)
+            hashed += self.b[i]
+            signature[:, i] = np.minimum.reduceat(hashed, offsets)
+        rows = signature.reshape(len(texts), BANDS, ROWS) * self.fold
+        return (rows.sum(axis=2) >> shift).astype(np.uint32)
+
+
+class SimilarityIndex:
+    """MinHash/LSH index over every hot suggestion, for near-duplicate lookups.
+
+    Band keys live in per-band sorted uint32 arrays (with the matching
+    suggestion ids), about 128 bytes per suggestion; a lookup is one binary
+    search per band. Creates, edits and deletes go to a small pending map
+    that overrides the arrays and is merged into new arrays, copy on write,
+    in a worker thread once DEDUP_FLUSH_PENDING entries are queued.
+    Candidates are only likely duplicates: callers verify them against the
+    stored text.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        # Changes are only recorded once a load started, earlier ones are in the load itself
+        self.loading = False
+        self.hasher: Optional[MinHasher] = None
+        self._load_lock = asyncio.Lock()
+        self._merge_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # suggestion id -> band keys, None for a removed suggestion
+        self._pending: Dict[int, Optional[Tuple[int, ...]]] = {}
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self._flushing = False
+        self.keys = self.ids = None
+
+    def __len__(self) -> int:
+        return 0 if self.ids is None else self.ids.shape[1]
+
+    def apply_event(self, event_type: str, data: dict):
+        """Catch up with a suggestion change seen in the outbox, which may come from another worker"""
+        if event_type == "suggestion_deleted":
+            self.forget([data["id"]])
+        elif event_type == "new_suggestion" or (event_type == "suggestion_update" and "suggestions" not in data):
+            # Batch updates only change statuses, the text stays indexed as it is
+            self.add(data["id"], data["title"], data["description"])
+
+    # Change hooks, called for every new, edited and deleted suggestion event
+    def add(self, suggestion_id: int, title: str, description: str):
+        """Index a created or edited suggestion"""
+        if self.loading and self.hasher is not None:
+            keys = tuple(int(k) for k in self.hasher.band_keys([normalize(title, description)])[0])
+            self._set_pending(suggestion_id, keys)
+
+    def forget(self, suggestion_ids: Iterable[int]):
+        """Drop deleted or archived suggestions"""
+        if self.loading:
+            for suggestion_id in suggestion_ids:
+                self._set_pending(suggestion_id, None)
+
+    def _set_pending(self, suggestion_id: int, keys: Optional[Tuple[int, ...]]):
+        with self._lock:
+            self._unbucket(suggestion_id)
+            self._pending[suggestion_id] = keys
+            if keys is not None:
+                for band, key in enumerate(keys):
+                    self._buckets.setdefault((band, key), set()).add(suggestion_id)
+        if self.loaded and len(self._pending) >= settings.DEDUP_FLUSH_PENDING and not self._flushing:
+            self._flushing = True
+            asyncio.get_running_loop().run_in_executor(None, self.merge_pending)
+
+    def _unbucket(self, suggestion_id: int):
+        previous = self._pending.get(suggestion_id)
+        if previous is not None:
+            for band, key in enumerate(previous):
+                bucket = self._buckets[(band, key)]
+                bucket.discard(suggestion_id)
+                if not bucket:
+                    del self._buckets[(band, key)]
+
+    def merge_pending(self):
+        """Fold pending entries into new arrays and publish them (worker thread)"""
+        with self._merge_lock:
+            self._flushing = False
+            with self._lock:
+                pending = dict(self._pending)
+            if not pending:
+                return
+            keys, ids = self.keys, self.ids
+            # Every band holds each id once, so each row keeps the same number of entries
+            keep = ~np.isin(ids, np.fromiter(pending, dtype=np.int32, count=len(pending)))
+            added = [(i, k) for i, k in pending.items() if k is not None]
+            new_ids = np.array([i for i, _ in added], dtype=np.int32)
+            new_keys = np.array([k for _, k in added], dtype=np.uint32).reshape(len(added), BANDS)
+            keys, ids = _sorted_bands(
+                np.concatenate((keys[keep].reshape(BANDS, -1), new_keys.T), axis=1),
+                np.concatenate((ids[keep].reshape(BANDS, -1), np.tile(new_ids, (BANDS, 1))), axis=1),
+            )
+            with self._lock:
+                self.keys, self.ids = keys, ids
+                # Entries changed while merging stay pending and keep overriding the arrays
+                for suggestion_id, entry in pending.items():
+                    if suggestion_id in self._pending and self._pending[suggestion_id] is entry:
+                        self._unbucket(suggestion_id)
+                        del self._pending[suggestion_id]
+
+    async def ensure_loaded(self):
+        """Build the index once, concurrent callers wait for the same build"""
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            _import_numpy()
+            self.hasher = MinHasher()
+            self.loading = True
+            keys, ids = await run_in_threadpool(load_index, get_db_path(), self.hasher)
+            with self._lock:
+                self.keys, self.ids = keys, ids
+            self.loaded = True
+
+    def candidates(self, title: str, description: str, exclude_id: Optional[int] = None) -> List[int]:
+        """Ids sharing at least one band with the text, the most shared bands first"""
+        query = self.hasher.band_keys([normalize(title, description)])[0]
+        with self._lock:
+            keys, ids, pending = self.keys, self.ids, self._pending
+            shared: Dict[int, int] = {}
+            for band in range(BANDS):
+                key = query[band]
+                lo = np.searchsorted(keys[band], key, "left")
+                hi = np.searchsorted(keys[band], key, "right")
+                for suggestion_id in ids[band, lo:hi].tolist():
+                    # A pending entry replaces the arrays' version of a suggestion
+                    if suggestion_id not in pending:
+                        shared[suggestion_id] = shared.get(suggestion_id, 0) + 1
+                for suggestion_id in self._buckets.get((band, int(key)), ()):
+                    shared[suggestion_id] = shared.get(suggestion_id, 0) + 1
+        shared.pop(exclude_id, None)
+        return sorted(shared, key=lambda i: (-shared[i], i))[:MAX_CANDIDATES]
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the band arrays"""
+        return sum(getattr(array, "nbytes", 0) for array in (self.keys, self.ids))
+
+
+def _sorted_bands(keys, ids):
+    """Sort each band's keys, carrying the suggestion ids along"""
+    order = np.argsort(keys, axis=1, kind="stable")
+    return np.take_along_axis(keys, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+def load_index(db_path: str, hasher: MinHasher, batch_size: int = 2000):
+    """Band keys and ids of every hot suggestion, sorted per band (blocking)"""
+    _import_numpy()
+    key_parts, id_parts = [], []
+    with sqlite3.connect(db_path) as db:
+        cursor = db.execute("SELECT id, title, description FROM suggestions")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            key_parts.append(hasher.band_keys([normalize(title, description) for _, title, description in rows]))
+            id_parts.append(np.array([row[0] for row in rows], dtype=np.int32))
+    if not key_parts:
+        return np.empty((BANDS, 0), np.uint32), np.empty((BANDS, 0), np.int32)
+    keys = np.concatenate(key_parts).T
+    ids = np.tile(np.concatenate(id_parts), (BANDS, 1))
+    return _sorted_bands(np.ascontiguousarray(keys), ids)
+
+
+# Global index shared by the suggestion endpoints
+similarity_index = SimilarityIndex()
+
+similarity_index_bytes = registry.register(Gauge(
+    "dedup_index_bytes", "Memory held by the near-duplicate index arrays",
+    callback=similarity_index.memory_bytes))
@@ -0,0 +1,50 @@
+import math
+from typing import Dict, List
+
+
+class TimingWheel:
+    """Hashed timing wheel for per-connection timers.
+
+    Scheduling and cancelling are O(1) and each tick only visits the timers
+    that land in the current slot, so thousands of idle connections cost
+    nothing until their deadline comes round.
+    """
+
+    def __init__(self, tick: float, slots: int = 64):
+        self.tick = tick
+        self.slots: List[Dict[object, int]] = [{} for _ in range(slots)]
+        self.position = 0
+        self._where: Dict[object, int] = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    def schedule(self, item, delay: float):
+        """Schedule an item to expire after roughly `delay` seconds"""
+        self.cancel(item)
+        ticks = max(1, math.ceil(delay / self.tick))
+        slot = (self.position + ticks) % len(self.slots)
+        # Timers further away than one revolution wait for extra rounds
+        self.slots[slot][item] = (ticks - 1) // len(self.slots)
+        self._where[item] = slot
+
+    def cancel(self, item):
+        """Remove an item from the wheel if it is scheduled"""
+        slot = self._where.pop(item, None)
+        if slot is not None:
+            self.slots[slot].pop(item, None)
+
+    def advance(self) -> list:
+        """Move the wheel one tick and return the items that are due"""
+        self.position = (self.position + 1) % len(self.slots)
+        bucket = self.slots[self.position]
+        due = []
+        for item, rounds in bucket.items():
+            if rounds:
+                bucket[item] = rounds - 1
+            else:
+                due.append(item)
+        for item in due:
+            del bucket[item]
+            del self._where[item]
+        return due
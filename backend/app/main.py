@@ -1,9 +1,27 @@
-from fastapi import FastAPI, Depends
+import time
+
+# Start of the startup budget, before the framework imports
+_import_started = time.monotonic()
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from app.database import init_db
 from app.config import settings
-from app.api import auth, suggestions, votes, websocket
+from app.api import auth, suggestions, votes, users, analytics, websocket, events, metrics, admin
+from app.websocket_manager import manager
+from app.outbox import outbox
+from app.metrics import QueryStatsMiddleware, registry, Gauge
+from app.timing import TimingMiddleware
+from app.profiling import ProfileRequestMiddleware, loop_watchdog
+from app.admission import AdmissionMiddleware
+from app.sessions import session_store
+from app.snapshot import snapshot
+from app.suggestion_meta import suggestion_meta
+from app.analytics import vote_columns
+from app.dedup import similarity_index
+from app.archive import archiver
+from app.backup import backup_manager
+from app.maintenance import RequestLoadMiddleware, maintenance
 
 app = FastAPI(
     title="Voting System API",
@@ -11,11 +29,69 @@ app = FastAPI(
     version="1.0.0"
 )
 
+startup_seconds = registry.register(Gauge(
+    "process_startup_seconds", "Time from importing app.main until startup finished"))
+
+
+async def prewarm():
+    """Fill in-process caches before the first request is accepted"""
+    await snapshot.ensure_loaded()
+    await suggestion_meta.ensure_loaded()
+    if settings.ANALYTICS_ENABLED:
+        try:
+            await vote_columns.ensure_loaded()
+        except RuntimeError:
+            # numpy is not installed, /api/analytics answers 503
+            pass
+    if settings.DEDUP_ENABLED:
+        try:
+            await similarity_index.ensure_loaded()
+        except RuntimeError:
+            # Without numpy suggestions are created without a duplicate check
+            pass
+
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    await session_store.purge_expired()
+    # Before loading the caches and serving requests, so this worker dispatches every
+    # event recorded from now on and replays the ones committed during the load
+    await outbox.ensure_cursor()
+    if settings.STARTUP_PREWARM:
+        await prewarm()
+    manager.start_heartbeat()
+    outbox.start()
+    loop_watchdog.start()
+    if settings.ARCHIVE_ENABLED:
+        archiver.start()
+    if settings.BACKUP_INTERVAL > 0:
+        backup_manager.start()
+    if settings.MAINTENANCE_ENABLED:
+        maintenance.start()
+    startup_seconds.set(time.monotonic() - _import_started)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    loop_watchdog.stop()
+    await archiver.stop()
+    await backup_manager.stop()
+    await maintenance.stop()
+    await outbox.stop()
+    await manager.stop_heartbeat()
 
-# Configure CORS
+# Per-request SQL statement counts for /metrics
+app.add_middleware(QueryStatsMiddleware)
+# Requests in flight, maintenance tasks wait while the app is busy
+app.add_middleware(RequestLoadMiddleware)
+# Stage timings and Server-Timing headers, skipped entirely when disabled
+if settings.TIMING_ENABLED:
+    app.add_middleware(TimingMiddleware)
+# Shed load per route class before any work is done
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+# Admins can profile a single request by sending X-Profile: 1
+app.add_middleware(ProfileRequestMiddleware)
+# Configure CORS, added last so it is outermost and shed 503s carry its headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -28,7 +104,13 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api")
 app.include_router(suggestions.router, prefix="/api")
 app.include_router(votes.router, prefix="/api")
+app.include_router(users.router, prefix="/api")
+app.include_router(analytics.router, prefix="/api")
 app.include_router(websocket.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+# Prometheus scrapes /metrics at the root
+app.include_router(metrics.router)
 
 @app.api_route("/", methods=["GET", "HEAD", "POST"])
 async def root():
@@ -36,4 +118,4 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE)
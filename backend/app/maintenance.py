@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+from app.config import settings
+from app.database import connect_db, get_db_path
+from app.metrics import registry, Counter, Gauge
+from app.outbox import purge_events
+from app.sessions import session_store
+
+logger = logging.getLogger(__name__)
+
+maintenance_runs = registry.register(Counter(
+    "db_maintenance_runs_total", "Maintenance task runs by task and result", ("task", "result")))
+maintenance_duration = registry.register(Gauge(
+    "db_maintenance_last_duration_seconds", "Duration of the last run of each maintenance task", ("task",)))
+
+
+def wal_size() -> int:
+    """Bytes in the write-ahead log, 0 when there is none"""
+    try:
+        return os.path.getsize(get_db_path() + "-wal")
+    except OSError:
+        return 0
+
+
+db_wal_bytes = registry.register(Gauge("db_wal_bytes", "Size of the SQLite write-ahead log", callback=wal_size))
+
+
+def in_window(window: str, now: Optional[datetime] = None) -> bool:
+    """Whether the local time is inside an "HH:MM-HH:MM" window (empty means always)"""
+    if not window:
+        return True
+    start, end = (datetime.strptime(part.strip(), "%H:%M").time() for part in window.split("-"))
+    current = (now or datetime.now()).time()
+    if start <= end:
+        return start <= current < end
+    # Window across midnight, e.g. 22:00-04:00
+    return current >= start or current < end
+
+
+maintenance_load = registry.register(Gauge(
+    "maintenance_requests_in_flight", "Requests being served that maintenance waits for"))
+
+# Event streams stay open while the app is idle, they are not load
+STREAMING_PATHS = ("/api/events",)
+
+
+class RequestLoadMiddleware:
+    """Pure ASGI middleware counting in-flight HTTP requests for is_idle, streams excluded"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(STREAMING_PATHS):
+            return await self.app(scope, receive, send)
+        maintenance_load.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            maintenance_load.dec()
+
+
+def is_idle() -> bool:
+    """Few enough requests in flight to run maintenance now"""
+    return maintenance_load.values.get((), 0) <= settings.MAINTENANCE_MAX_IN_FLIGHT
+
+
+# Tasks, each returns a small dict for the stats endpoint
+async def checkpoint(db) -> dict:
+    """Checkpoint the WAL, truncating it once it has grown past MAINTENANCE_WAL_TRUNCATE_BYTES"""
+    size = wal_size()
+    mode = "TRUNCATE" if size >= settings.MAINTENANCE_WAL_TRUNCATE_BYTES else "PASSIVE"
+    cursor = await db.execute(f"PRAGMA wal_checkpoint({mode})")
+    busy, log_frames, checkpointed = await cursor.fetchone()
+    return {"mode": mode, "wal_bytes_before": size, "wal_bytes_after": wal_size(), "busy": bool(busy),
+            "log_frames": log_frames, "checkpointed_frames": checkpointed}
+
+
+async def optimize(db) -> dict:
+    """Let SQLite refresh the statistics it thinks are stale"""
+    await db.execute("PRAGMA optimize")
+    return {}
+
+
+async def analyze(db) -> dict:
+    """Rebuild query planner statistics for every table and index"""
+    await db.execute("ANALYZE")
+    await db.commit()
+    return {}
+
+
+async def incremental_vacuum(db) -> dict:
+    """Return free pages left behind by deletes to the filesystem, a bounded number per run"""
+    cursor = await db.execute("PRAGMA freelist_count")
+    free_pages = (await cursor.fetchone())[0]
+    if free_pages < settings.MAINTENANCE_VACUUM_MIN_FREE_PAGES:
+        return {"free_pages": free_pages, "freed_pages": 0}
+    cursor = await db.execute(f"PRAGMA incremental_vacuum({int(settings.MAINTENANCE_VACUUM_PAGES)})")
+    await cursor.fetchall()
+    await db.commit()
+    cursor = await db.execute("PRAGMA freelist_count")
+    remaining = (await cursor.fetchone())[0]
+    return {"free_pages": free_pages, "freed_pages": free_pages - remaining}
+
+
+async def purge_sessions(db) -> dict:
+    """Drop expired refresh sessions and revoked-token entries"""
+    return {"purged": await session_store.purge_expired()}
+
+
+async def purge_outbox(db) -> dict:
+    """Drop outbox events older than OUTBOX_RETENTION"""
+    return {"purged": await purge_events(db, time.time() - settings.OUTBOX_RETENTION)}
+
+
+class MaintenanceTask:
+    """A maintenance job, its schedule and the outcome of its last run"""
+
+    def __init__(self, name: str, run: Callable[..., Awaitable[dict]], interval: float, heavy: bool = False):
+        self.name = name
+        self.run = run
+        self.interval = interval
+        # Heavy tasks only run inside MAINTENANCE_WINDOW
+        self.heavy = heavy
+        self.next_due = time.time() + interval
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_result: Optional[dict] = None
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.failures = 0
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "heavy": self.heavy,
+            "next_due": self.next_due,
+            "last_run": self.last_run,
+            "last_duration": self.last_duration,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+            "runs": self.runs,
+            "failures": self.failures,
+        }
+
+
+class MaintenanceScheduler:
+    """Single task that runs due maintenance jobs while the worker is quiet"""
+
+    def __init__(self):
+        self.tasks: Dict[str, MaintenanceTask] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def add(self, task: MaintenanceTask):
+        if task.interval > 0:
+            self.tasks[task.name] = task
+
+    async def run_task(self, name: str) -> dict:
+        """Run one task now, regardless of its schedule"""
+        task = self.tasks[name]
+        async with self._lock:
+            start = time.perf_counter()
+            task.last_run = time.time()
+            try:
+                async with connect_db() as db:
+                    task.last_result = await task.run(db)
+                task.last_error = None
+                maintenance_runs.inc(name, "success")
+            except Exception as e:
+                task.last_result = None
+                task.last_error = str(e)
+                task.failures += 1
+                maintenance_runs.inc(name, "failure")
+                logger.warning("Maintenance task %s failed: %s", name, e)
+            finally:
+                task.runs += 1
+                task.last_duration = time.perf_counter() - start
+                task.next_due = time.time() + task.interval
+                maintenance_duration.set(task.last_duration, name)
+        return task.stats()
+
+    async def run_due(self, now: Optional[float] = None) -> list:
+        """Run every task that is due and allowed to run now"""
+        now = now or time.time()
+        ran = []
+        for task in self.tasks.values():
+            if task.next_due > now:
+                continue
+            if not is_idle() or (task.heavy and not in_window(settings.MAINTENANCE_WINDOW)):
+                # Try again on a later tick
+                continue
+            await self.run_task(task.name)
+            ran.append(task.name)
+        return ran
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.MAINTENANCE_TICK)
+            try:
+                await self.run_due()
+            except Exception:
+                logger.exception("Maintenance scheduler tick failed")
+
+    def start(self):
+        """Start the scheduler task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the scheduler task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {name: task.stats() for name, task in self.tasks.items()}
+
+
+def create_scheduler() -> MaintenanceScheduler:
+    """Scheduler with the built-in tasks, an interval of 0 disables a task"""
+    scheduler = MaintenanceScheduler()
+    scheduler.add(MaintenanceTask("checkpoint", checkpoint, settings.MAINTENANCE_CHECKPOINT_INTERVAL))
+    scheduler.add(MaintenanceTask("optimize", optimize, settings.MAINTENANCE_OPTIMIZE_INTERVAL))
+    scheduler.add(MaintenanceTask("analyze", analyze, settings.MAINTENANCE_ANALYZE_INTERVAL, heavy=True))
+    scheduler.add(MaintenanceTask("incremental_vacuum", incremental_vacuum, settings.MAINTENANCE_VACUUM_INTERVAL,
+                                  heavy=True))
+    scheduler.add(MaintenanceTask("purge_sessions", purge_sessions, settings.MAINTENANCE_PURGE_INTERVAL))
+    scheduler.add(MaintenanceTask("purge_outbox", purge_outbox, settings.MAINTENANCE_PURGE_INTERVAL))
+    return scheduler
+
+
+# Global maintenance scheduler instance
+maintenance = create_scheduler()
@@ -0,0 +1,223 @@
+import re
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels or read from a callback at scrape time"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.callback = callback
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1.0):
+        self.values[labelvalues] = self.values.get(labelvalues, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        if self.callback is not None:
+            self.values[()] = self.callback()
+        return [f"{self.name}{_labels(self.labelnames, key)} {value}" for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labelvalues):
+        self.values[labelvalues] = value
+
+    def dec(self, *labelvalues, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labelvalues -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues):
+        series = self.values.get(labelvalues)
+        if series is None:
+            series = self.values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else repr(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry scraped by GET /metrics
+registry = Registry()
+
+db_query_duration = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement execution time by normalized statement", ("statement",)))
+db_slow_queries = registry.register(Counter(
+    "db_slow_queries_total", "Statements slower than SLOW_QUERY_MS", ("statement",)))
+db_connections_open = registry.register(Gauge(
+    "db_connections_open", "Database connections currently open"))
+db_connections_opened = registry.register(Counter(
+    "db_connections_opened_total", "Database connections opened"))
+request_queries = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements issued per request", ("method", "route"), COUNT_BUCKETS))
+request_query_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("method", "route")))
+
+
+class QueryStats:
+    """SQL statements issued while serving one request"""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Stats of the request being served, None outside of requests
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_normalized: Dict[str, str] = {}
+MAX_NORMALIZED = 2048
+
+
+def normalize_statement(sql: str) -> str:
+    """Collapse literals and whitespace so one statement shape is one label"""
+    normalized = _normalized.get(sql)
+    if normalized is None:
+        normalized = _STRING_LITERAL.sub("?", sql)
+        normalized = _NUMBER_LITERAL.sub("?", normalized)
+        normalized = _IN_LIST.sub("(...)", normalized)
+        normalized = _WHITESPACE.sub(" ", normalized).strip()[:300]
+        if len(_normalized) < MAX_NORMALIZED:
+            _normalized[sql] = normalized
+    return normalized
+
+
+def record_query(sql: str, seconds: float) -> str:
+    """Record one statement in the histograms and the current request's stats"""
+    statement = normalize_statement(sql)
+    db_query_duration.observe(seconds, statement)
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += seconds
+    return statement
+
+
+# id(route) -> (route, path prefix it was included under), learned from the first
+# request it served; routes are not hashable and holding them keeps the ids unique
+_route_prefixes: Dict[int, Tuple[object, str]] = {}
+
+
+def route_label(scope) -> str:
+    """Full path template of the matched route, "unmatched" when none was.
+
+    Depending on the FastAPI version scope["route"].path may leave out the
+    include_router prefix, so the prefix is recovered as the shortest leading
+    part of the request path after which the route's own pattern matches.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    cached = _route_prefixes.get(id(route))
+    if cached is not None:
+        prefix = cached[1]
+    else:
+        prefix = ""
+        pattern = getattr(route, "path_regex", None)
+        request_path = scope.get("path", "")
+        if pattern is not None and not pattern.match(request_path):
+            for i, char in enumerate(request_path):
+                if char == "/" and i and pattern.match(request_path[i:]):
+                    prefix = request_path[:i]
+                    break
+        _route_prefixes[id(route)] = (route, prefix)
+    return prefix + path
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware collecting per-request SQL counts by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_query_stats.reset(token)
+            route_path = route_label(scope)
+            request_queries.observe(stats.count, scope["method"], route_path)
+            request_query_seconds.observe(stats.seconds, scope["method"], route_path)
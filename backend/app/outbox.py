@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Optional
+from app.analytics import vote_columns
+from app.config import settings
+from app.database import connect_db
+from app.dedup import similarity_index
+from app.suggestion_meta import suggestion_meta
+from app.timing import timed
+from app.websocket_manager import manager
+from app.ws_protocol import JSON_CODEC
+
+
+async def record_event(db, event_type: str, data: dict) -> int:
+    """Queue a realtime event inside the caller's transaction.
+
+    The caller commits together with the write that produced the event and
+    then calls outbox.notify() so the dispatcher picks it up right away.
+    """
+    with timed("broadcast"):
+        cursor = await db.execute(
+            "INSERT INTO outbox_events (event_type, payload, created_at) VALUES (?, ?, ?)",
+            (event_type, JSON_CODEC.encode(data), time.time())
+        )
+    return cursor.lastrowid
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class OutboxDispatcher:
+    """Single task per worker that reads outbox_events in id order to the connection manager.
+
+    Every worker dispatches every event to its own clients, so rows are not
+    deleted once dispatched: each worker keeps its own cursor (the last
+    dispatched id) and rows older than OUTBOX_RETENTION are purged by the
+    maintenance scheduler. SQLite serializes write transactions, so ids are
+    committed in increasing order and a cursor never skips a late commit.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.last_recorded_id = 0
+        self.last_dispatched_id = 0
+        self.cursor_loaded = False
+        self.dispatched_total = 0
+        self.failed_total = 0
+        # Recent end-to-end latencies (commit to broadcast done) in milliseconds
+        self._latencies = deque(maxlen=1024)
+
+    def notify(self, event_id: Optional[int] = None):
+        """Wake the dispatcher after committing new events"""
+        if event_id is not None and event_id > self.last_recorded_id:
+            self.last_recorded_id = event_id
+        self._wakeup.set()
+
+    async def ensure_cursor(self, db=None):
+        """Start this worker's cursor at the newest event, older ones were sent before it started"""
+        if self.cursor_loaded:
+            return
+        if db is None:
+            async with connect_db() as db:
+                return await self.ensure_cursor(db)
+        cursor = await db.execute("SELECT COALESCE(MAX(id), 0) FROM outbox_events")
+        newest = (await cursor.fetchone())[0]
+        self.last_dispatched_id = max(self.last_dispatched_id, newest)
+        self.last_recorded_id = max(self.last_recorded_id, newest)
+        manager.start_after(newest)
+        self.cursor_loaded = True
+
+    async def drain(self, db=None) -> int:
+        """Dispatch every event after this worker's cursor in order, batch by batch"""
+        if db is None:
+            async with connect_db() as db:
+                return await self.drain(db)
+        await self.ensure_cursor(db)
+        dispatched = 0
+        while True:
+            cursor = await db.execute(
+                "SELECT id, event_type, payload, created_at FROM outbox_events WHERE id > ? ORDER BY id LIMIT ?",
+                (self.last_dispatched_id, settings.OUTBOX_BATCH_SIZE)
+            )
+            rows = await cursor.fetchall()
+            if not rows:
+                return dispatched
+            for row in rows:
+                try:
+                    data = json.loads(row["payload"])
+                    suggestion_meta.apply_event(row["event_type"], data)
+                    vote_columns.apply_event(row["event_type"], data, int(row["created_at"]))
+                    similarity_index.apply_event(row["event_type"], data)
+                    await manager.dispatch(row["event_type"], data, row["id"])
+                except Exception:
+                    # A bad event must not block the ones behind it
+                    self.failed_total += 1
+                self._latencies.append((time.time() - row["created_at"]) * 1000)
+            last_id = rows[-1]["id"]
+            self.last_dispatched_id = max(self.last_dispatched_id, last_id)
+            self.last_recorded_id = max(self.last_recorded_id, last_id)
+            self.dispatched_total += len(rows)
+            dispatched += len(rows)
+
+    async def _run(self):
+        async with connect_db() as db:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    # Poll anyway, events may come from other workers
+                    pass
+                self._wakeup.clear()
+                try:
+                    await self.drain(db)
+                except Exception:
+                    # Database busy or locked, retry on the next wakeup
+                    await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL)
+
+    def start(self):
+        """Start the dispatcher task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the dispatcher task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        """Outbox depth and end-to-end event latency"""
+        latencies = list(self._latencies)
+        return {
+            "depth": max(0, self.last_recorded_id - self.last_dispatched_id),
+            "dispatched_total": self.dispatched_total,
+            "failed_total": self.failed_total,
+            "latency_ms_p50": _percentile(latencies, 0.50),
+            "latency_ms_p99": _percentile(latencies, 0.99),
+        }
+
+
+async def purge_events(db, older_than: float) -> int:
+    """Delete events recorded before a Unix time, every worker has dispatched them by then"""
+    cursor = await db.execute("DELETE FROM outbox_events WHERE created_at < ?", (older_than,))
+    await db.commit()
+    return cursor.rowcount
+
+
+# Global outbox dispatcher instance
+outbox = OutboxDispatcher()
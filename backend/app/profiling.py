@@ -0,0 +1,192 @@
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as StackCounter
+from typing import Optional
+from app.auth import get_user_for_token, is_admin
+from app.config import settings
+from app.database import connect_db
+from app.metrics import registry, Counter
+
+logger = logging.getLogger(__name__)
+
+loop_blocked = registry.register(Counter(
+    "event_loop_blocked_total", "Times a callback held the event loop longer than LOOP_BLOCK_THRESHOLD_MS"))
+
+
+async def _is_admin_request(scope) -> bool:
+    """Whether the bearer token passes the same checks as get_current_admin_user"""
+    for name, value in scope["headers"]:
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            async with connect_db() as db:
+                user = await get_user_for_token(db, value[7:].decode("latin-1"))
+            return user is not None and is_admin(user["username"])
+    return False
+
+
+class ProfileRequestMiddleware:
+    """Profile one request with cProfile when an admin sends `X-Profile: 1`.
+
+    The response is replaced by the pstats report (sorted by cumulative time),
+    the original status goes into X-Profiled-Status. cProfile sees the whole
+    thread, so coroutines of concurrent requests can show up in the report.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(
+            name == b"x-profile" and value not in (b"", b"0") for name, value in scope["headers"]
+        ) or not await _is_admin_request(scope):
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def discard(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+
+        # cProfile cannot run twice at once, profiled requests take turns
+        async with self._lock:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(settings.PROFILE_TOP_FUNCTIONS)
+        body = out.getvalue().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profiled-status", str(status_code).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def _frame_stack(frame) -> str:
+    """Folded root;...;leaf stack, the input format of flamegraph tools"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_thread(thread_id: int, seconds: float, interval: float) -> StackCounter:
+    """Sample the stack of one thread from the calling thread"""
+    stacks = StackCounter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[_frame_stack(frame)] += 1
+        time.sleep(interval)
+    return stacks
+
+
+class SamplingProfiler:
+    """Low-overhead whole-process profiler sampling the event loop thread from a helper thread"""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, interval: float) -> dict:
+        async with self._lock:
+            loop_thread = threading.get_ident()
+            stacks = await asyncio.get_running_loop().run_in_executor(
+                None, sample_thread, loop_thread, seconds, interval)
+        total = sum(stacks.values())
+        # Leaf frames give the functions the loop was actually in, idle time shows up as select()
+        leaves = StackCounter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "seconds": seconds,
+            "interval": interval,
+            "samples": total,
+            "top": [
+                {"function": name, "samples": count, "percent": round(100 * count / total, 1)}
+                for name, count in leaves.most_common(settings.PROFILE_TOP_FUNCTIONS)
+            ],
+            "folded": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()),
+        }
+
+
+class LoopWatchdog:
+    """Logs the event loop thread's stack while a callback blocks it.
+
+    The loop bumps a timestamp every few milliseconds; a helper thread checks
+    it and, once it is older than the threshold, logs where the loop thread is
+    stuck (once per blocking episode).
+    """
+
+    def __init__(self):
+        self.last_tick = time.monotonic()
+        self._loop = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id = None
+
+    def _tick(self):
+        self.last_tick = time.monotonic()
+        if not self._stop.is_set():
+            self._loop.call_later(settings.LOOP_BLOCK_THRESHOLD_MS / 4000, self._tick)
+
+    def _watch(self):
+        threshold = settings.LOOP_BLOCK_THRESHOLD_MS / 1000
+        reported = False
+        while not self._stop.wait(threshold / 2):
+            blocked_for = time.monotonic() - self.last_tick
+            if blocked_for < threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            loop_blocked.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "unavailable"
+            logger.warning("Event loop blocked for %.0f ms, loop thread stack:\n%s", blocked_for * 1000, stack)
+
+    def start(self):
+        """Start watching the running loop, no-op when LOOP_BLOCK_THRESHOLD_MS is 0"""
+        if settings.LOOP_BLOCK_THRESHOLD_MS <= 0 or self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._tick()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watchdog thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+# Global profiler and watchdog instances
+sampling_profiler = SamplingProfiler()
+loop_watchdog = LoopWatchdog()
@@ -47,12 +47,26 @@ class Suggestion(SuggestionBase):
     vote_count: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 0
+    archived: bool = False
     author: User
     
     class Config:
         from_attributes = True
 
 
+class SimilarSuggestion(BaseModel):
+    id: int
+    title: str
+    category: str
+    status: str
+    similarity: float
+
+
+class SuggestionCreated(Suggestion):
+    possible_duplicates: List[SimilarSuggestion] = []
+
+
 class SuggestionWithVotes(Suggestion):
     votes: List["Vote"] = []
     
@@ -70,23 +84,38 @@ class VoteCreate(VoteBase):
 
 
 class Vote(VoteBase):
-    id: int
     user_id: int
     suggestion_id: int
     created_at: datetime
+    archived: bool = False
     
     class Config:
         from_attributes = True
 
 
+# Per-user activity schemas
+class UserStats(BaseModel):
+    user_id: int
+    suggestions: int
+    votes_cast: int
+    score_received: int
+
+
 # Authentication schemas
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    jti: Optional[str] = None
+    expires_at: Optional[float] = None
 
 
 # WebSocket message schemas
@@ -99,12 +128,51 @@ class VoteUpdateMessage(BaseModel):
     suggestion_id: int
     new_vote_count: int
     user_vote: Optional[bool] = None
+    # The vote itself, for the in-memory indexes of every worker; not sent to clients
+    user_id: Optional[int] = None
+    is_upvote: Optional[bool] = None
 
 
 class SuggestionUpdateMessage(BaseModel):
     suggestion: Suggestion
 
 
+class SuggestionBatchUpdateMessage(BaseModel):
+    suggestions: List[Suggestion]
+
+
+# Bulk moderation schemas
+class StatusTransition(BaseModel):
+    id: int
+    status: str
+
+
+class BulkStatusUpdate(BaseModel):
+    transitions: List[StatusTransition]
+
+
+class StatusTransitionResult(BaseModel):
+    id: int
+    ok: bool
+    status_code: int
+    detail: Optional[str] = None
+    suggestion: Optional[Suggestion] = None
+
+
+class BulkStatusResult(BaseModel):
+    applied: int
+    failed: int
+    results: List[StatusTransitionResult]
+
+
+# Delta sync schemas
+class SuggestionChanges(BaseModel):
+    version: int
+    has_more: bool
+    changed: List[Suggestion]
+    deleted: List[int]
+
+
 # Response schemas
 class PaginatedResponse(BaseModel):
     items: List[Suggestion]
@@ -114,5 +182,10 @@ class PaginatedResponse(BaseModel):
     pages: int
 
 
+class SuggestionFeed(BaseModel):
+    items: List[Suggestion]
+    next_cursor: Optional[str] = None
+
+
 # Update forward references
 SuggestionWithVotes.model_rebuild() 
\ No newline at end of file
@@ -0,0 +1,192 @@
+import abc
+import hashlib
+import json
+import secrets
+import time
+from typing import Dict, Optional, Tuple
+from app.config import settings
+from app.database import connect_db
+from app.metrics import registry, Counter
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # redis is only needed for SESSION_STORE=redis
+    redis_asyncio = None
+
+logins = registry.register(Counter(
+    "auth_logins_total", "Password logins (bcrypt verifications) by result", ("result",)))
+refreshes = registry.register(Counter(
+    "auth_refreshes_total", "Refresh token exchanges by result", ("result",)))
+
+
+def _hash(refresh_token: str) -> str:
+    # Only hashes are stored, a leaked store does not leak usable tokens
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
+
+
+class SessionStore(abc.ABC):
+    """Refresh-token sessions and the access-token revocation list.
+
+    Refresh tokens are opaque and single use: refresh() consumes the token and
+    issues a new one (rotation). Revoked access tokens are keyed by their jti
+    until they would have expired anyway.
+    """
+
+    async def create(self, user_id: int, username: str) -> str:
+        """Start a session and return its refresh token"""
+        refresh_token = secrets.token_urlsafe(32)
+        expires_at = time.time() + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400
+        await self._save(_hash(refresh_token), {"user_id": user_id, "username": username}, expires_at)
+        return refresh_token
+
+    async def refresh(self, refresh_token: str) -> Optional[Tuple[dict, str]]:
+        """Consume a refresh token, returning (session, new refresh token) or None"""
+        session = await self._pop(_hash(refresh_token))
+        if session is None:
+            return None
+        return session, await self.create(session["user_id"], session["username"])
+
+    async def delete(self, refresh_token: str):
+        """End a session"""
+        await self._pop(_hash(refresh_token))
+
+    @abc.abstractmethod
+    async def _save(self, token_hash: str, session: dict, expires_at: float):
+        """Store a session under its refresh token hash until expires_at"""
+
+    @abc.abstractmethod
+    async def _pop(self, token_hash: str) -> Optional[dict]:
+        """Remove and return an unexpired session, None if there is none"""
+
+    @abc.abstractmethod
+    async def revoke(self, jti: str, expires_at: float):
+        """Reject the access token with this jti until it expires"""
+
+    @abc.abstractmethod
+    async def is_revoked(self, jti: str, db=None) -> bool:
+        """Whether the access token with this jti was revoked"""
+
+    async def purge_expired(self) -> int:
+        return 0
+
+
+class MemorySessionStore(SessionStore):
+    """Single-process store, for tests and one-worker deployments"""
+
+    def __init__(self):
+        self.sessions: Dict[str, Tuple[dict, float]] = {}
+        self.revoked: Dict[str, float] = {}
+
+    async def _save(self, token_hash: str, session: dict, expires_at: float):
+        self.sessions[token_hash] = (session, expires_at)
+
+    async def _pop(self, token_hash: str) -> Optional[dict]:
+        entry = self.sessions.pop(token_hash, None)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry[0]
+
+    async def revoke(self, jti: str, expires_at: float):
+        self.revoked[jti] = expires_at
+
+    async def is_revoked(self, jti: str, db=None) -> bool:
+        return jti in self.revoked
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        expired_sessions = [h for h, (_, expires_at) in self.sessions.items() if expires_at < now]
+        expired_jtis = [jti for jti, expires_at in self.revoked.items() if expires_at < now]
+        for token_hash in expired_sessions:
+            del self.sessions[token_hash]
+        for jti in expired_jtis:
+            del self.revoked[jti]
+        return len(expired_sessions) + len(expired_jtis)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Store in the application database, shared by workers on one node"""
+
+    async def _save(self, token_hash: str, session: dict, expires_at: float):
+        async with connect_db() as db:
+            await db.execute(
+                "INSERT INTO refresh_sessions (token_hash, user_id, username, expires_at) VALUES (?, ?, ?, ?)",
+                (token_hash, session["user_id"], session["username"], expires_at)
+            )
+            await db.commit()
+
+    async def _pop(self, token_hash: str) -> Optional[dict]:
+        async with connect_db() as db:
+            cursor = await db.execute(
+                "SELECT user_id, username, expires_at FROM refresh_sessions WHERE token_hash = ?", (token_hash,)
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            cursor = await db.execute("DELETE FROM refresh_sessions WHERE token_hash = ?", (token_hash,))
+            await db.commit()
+            # A concurrent refresh with the same token already consumed it
+            if cursor.rowcount != 1 or row["expires_at"] < time.time():
+                return None
+            return {"user_id": row["user_id"], "username": row["username"]}
+
+    async def revoke(self, jti: str, expires_at: float):
+        async with connect_db() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO revoked_tokens (jti, expires_at) VALUES (?, ?)", (jti, expires_at)
+            )
+            await db.commit()
+
+    async def is_revoked(self, jti: str, db=None) -> bool:
+        if db is None:
+            async with connect_db() as db:
+                return await self.is_revoked(jti, db)
+        cursor = await db.execute("SELECT 1 FROM revoked_tokens WHERE jti = ?", (jti,))
+        return await cursor.fetchone() is not None
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        async with connect_db() as db:
+            sessions = await db.execute("DELETE FROM refresh_sessions WHERE expires_at < ?", (now,))
+            revoked = await db.execute("DELETE FROM revoked_tokens WHERE expires_at < ?", (now,))
+            await db.commit()
+            return sessions.rowcount + revoked.rowcount
+
+
+class RedisSessionStore(SessionStore):
+    """Store shared by all nodes, entries expire through Redis TTLs"""
+
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("SESSION_STORE=redis requires the redis package")
+        self.redis = redis_asyncio.from_url(url, decode_responses=True)
+
+    async def _save(self, token_hash: str, session: dict, expires_at: float):
+        ttl = max(1, int(expires_at - time.time()))
+        await self.redis.set(f"session:{token_hash}", json.dumps(session), ex=ttl)
+
+    async def _pop(self, token_hash: str) -> Optional[dict]:
+        # GETDEL makes rotation atomic across workers
+        value = await self.redis.getdel(f"session:{token_hash}")
+        return json.loads(value) if value else None
+
+    async def revoke(self, jti: str, expires_at: float):
+        ttl = max(1, int(expires_at - time.time()))
+        await self.redis.set(f"revoked:{jti}", "1", ex=ttl)
+
+    async def is_revoked(self, jti: str, db=None) -> bool:
+        return await self.redis.exists(f"revoked:{jti}") == 1
+
+
+def create_session_store(kind: str) -> SessionStore:
+    """Session store selected by SESSION_STORE (memory, sqlite or redis)"""
+    if kind == "memory":
+        return MemorySessionStore()
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    if kind == "redis":
+        return RedisSessionStore(settings.REDIS_URL)
+    raise RuntimeError(f"Unknown SESSION_STORE {kind!r}")
+
+
+# Global session store instance
+session_store = create_session_store(settings.SESSION_STORE)
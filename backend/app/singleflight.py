@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from app.metrics import registry, Counter
+
+flight_calls = registry.register(Counter(
+    "singleflight_calls_total", "Coalescable calls by flight and outcome (executed or coalesced)",
+    ("flight", "outcome")))
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution and its result.
+
+    The first caller (the leader) runs the computation on its own connection;
+    callers arriving while it is in flight wait for the same result instead of
+    running it again. Results are shared objects, callers must not mutate
+    them. Anything a result depends on, including the user for per-user
+    fields, has to be part of the key. If the leader is cancelled (client went
+    away) the waiting callers run the computation themselves.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() unless an identical call is in flight, then share its result"""
+        future = self._inflight.get(key)
+        if future is not None:
+            flight_calls.inc(self.name, "coalesced")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # This caller was cancelled, not the leader
+                    raise
+            return await self.do(key, fn)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        flight_calls.inc(self.name, "executed")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody may be waiting, mark the exception as retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
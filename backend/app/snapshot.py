@@ -0,0 +1,76 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional
+from app.crud import get_all_vote_counts, get_user_vote_values
+from app.database import connect_db
+
+
+class TallySnapshot:
+    """Shared vote tallies for WebSocket snapshots.
+
+    Loaded from the database once, then kept current by the broadcast paths so
+    a reconnecting client costs one indexed query for its own votes instead of
+    a list request plus one tally request per suggestion.
+    """
+
+    def __init__(self):
+        self.tallies: Dict[int, int] = {}
+        self.loaded = False
+        self._lock = asyncio.Lock()
+        # Materialized [[suggestion_id, vote_count], ...] list, rebuilt lazily after changes
+        self._pairs: Optional[List[List[int]]] = None
+
+    async def ensure_loaded(self, db=None):
+        """Load all tallies once, concurrent callers wait for the same load"""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            if db is None:
+                async with connect_db() as db:
+                    tallies = await get_all_vote_counts(db)
+            else:
+                tallies = await get_all_vote_counts(db)
+            # Changes applied while loading are newer than the query result
+            tallies.update(self.tallies)
+            self.tallies = tallies
+            self._pairs = None
+            self.loaded = True
+
+    def set_tally(self, suggestion_id: int, vote_count: int):
+        """Record the latest vote count of a suggestion"""
+        if self.tallies.get(suggestion_id) != vote_count:
+            self.tallies[suggestion_id] = vote_count
+            self._pairs = None
+
+    def remove(self, suggestion_id: int):
+        """Forget a deleted suggestion"""
+        if self.tallies.pop(suggestion_id, None) is not None:
+            self._pairs = None
+
+    def pairs(self, suggestion_ids: Optional[Iterable[int]] = None) -> List[List[int]]:
+        """Compact [[suggestion_id, vote_count], ...] for all or a subset of suggestions"""
+        if suggestion_ids is None:
+            if self._pairs is None:
+                self._pairs = [[sid, count] for sid, count in self.tallies.items()]
+            return self._pairs
+        return [[sid, self.tallies[sid]] for sid in suggestion_ids if sid in self.tallies]
+
+    async def message_for(self, user_id: Optional[int], suggestion_ids: Optional[Iterable[int]] = None) -> dict:
+        """Build the snapshot message for one client, tallies only without an authenticated user_id"""
+        if suggestion_ids is not None:
+            suggestion_ids = list(suggestion_ids)
+        async with connect_db() as db:
+            await self.ensure_loaded(db)
+            user_votes = await get_user_vote_values(db, user_id) if user_id is not None else None
+        data = {"tallies": self.pairs(suggestion_ids)}
+        if user_votes is not None:
+            if suggestion_ids is not None:
+                wanted = set(suggestion_ids)
+                user_votes = {sid: up for sid, up in user_votes.items() if sid in wanted}
+            data["user_votes"] = [[sid, up] for sid, up in user_votes.items()]
+        return {"type": "snapshot", "data": data}
+
+
+# Global snapshot shared by all connections
+snapshot = TallySnapshot()
@@ -0,0 +1,116 @@
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from fastapi.routing import APIRoute
+from app.config import settings
+from app.metrics import registry, current_query_stats, route_label, Gauge, Histogram
+
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time until response headers by route", ("method", "route", "status")))
+request_stage_duration = registry.register(Histogram(
+    "http_request_stage_seconds", "Time spent in each request stage by route", ("route", "stage")))
+requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being served", ("method",)))
+
+
+class RequestTiming:
+    """Stage durations (seconds) of the request being served"""
+
+    __slots__ = ("start", "stages", "handler_done")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.handler_done: Optional[float] = None
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+# Timing of the request being served, None outside of requests or when disabled
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("current_timing", default=None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Add the time spent in the block to a stage of the current request"""
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(stage, time.perf_counter() - start)
+
+
+class TimedRoute(APIRoute):
+    """Route that records when the endpoint returns, so the rest until the
+    response starts can be reported as serialization"""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if settings.TIMING_ENABLED and inspect.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _timed_endpoint(endpoint):
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timing = current_timing.get()
+        start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timing is not None:
+                timing.handler_done = time.perf_counter()
+                timing.add("handler", timing.handler_done - start)
+    return wrapper
+
+
+def server_timing_header(timing: RequestTiming, now: float) -> Tuple[str, Dict[str, float]]:
+    """Server-Timing value, stages may overlap (db time is also part of handler)"""
+    stages = dict(timing.stages)
+    stats = current_query_stats.get()
+    if stats is not None and stats.count:
+        stages["db"] = stats.seconds
+    if timing.handler_done is not None:
+        stages["serialize"] = now - timing.handler_done
+    stages["total"] = now - timing.start
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages.items()), stages
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware recording per-route latency and adding a Server-Timing header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        method = scope["method"]
+        requests_in_flight.inc(method)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header, stages = server_timing_header(timing, time.perf_counter())
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+                route = route_label(scope)
+                request_duration.observe(stages["total"], method, route, str(message["status"]))
+                for stage, seconds in stages.items():
+                    if stage != "total":
+                        request_stage_duration.observe(seconds, route, stage)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            requests_in_flight.dec(method)
+            current_timing.reset(token)
@@ -1,78 +1,378 @@
-import json
-from typing import Dict, Set
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional
 from fastapi import WebSocket
-from app.schemas import WebSocketMessage, VoteUpdateMessage, SuggestionUpdateMessage
+from app.config import settings
+from app.heartbeat import TimingWheel
+from app.schemas import (
+    WebSocketMessage, VoteUpdateMessage, SuggestionUpdateMessage, SuggestionBatchUpdateMessage, Suggestion
+)
+from app.snapshot import snapshot
+from app.ws_protocol import JSON_CODEC, SSE_CODEC, send_frame, suggestion_delta
+
+# Number of suggestions whose last broadcast state is kept for delta frames
+MAX_TRACKED_SUGGESTIONS = 1024
+
+
+class Connection:
+    """Bookkeeping for one WebSocket client"""
+
+    __slots__ = (
+        "websocket", "user_id", "codec", "connected_at", "last_seen",
+        "frames_sent", "send_failures", "subscriptions", "topics", "versions",
+    )
+
+    def __init__(self, websocket: WebSocket, user_id: int, codec):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.codec = codec
+        self.connected_at = self.last_seen = time.monotonic()
+        self.frames_sent = 0
+        self.send_failures = 0
+        # None means every suggestion / every event type
+        self.subscriptions: Optional[frozenset] = None
+        self.topics: Optional[frozenset] = None
+        # Compact clients: suggestion id -> version of the last suggestion frame they got
+        self.versions: Dict[int, int] = {}
+
+    def knows(self, suggestion_id: int, version) -> bool:
+        """Whether this client was sent the given version of a suggestion"""
+        return version is not None and self.versions.get(suggestion_id) == version
+
+    def remember(self, suggestion: dict):
+        """Record the version of a suggestion frame sent to this client"""
+        self.versions.pop(suggestion["id"], None)
+        self.versions[suggestion["id"]] = suggestion.get("version")
+        if len(self.versions) > MAX_TRACKED_SUGGESTIONS:
+            del self.versions[next(iter(self.versions))]
+
+
+class SSEChannel:
+    """Stands in for a WebSocket so SSE streams share the manager's fan-out.
+
+    Frames are queued for the streaming response; a client that stops
+    reading fills the queue, the next send fails and the manager reaps it.
+    """
+
+    __slots__ = ("queue", "closed")
+
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+
+    async def send_text(self, frame: str):
+        if self.closed:
+            raise RuntimeError("SSE stream closed")
+        self.queue.put_nowait(frame)
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def next_frame(self, timeout: float) -> Optional[str]:
+        """Wait for the next frame, None when the channel was closed"""
+        if self.closed and self.queue.empty():
+            return None
+        return await asyncio.wait_for(self.queue.get(), timeout=timeout)
 
 
 class ConnectionManager:
     """Manages WebSocket connections and broadcasts messages"""
-    
+
     def __init__(self):
-        self.active_connections: Dict[int, Set[WebSocket]] = {}
-    
-    async def connect(self, websocket: WebSocket, user_id: int):
-        """Connect a new WebSocket client"""
-        await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = set()
-        self.active_connections[user_id].add(websocket)
-    
+        self.active_connections: Dict[int, Dict[WebSocket, Connection]] = {}
+        # Last state sent for each suggestion, compact clients only get the changes
+        self._suggestions: "OrderedDict[int, dict]" = OrderedDict()
+        self._wheel = TimingWheel(tick=settings.WS_HEARTBEAT_TICK)
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.reaped_total = 0
+        self.send_failures_total = 0
+        # Recently broadcast events kept for SSE Last-Event-ID resumption
+        self.recent_events = deque(maxlen=settings.SSE_REPLAY_BUFFER)
+        self.last_event_id = 0
+        # Highest event id that fell out of the replay buffer
+        self._replay_floor = 0
+
+    def start_after(self, event_id: int):
+        """Mark events up to event_id as sent before this process started, so older ids get a resync"""
+        self._replay_floor = max(self._replay_floor, event_id)
+        self.last_event_id = max(self.last_event_id, event_id)
+
+    async def connect(self, websocket: WebSocket, user_id: int, codec=JSON_CODEC):
+        """Register an accepted WebSocket client with its negotiated codec"""
+        connection = Connection(websocket, user_id, codec)
+        self.active_connections.setdefault(user_id, {})[websocket] = connection
+        self._wheel.schedule(connection, settings.WS_HEARTBEAT_INTERVAL)
+        return connection
+
     def disconnect(self, websocket: WebSocket, user_id: int):
         """Disconnect a WebSocket client"""
-        if user_id in self.active_connections:
-            self.active_connections[user_id].discard(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-    
+        user_connections = self.active_connections.get(user_id)
+        if user_connections is None:
+            return
+        connection = user_connections.pop(websocket, None)
+        if connection is not None:
+            self._wheel.cancel(connection)
+        if not user_connections:
+            del self.active_connections[user_id]
+
+    def touch(self, websocket: WebSocket, user_id: int):
+        """Record that a client is alive after receiving any frame from it"""
+        connection = self.active_connections.get(user_id, {}).get(websocket)
+        if connection is not None:
+            connection.last_seen = time.monotonic()
+
+    def subscribe(self, websocket: WebSocket, user_id: int, suggestion_ids: Optional[Iterable[int]] = None):
+        """Limit vote updates sent to a client to a set of suggestions (None for all)"""
+        connection = self.active_connections.get(user_id, {}).get(websocket)
+        if connection is not None:
+            connection.subscriptions = frozenset(suggestion_ids) if suggestion_ids is not None else None
+
+    def forget_suggestion(self, suggestion_id: int):
+        """Drop cached state for a deleted suggestion"""
+        self._suggestions.pop(suggestion_id, None)
+        snapshot.remove(suggestion_id)
+
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Send a message to a specific WebSocket client"""
         await websocket.send_text(message)
-    
-    async def broadcast_vote_update(self, vote_update: VoteUpdateMessage):
+
+    async def _send(self, connection: Connection, frame) -> bool:
+        """Send a frame to one client, dropping the client if the send fails or stalls"""
+        try:
+            # A dead peer that never closed would otherwise hold up every client behind it
+            await asyncio.wait_for(send_frame(connection.websocket, connection.codec, frame),
+                                   timeout=settings.WS_SEND_TIMEOUT)
+        except Exception:
+            # Connection is dead or stuck, stop sending to it
+            connection.send_failures += 1
+            self.send_failures_total += 1
+            await self._reap(connection)
+            return False
+        connection.frames_sent += 1
+        return True
+
+    async def _reap(self, connection: Connection):
+        """Forget an unresponsive client and close its socket"""
+        if connection.websocket not in self.active_connections.get(connection.user_id, {}):
+            return
+        self.disconnect(connection.websocket, connection.user_id)
+        self.reaped_total += 1
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=1001), timeout=1.0)
+        except Exception:
+            pass
+
+    async def broadcast(self, message: dict, compact_message: Optional[dict] = None,
+                        suggestion_id: Optional[int] = None, event_id: Optional[int] = None,
+                        changes: Optional[List[tuple]] = None):
+        """Encode a message once per codec in use and send it to all connected clients.
+
+        changes lists (suggestion, delta) pairs of a suggestion_update; compact
+        clients get the delta of a suggestion only when they hold its base
+        version, the full suggestion otherwise, so frames are encoded once per
+        codec and combination of those.
+        """
+        if event_id is None:
+            event_id = self.last_event_id + 1
+        self.last_event_id = max(self.last_event_id, event_id)
+        if len(self.recent_events) == self.recent_events.maxlen:
+            self._replay_floor = self.recent_events[0][0]
+        self.recent_events.append((event_id, message, suggestion_id))
+        event_type = message["type"]
+        frames = {}
+        for user_connections in list(self.active_connections.values()):
+            for connection in list(user_connections.values()):
+                if not _wants(connection.topics, connection.subscriptions, event_type, suggestion_id):
+                    continue
+                codec = connection.codec
+                compact = codec.binary and compact_message is not None
+                key = codec.name
+                if compact and changes:
+                    key = (codec.name, tuple(
+                        connection.knows(current["id"], delta.get("base_version")) for current, delta in changes
+                    ))
+                frame = frames.get(key)
+                if frame is None:
+                    payload = message
+                    if compact:
+                        payload = compact_message if not changes else _compact_changes(compact_message, changes, key[1])
+                    frame = frames[key] = codec.encode(payload, event_id)
+                if await self._send(connection, frame) and compact and changes:
+                    for current, _ in changes:
+                        connection.remember(current)
+
+    def replay(self, since: int, topics: Optional[frozenset] = None,
+               suggestion_ids: Optional[frozenset] = None) -> Optional[List[str]]:
+        """SSE frames for buffered events after `since`, None if some were already dropped"""
+        if since < self._replay_floor or since > self.last_event_id:
+            # Events were dropped, or the id comes from before a restart
+            return None
+        return [
+            SSE_CODEC.encode(message, event_id)
+            for event_id, message, suggestion_id in self.recent_events
+            if event_id > since and _wants(topics, suggestion_ids, message["type"], suggestion_id)
+        ]
+
+    def _remember_suggestion(self, suggestion: dict) -> Optional[dict]:
+        """Store the latest broadcast state of a suggestion and return the previous one"""
+        previous = self._suggestions.pop(suggestion["id"], None)
+        self._suggestions[suggestion["id"]] = suggestion
+        if len(self._suggestions) > MAX_TRACKED_SUGGESTIONS:
+            self._suggestions.popitem(last=False)
+        return previous
+
+    async def broadcast_vote_update(self, vote_update: VoteUpdateMessage, event_id: Optional[int] = None):
         """Broadcast vote update to all connected clients"""
         message = WebSocketMessage(
             type="vote_update",
-            data=vote_update.dict()
+            data=vote_update.dict(exclude={"user_id", "is_upvote"})
         )
-        
-        for user_connections in self.active_connections.values():
-            for connection in user_connections:
-                try:
-                    await connection.send_text(message.json())
-                except Exception:
-                    # Connection might be closed, ignore
-                    pass
-    
-    async def broadcast_suggestion_update(self, suggestion_update: SuggestionUpdateMessage):
+        snapshot.set_tally(vote_update.suggestion_id, vote_update.new_vote_count)
+        await self.broadcast(message.dict(), suggestion_id=vote_update.suggestion_id, event_id=event_id)
+
+    async def broadcast_suggestion_update(self, suggestion_update: SuggestionUpdateMessage, event_id: Optional[int] = None):
         """Broadcast suggestion update to all connected clients"""
         message = WebSocketMessage(
             type="suggestion_update",
             data=suggestion_update.dict()
         )
-        
-        for user_connections in self.active_connections.values():
-            for connection in user_connections:
-                try:
-                    await connection.send_text(message.json())
-                except Exception:
-                    # Connection might be closed, ignore
-                    pass
-    
-    async def broadcast_new_suggestion(self, suggestion_data: dict):
+        suggestion = message.data["suggestion"]
+        snapshot.set_tally(suggestion["id"], suggestion["vote_count"])
+        delta = suggestion_delta(self._remember_suggestion(suggestion), suggestion)
+        compact_message = {"type": "suggestion_delta", "data": {"suggestion": delta}}
+        await self.broadcast(message.dict(), compact_message, suggestion_id=suggestion["id"], event_id=event_id,
+                             changes=[(suggestion, delta)])
+
+    async def broadcast_suggestion_updates(self, batch: SuggestionBatchUpdateMessage, event_id: Optional[int] = None):
+        """Broadcast a batch of suggestion updates to all connected clients as one message"""
+        message = WebSocketMessage(
+            type="suggestion_update",
+            data=batch.dict()
+        )
+        changes = []
+        for suggestion in message.data["suggestions"]:
+            snapshot.set_tally(suggestion["id"], suggestion["vote_count"])
+            changes.append((suggestion, suggestion_delta(self._remember_suggestion(suggestion), suggestion)))
+        compact_message = {"type": "suggestion_delta", "data": {"suggestions": [delta for _, delta in changes]}}
+        await self.broadcast(message.dict(), compact_message, event_id=event_id, changes=changes)
+
+    async def broadcast_new_suggestion(self, suggestion_data: dict, event_id: Optional[int] = None):
         """Broadcast new suggestion to all connected clients"""
         message = WebSocketMessage(
             type="new_suggestion",
             data=suggestion_data
         )
-        
+        snapshot.set_tally(suggestion_data["id"], suggestion_data.get("vote_count", 0))
+        try:
+            # Keep the same value types as suggestion_update so deltas compare cleanly
+            self._remember_suggestion(Suggestion(**suggestion_data).dict())
+        except Exception:
+            pass
+        await self.broadcast(message.dict(), event_id=event_id)
+
+    async def dispatch(self, event_type: str, data: dict, event_id: Optional[int] = None):
+        """Deliver an event drained from the outbox"""
+        if event_type == "vote_update":
+            await self.broadcast_vote_update(VoteUpdateMessage(**data), event_id)
+        elif event_type == "suggestion_update" and "suggestions" in data:
+            await self.broadcast_suggestion_updates(SuggestionBatchUpdateMessage(**data), event_id)
+        elif event_type == "suggestion_update":
+            await self.broadcast_suggestion_update(SuggestionUpdateMessage(suggestion=data), event_id)
+        elif event_type == "new_suggestion":
+            await self.broadcast_new_suggestion(data, event_id)
+        elif event_type == "suggestion_deleted":
+            self.forget_suggestion(data["id"])
+        else:
+            raise ValueError(f"Unknown event type {event_type}")
+
+    # Heartbeats
+    async def check_heartbeats(self):
+        """Advance the timing wheel one tick, pinging idle clients and reaping dead ones"""
+        now = time.monotonic()
+        for connection in self._wheel.advance():
+            idle = now - connection.last_seen
+            if idle >= settings.WS_IDLE_TIMEOUT:
+                await self._reap(connection)
+                continue
+            if idle >= settings.WS_HEARTBEAT_INTERVAL:
+                frame = connection.codec.encode({"type": "ping", "timestamp": int(time.time() * 1000)})
+                if not await self._send(connection, frame):
+                    continue
+                if connection.codec.passive:
+                    # SSE clients cannot answer, a successful send is all we get
+                    connection.last_seen = now
+                    idle = 0
+                delay = min(settings.WS_HEARTBEAT_INTERVAL, settings.WS_IDLE_TIMEOUT - idle)
+            else:
+                delay = settings.WS_HEARTBEAT_INTERVAL - idle
+            self._wheel.schedule(connection, delay)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self._wheel.tick)
+            try:
+                await self.check_heartbeats()
+            except Exception:
+                # Never let one bad connection stop the heartbeat
+                pass
+
+    def start_heartbeat(self):
+        """Start the server-driven heartbeat task"""
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop_heartbeat(self):
+        """Stop the heartbeat task"""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    def stats(self) -> dict:
+        """Gauge of live vs zombie connections plus lifetime counters"""
+        now = time.monotonic()
+        live = zombie = 0
         for user_connections in self.active_connections.values():
-            for connection in user_connections:
-                try:
-                    await connection.send_text(message.json())
-                except Exception:
-                    # Connection might be closed, ignore
-                    pass
+            for connection in user_connections.values():
+                if now - connection.last_seen < settings.WS_HEARTBEAT_INTERVAL + self._wheel.tick:
+                    live += 1
+                else:
+                    zombie += 1
+        return {
+            "users": len(self.active_connections),
+            "connections": live + zombie,
+            "live": live,
+            "zombie": zombie,
+            "reaped_total": self.reaped_total,
+            "send_failures_total": self.send_failures_total,
+            "tracked_suggestions": len(self._suggestions),
+        }
+
+
+def _wants(topics: Optional[frozenset], suggestion_ids: Optional[frozenset], event_type: str,
+           suggestion_id: Optional[int]) -> bool:
+    """Whether a client filtering on topics / suggestion ids should get an event"""
+    if topics is not None and event_type not in topics:
+        return False
+    if suggestion_id is not None and suggestion_ids is not None and suggestion_id not in suggestion_ids:
+        return False
+    return True
+
+
+def _compact_changes(compact_message: dict, changes: List[tuple], known: tuple) -> dict:
+    """suggestion_delta message with the full suggestion wherever the client lacks the base version"""
+    items = [delta if has_base else current for (current, delta), has_base in zip(changes, known)]
+    data = {"suggestions": items} if "suggestions" in compact_message["data"] else {"suggestion": items[0]}
+    return {"type": compact_message["type"], "data": data}
 
 
 # Global connection manager instance
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager()
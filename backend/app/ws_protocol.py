@@ -0,0 +1,203 @@
+import json
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, clients fall back to JSON
+    msgpack = None
+
+
+# Subprotocols a client can offer in Sec-WebSocket-Protocol
+JSON_SUBPROTOCOL = "voting.json.v1"
+MSGPACK_SUBPROTOCOL = "voting.msgpack.v1"
+
+# Event types are sent as small integers in compact frames
+EVENT_CODES: Dict[str, int] = {
+    "connection_established": 1,
+    "pong": 2,
+    "subscribed": 3,
+    "error": 4,
+    "vote_update": 5,
+    "suggestion_update": 6,
+    "suggestion_delta": 7,
+    "new_suggestion": 8,
+    "ping": 9,
+    "snapshot": 10,
+}
+EVENT_NAMES: Dict[int, str] = {code: name for name, code in EVENT_CODES.items()}
+
+# Field names are shortened in compact frames
+FIELD_KEYS: Dict[str, str] = {
+    "type": "t",
+    "data": "d",
+    "message": "m",
+    "timestamp": "ts",
+    "user_id": "uid",
+    "suggestion": "sg",
+    "suggestion_id": "s",
+    "new_vote_count": "c",
+    "vote_count": "vc",
+    "user_vote": "u",
+    "id": "i",
+    "title": "ti",
+    "description": "de",
+    "category": "ca",
+    "status": "st",
+    "author_id": "a",
+    "author": "au",
+    "username": "n",
+    "email": "e",
+    "is_active": "ac",
+    "created_at": "cr",
+    "updated_at": "up",
+    "tallies": "tl",
+    "user_votes": "uv",
+    "suggestion_ids": "ids",
+    "base_version": "bv",
+}
+FIELD_NAMES: Dict[str, str] = {short: name for name, short in FIELD_KEYS.items()}
+
+
+def _compact(value):
+    """Shorten field names recursively"""
+    if isinstance(value, dict):
+        return {FIELD_KEYS.get(k, k): _compact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    return value
+
+
+def _expand(value):
+    """Restore full field names recursively"""
+    if isinstance(value, dict):
+        return {FIELD_NAMES.get(k, k): _expand(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_expand(v) for v in value]
+    return value
+
+
+def _default(value):
+    """Serialize values the encoders do not know about"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class JsonCodec:
+    """Text frames with plain JSON, the default protocol"""
+
+    name = "json"
+    binary = False
+    # Passive clients (SSE) cannot answer heartbeats
+    passive = False
+    subprotocol = JSON_SUBPROTOCOL
+
+    def encode(self, message: dict, event_id: Optional[int] = None) -> str:
+        return json.dumps(message, separators=(",", ":"), default=_default)
+
+    def decode(self, data) -> dict:
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """Binary MessagePack frames with short field keys and integer event types"""
+
+    name = "msgpack"
+    binary = True
+    passive = False
+    subprotocol = MSGPACK_SUBPROTOCOL
+
+    def encode(self, message: dict, event_id: Optional[int] = None) -> bytes:
+        frame = _compact(message)
+        if "t" in frame:
+            frame["t"] = EVENT_CODES.get(frame["t"], frame["t"])
+        return msgpack.packb(frame, default=_default)
+
+    def decode(self, data) -> dict:
+        if isinstance(data, str):
+            # Clients may still send control messages as JSON text
+            return json.loads(data)
+        message = _expand(msgpack.unpackb(data))
+        if "type" in message:
+            message["type"] = EVENT_NAMES.get(message["type"], message["type"])
+        return message
+
+
+class SSECodec:
+    """Server-Sent Events blocks for the read-only /api/events stream"""
+
+    name = "sse"
+    binary = False
+    passive = True
+    subprotocol = None
+
+    def encode(self, message: dict, event_id: Optional[int] = None) -> str:
+        data = message.get("data", {k: v for k, v in message.items() if k != "type"})
+        block = f"event: {message['type']}\ndata: {JSON_CODEC.encode(data)}\n\n"
+        if event_id is not None:
+            block = f"id: {event_id}\n" + block
+        return block
+
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = MsgpackCodec() if msgpack is not None else None
+
+# SSE is not offered to WebSocket clients so it is not part of CODECS
+SSE_CODEC = SSECodec()
+
+CODECS = {JSON_CODEC.name: JSON_CODEC}
+if MSGPACK_CODEC is not None:
+    CODECS[MSGPACK_CODEC.name] = MSGPACK_CODEC
+
+
+def negotiate(websocket: WebSocket) -> Tuple[JsonCodec, Optional[str]]:
+    """Pick the codec for a connection from its subprotocols or ?encoding= query"""
+    offered = websocket.scope.get("subprotocols") or []
+    for codec in CODECS.values():
+        if codec.subprotocol in offered:
+            return codec, codec.subprotocol
+    requested = websocket.query_params.get("encoding")
+    if requested in CODECS:
+        return CODECS[requested], None
+    return JSON_CODEC, None
+
+
+async def send_message(websocket: WebSocket, codec, message: dict):
+    """Encode and send a single message to one client"""
+    await send_frame(websocket, codec, codec.encode(message))
+
+
+async def send_frame(websocket: WebSocket, codec, frame):
+    """Send an already encoded frame to one client"""
+    if codec.binary:
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+
+async def receive_message(websocket: WebSocket, codec) -> dict:
+    """Receive and decode a single text or binary frame"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    data = message.get("bytes")
+    if data is None:
+        data = message.get("text")
+    return codec.decode(data)
+
+
+def suggestion_delta(previous: Optional[dict], current: dict) -> dict:
+    """Return only the fields of a suggestion that changed since the previous frame.
+
+    A delta carries the version it applies on top of as base_version; a client
+    holding another version must not apply it. Without a previous frame the
+    full suggestion is returned, without base_version.
+    """
+    if previous is None:
+        return current
+    delta = {k: v for k, v in current.items() if previous.get(k) != v}
+    delta["id"] = current["id"]
+    delta["base_version"] = previous.get("version")
+    return delta
@@ -0,0 +1,123 @@
+"""Vote analytics over NumPy columns vs the same metrics in SQL.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_analytics --votes 10000000
+
+Seeds a temporary database with --votes votes over --suggestions
+suggestions, loads them into app.analytics columns, then times the Wilson /
+controversy ranking, per-category participation and voter overlap against
+equivalent GROUP BY queries, and the merge of --changes queued vote changes.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from app.analytics import (
+    REMOVED, _merge, category_participation, load_columns, top_suggestions, voter_overlap
+)
+
+SQL_RANKING = '''
+    SELECT suggestion_id, COUNT(*) AS n, SUM(is_upvote) AS up FROM votes GROUP BY suggestion_id
+'''
+SQL_CATEGORIES = '''
+    SELECT s.category, COUNT(*), COUNT(DISTINCT v.user_id)
+    FROM votes v JOIN suggestions s ON s.id = v.suggestion_id GROUP BY s.category
+'''
+SQL_OVERLAP = '''
+    SELECT v.suggestion_id, COUNT(*) AS shared FROM votes v
+    WHERE v.user_id IN (SELECT user_id FROM votes WHERE suggestion_id = ?) AND v.suggestion_id != ?
+    GROUP BY v.suggestion_id ORDER BY shared DESC LIMIT 10
+'''
+
+
+def seed(path: str, args):
+    rng = np.random.default_rng(42)
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE suggestions (id INTEGER PRIMARY KEY, category TEXT NOT NULL)")
+        db.execute(
+            "CREATE TABLE votes (suggestion_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+            "is_upvote BOOLEAN NOT NULL, created_at INTEGER NOT NULL, "
+            "PRIMARY KEY (suggestion_id, user_id)) WITHOUT ROWID"
+        )
+        db.executemany(
+            "INSERT INTO suggestions VALUES (?, ?)",
+            ((i, f"Category {i % args.categories}") for i in range(1, args.suggestions + 1))
+        )
+        done = 0
+        while done < args.votes:
+            size = min(1000000, args.votes - done)
+            # Popular suggestions get more votes
+            suggestion_ids = (rng.zipf(1.3, size) % args.suggestions) + 1
+            user_ids = rng.integers(1, args.users + 1, size)
+            is_upvote = rng.random(size) < 0.7
+            created_at = rng.integers(1.6e9, 1.7e9, size)
+            cursor = db.executemany(
+                "INSERT OR IGNORE INTO votes VALUES (?, ?, ?, ?)",
+                zip(suggestion_ids.tolist(), user_ids.tolist(), is_upvote.tolist(), created_at.tolist())
+            )
+            done += cursor.rowcount
+        db.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--votes", type=int, default=10000000)
+    parser.add_argument("--suggestions", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=500000)
+    parser.add_argument("--categories", type=int, default=12)
+    parser.add_argument("--changes", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="voting-analytics-"), "analytics.db")
+    print(f"seeding {args.votes} votes over {args.suggestions} suggestions in {path}")
+    seed(path, args)
+    start = time.perf_counter()
+    columns = load_columns(path)
+    print(f"loaded in {time.perf_counter() - start:.1f} s, "
+          f"{sum(c.nbytes for c in columns) / 1e6:.0f} MB ({sum(c.nbytes for c in columns) / len(columns[0]):.0f} bytes per vote)")
+
+    with sqlite3.connect(path) as db:
+        categories = dict(db.execute("SELECT id, category FROM suggestions"))
+        popular = int(np.bincount(columns[0]).argmax())
+        rows = [
+            ("wilson + controversy ranking", lambda: top_suggestions(columns, "wilson", 20),
+             lambda: db.execute(SQL_RANKING).fetchall()),
+            ("category participation", lambda: category_participation(columns, categories),
+             lambda: db.execute(SQL_CATEGORIES).fetchall()),
+            ("voter overlap (most voted)", lambda: voter_overlap(columns, popular, 10),
+             lambda: db.execute(SQL_OVERLAP, (popular, popular)).fetchall()),
+        ]
+        print(f"{'metric':<32}{'numpy ms':>10}{'sql ms':>10}{'speedup':>10}")
+        for name, vectorized, sql in rows:
+            numpy_ms = timed(vectorized, args.repeat)
+            sql_ms = timed(sql, 1)
+            print(f"{name:<32}{numpy_ms:>10.1f}{sql_ms:>10.1f}{sql_ms / numpy_ms:>9.1f}x")
+
+    rng = random.Random(7)
+    pending = [
+        (rng.randint(1, args.suggestions), rng.randint(1, args.users),
+         REMOVED if rng.random() < 0.1 else rng.randint(0, 1), 1700000000)
+        for _ in range(args.changes)
+    ]
+    print(f"merge {args.changes} queued changes  {timed(lambda: _merge(columns, pending, []), 1):>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Hot query latency before and after archiving closed suggestions.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_archive --suggestions 20000 --votes 2000000 --closed 0.9
+
+Seeds a temporary database with --suggestions suggestions, of which the
+--closed fraction are implemented/rejected and past the archive grace
+period, and --votes votes spread over them. Each hot query the API runs on
+every list/top/snapshot request is timed (median of --repeat runs) against
+the full tables, then the archiver moves the closed suggestions and their
+votes out and the queries are timed again.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="voting-archive-")
+_db_path = os.path.join(_db_dir, "archive.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ.setdefault("SLOW_QUERY_MS", "1000000")
+
+from app.archive import archive_closed_suggestions  # noqa: E402
+from app.crud import (  # noqa: E402
+    get_all_vote_counts, get_suggestion_vote_count, get_suggestions, get_suggestions_by_category,
+    get_top_suggestions, get_user_vote_values
+)
+from app.database import connect_db, init_db  # noqa: E402
+
+
+def seed(suggestions: int, votes: int, closed: float, users: int):
+    rng = random.Random(42)
+    with sqlite3.connect(_db_path) as db:
+        db.executemany(
+            "INSERT INTO users (id, username, email, hashed_password, is_active) VALUES (?, ?, ?, 'x', 1)",
+            ((i, f"user{i}", f"user{i}@example.com") for i in range(1, users + 1))
+        )
+        statuses = []
+        for i in range(1, suggestions + 1):
+            if rng.random() < closed:
+                statuses.append((i, rng.choice(("implemented", "rejected")), "-90 days"))
+            else:
+                statuses.append((i, "active", "-0 days"))
+        db.executemany(
+            """
+            INSERT INTO suggestions (id, title, description, category, status, author_id, created_at, updated_at)
+            VALUES (?, 'Suggestion', 'Benchmark suggestion.', 'General', ?, 1,
+                    datetime('now', ?), datetime('now', ?))
+            """,
+            ((i, status, age, age) for i, status, age in statuses)
+        )
+        # Distinct (user, suggestion) pairs, like the real unique vote per user
+        pairs = set()
+        while len(pairs) < votes:
+            pairs.add((rng.randint(1, users), rng.randint(1, suggestions)))
+        db.executemany(
+            "INSERT INTO votes (user_id, suggestion_id, is_upvote) VALUES (?, ?, ?)",
+            ((user_id, suggestion_id, rng.random() < 0.7) for user_id, suggestion_id in pairs)
+        )
+        db.commit()
+        db.execute("ANALYZE")
+    return [i for i, status, _ in statuses if status == "active"]
+
+
+async def time_queries(db, active_ids, repeat: int) -> dict:
+    probe = active_ids[len(active_ids) // 2]
+    queries = {
+        "top_suggestions": lambda: get_top_suggestions(db, limit=10),
+        "all_vote_counts": lambda: get_all_vote_counts(db),
+        "list_page": lambda: get_suggestions(db, skip=0, limit=100),
+        "categories": lambda: get_suggestions_by_category(db),
+        "suggestion_tally": lambda: get_suggestion_vote_count(db, probe),
+        "user_votes": lambda: get_user_vote_values(db, 2),
+    }
+    results = {}
+    for name, query in queries.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await query()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(samples)
+    return results
+
+
+async def run(args):
+    await init_db()
+    print(f"seeding {args.suggestions} suggestions and {args.votes} votes in {_db_path}")
+    active_ids = seed(args.suggestions, args.votes, args.closed, args.users)
+    async with connect_db() as db:
+        before = await time_queries(db, active_ids, args.repeat)
+        start = time.perf_counter()
+        totals = await archive_closed_suggestions(db, grace_days=30, chunk_size=args.chunk_size)
+        archive_seconds = time.perf_counter() - start
+        await db.execute("ANALYZE")
+        after = await time_queries(db, active_ids, args.repeat)
+    print(f"archived {totals['suggestions']} suggestions and {totals['votes']} votes in {archive_seconds:.1f} s "
+          f"({args.chunk_size} suggestions per transaction)")
+    print(f"{'query':<20}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<20}{before[name]:>12.2f}{after[name]:>12.2f}{speedup:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suggestions", type=int, default=20000)
+    parser.add_argument("--votes", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--closed", type=float, default=0.9, help="fraction of suggestions closed and old")
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Vote latency while an online backup is running.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_backup --votes 500000 --concurrency 20
+    python -m benchmarks.bench_backup --pages-per-step 1024 --step-sleep 0
+
+Seeds a temporary database, runs a vote storm on its own to get a baseline,
+then runs the same storm while BackupManager copies the database, and
+reports p50/p95/p99 of POST /api/votes/ for both runs together with the
+backup duration and the number of restarts caused by concurrent writes.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.loadtest import PASSWORD, Recorder, auth, seed_database, summarize
+
+
+async def vote_storm(client, voters, hot: int, recorder: Recorder, rng: random.Random, until, concurrency: int):
+    """Vote from `concurrency` workers until until() is true"""
+    async def worker(offset: int):
+        i = offset
+        while not until():
+            await recorder.request(client, "vote", "POST", "/api/votes/", headers=auth(voters[i % len(voters)]),
+                                   json={"suggestion_id": 1 + i % hot, "is_upvote": rng.random() < 0.7})
+            i += concurrency
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+
+async def run(args):
+    db_dir = tempfile.mkdtemp(prefix="voting-backup-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'backup.db')}"
+    os.environ["BACKUP_DIR"] = os.path.join(db_dir, "backups")
+    os.environ["BACKUP_PAGES_PER_STEP"] = str(args.pages_per_step)
+    os.environ["BACKUP_STEP_SLEEP"] = str(args.step_sleep)
+    os.environ["VOTE_RATE_PER_SECOND"] = "0"
+    os.environ.setdefault("SLOW_QUERY_MS", "1000000")
+    from app.backup import backup_manager
+    from app.database import get_db_path, init_db
+    from app.main import app
+
+    await init_db()
+    seed_database(get_db_path(), args.users, args.suggestions, args.votes, 42)
+    print(f"database {os.path.getsize(get_db_path()) / 1e6:.1f} MB")
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            voters = []
+            for i in range(1, args.voters + 1):
+                resp = await client.post("/api/auth/login", data={"username": f"load{i}", "password": PASSWORD})
+                voters.append(resp.json()["access_token"])
+            rng = random.Random(42)
+
+            baseline = Recorder()
+            deadline = time.perf_counter() + args.seconds
+            start = time.perf_counter()
+            await vote_storm(client, voters, args.hot, baseline, rng, lambda: time.perf_counter() > deadline,
+                             args.concurrency)
+            baseline_report = summarize(baseline.latencies["vote"], baseline.errors["vote"],
+                                        time.perf_counter() - start)
+
+            during = Recorder()
+            backup = asyncio.create_task(backup_manager.run())
+            start = time.perf_counter()
+            await vote_storm(client, voters, args.hot, during, rng, backup.done, args.concurrency)
+            during_report = summarize(during.latencies["vote"], during.errors["vote"], time.perf_counter() - start)
+            result = await backup
+    finally:
+        await app.router.shutdown()
+
+    print(f"backup {result['size'] / 1e6:.1f} MB in {result['seconds']:.2f} s, {result['steps']} steps, "
+          f"{result['restarts']} restarts, {result['mode']}")
+    print(f"{'POST /api/votes/':<18}{'req':>7}{'err':>5}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for label, r in (("baseline", baseline_report), ("during backup", during_report)):
+        print(f"{label:<18}{r['requests']:>7}{r['errors']:>5}{r['rps']:>9.1f}"
+              f"{r['p50_ms'] or 0:>9.2f}{r['p95_ms'] or 0:>9.2f}{r['p99_ms'] or 0:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--suggestions", type=int, default=5000)
+    parser.add_argument("--votes", type=int, default=200000)
+    parser.add_argument("--voters", type=int, default=50, help="users logged in for the vote storm")
+    parser.add_argument("--hot", type=int, default=50, help="suggestions the storm votes on")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=5, help="length of the baseline run")
+    parser.add_argument("--pages-per-step", type=int, default=256)
+    parser.add_argument("--step-sleep", type=float, default=0.005)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
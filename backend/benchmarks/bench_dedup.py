@@ -0,0 +1,126 @@
+"""Near-duplicate lookups: MinHash/LSH index vs comparing against every suggestion.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_dedup --suggestions 200000
+
+Seeds a temporary database with --suggestions random suggestions, --planted
+of which are reworded copies (some words swapped) of another one, builds the
+index, then times a lookup (candidates plus exact verification) against a
+scan computing the shingle Jaccard similarity with every suggestion, and
+reports how many planted duplicates at or above DEDUP_THRESHOLD each finds.
+"""
+import argparse
+import random
+import sqlite3
+import os
+import tempfile
+import time
+
+# Pending entries are merged explicitly at the end
+os.environ.setdefault("DEDUP_FLUSH_PENDING", "1000000000")
+
+from app.config import settings  # noqa: E402
+from app.dedup import MinHasher, SimilarityIndex, load_index, shingles, jaccard  # noqa: E402
+
+
+def words(rng: random.Random, vocabulary, count: int) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(count))
+
+
+def reword(rng: random.Random, text: str, vocabulary, share: float) -> str:
+    return " ".join(rng.choice(vocabulary) if rng.random() < share else w for w in text.split())
+
+
+def seed(path: str, args):
+    rng = random.Random(42)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+                  for _ in range(args.vocabulary)]
+    rows = [(i, words(rng, vocabulary, 7), words(rng, vocabulary, 25)) for i in range(1, args.suggestions + 1)]
+    # Reworded copies of random originals, replacing ~10% of the words
+    planted = []
+    for copy_id in rng.sample(range(1, args.suggestions + 1), args.planted):
+        original = rng.randint(1, args.suggestions)
+        if original == copy_id:
+            continue
+        _, title, description = rows[original - 1]
+        rows[copy_id - 1] = (copy_id, reword(rng, title, vocabulary, 0.1), reword(rng, description, vocabulary, 0.1))
+        planted.append((copy_id, original))
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE suggestions (id INTEGER PRIMARY KEY, title TEXT, description TEXT)")
+        db.executemany("INSERT INTO suggestions VALUES (?, ?, ?)", rows)
+    return {row[0]: row for row in rows}, planted
+
+
+def lookup(index: SimilarityIndex, texts, suggestion_id: int):
+    """What crud.get_similar_suggestions does, with the rows already in memory"""
+    _, title, description = texts[suggestion_id]
+    target = shingles(title, description)
+    found = []
+    for candidate in index.candidates(title, description, suggestion_id):
+        similarity = jaccard(target, shingles(*texts[candidate][1:]))
+        if similarity >= settings.DEDUP_THRESHOLD:
+            found.append(candidate)
+    return found
+
+
+def scan(texts, suggestion_id: int):
+    _, title, description = texts[suggestion_id]
+    target = shingles(title, description)
+    return [i for i, row in texts.items()
+            if i != suggestion_id and jaccard(target, shingles(*row[1:])) >= settings.DEDUP_THRESHOLD]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suggestions", type=int, default=200000)
+    parser.add_argument("--planted", type=int, default=2000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--scans", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="voting-dedup-"), "dedup.db")
+    print(f"seeding {args.suggestions} suggestions ({args.planted} reworded copies) in {path}")
+    texts, planted = seed(path, args)
+
+    index = SimilarityIndex()
+    index.hasher = MinHasher()
+    start = time.perf_counter()
+    index.keys, index.ids = load_index(path, index.hasher)
+    index.loading = index.loaded = True
+    print(f"index built in {time.perf_counter() - start:.1f} s, {index.memory_bytes() / 1e6:.0f} MB "
+          f"({index.memory_bytes() / len(index):.0f} bytes per suggestion)")
+
+    # Only pairs that really are near-duplicates count towards recall
+    expected = [(c, o) for c, o in planted
+                if jaccard(shingles(*texts[c][1:]), shingles(*texts[o][1:])) >= settings.DEDUP_THRESHOLD]
+    start = time.perf_counter()
+    found = sum(o in lookup(index, texts, c) for c, o in expected)
+    lsh_ms = (time.perf_counter() - start) * 1000 / max(len(expected), 1)
+    start = time.perf_counter()
+    for copy_id, _ in expected[:args.scans]:
+        scan(texts, copy_id)
+    scan_ms = (time.perf_counter() - start) * 1000 / max(min(args.scans, len(expected)), 1)
+    print(f"{len(expected)} planted pairs with Jaccard >= {settings.DEDUP_THRESHOLD}, "
+          f"LSH finds {found} ({found / max(len(expected), 1):.0%})")
+    print(f"lookup (candidates + verification)  {lsh_ms:>8.2f} ms")
+    print(f"scan of every suggestion            {scan_ms:>8.2f} ms")
+
+    rng = random.Random(7)
+    start = time.perf_counter()
+    for _ in range(args.lookups):
+        index.candidates(*texts[rng.randint(1, args.suggestions)][1:])
+    print(f"candidates of a random suggestion   {(time.perf_counter() - start) * 1000 / args.lookups:>8.2f} ms")
+
+    start = time.perf_counter()
+    for i in range(args.lookups):
+        index.add(args.suggestions + i + 1, *texts[rng.randint(1, args.suggestions)][1:])
+    print(f"index a new suggestion              {(time.perf_counter() - start) * 1000 / args.lookups:>8.2f} ms")
+    start = time.perf_counter()
+    index.merge_pending()
+    print(f"merge {args.lookups} pending entries          {(time.perf_counter() - start) * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Per-connection memory of idle SSE streams vs idle WebSocket connections.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_sse_memory --clients 10000
+
+Both paths go through the full ASGI app in-process (middleware, endpoint
+coroutine, connection manager record), with clients that never send or
+disconnect. Server socket buffers are not included, so this compares what
+the application itself keeps per connection.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import sqlite3
+import tempfile
+import tracemalloc
+
+# Use a throwaway database before the app reads its settings
+_db_dir = tempfile.mkdtemp(prefix="voting-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+
+from app.auth import create_access_token, get_password_hash  # noqa: E402
+from app.database import get_db_path, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.websocket_manager import manager  # noqa: E402
+
+BATCH = 200
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+async def idle_websocket(user_id: int, forever: asyncio.Future):
+    scope = {
+        "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+        "path": f"/api/ws/{user_id}", "raw_path": f"/api/ws/{user_id}".encode(), "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"bench")], "subprotocols": [],
+        "client": ("127.0.0.1", user_id), "server": ("bench", 80),
+    }
+    connected = False
+
+    async def receive():
+        nonlocal connected
+        if not connected:
+            connected = True
+            return {"type": "websocket.connect"}
+        await asyncio.shield(forever)
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def idle_sse(token: str, index: int, forever: asyncio.Future):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "scheme": "http", "http_version": "1.1",
+        "method": "GET", "path": "/api/events", "raw_path": b"/api/events", "root_path": "",
+        "query_string": f"access_token={token}".encode(), "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", index), "server": ("bench", 80),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.shield(forever)
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+def connection_count() -> int:
+    return sum(len(c) for c in manager.active_connections.values())
+
+
+async def measure(name: str, clients: int, factory) -> dict:
+    # One never-completing future keeps every simulated client idle
+    forever = asyncio.get_running_loop().create_future()
+    gc.collect()
+    tracemalloc.start()
+    traced_before = tracemalloc.get_traced_memory()[0]
+    rss_before = rss_bytes()
+    tasks = []
+    for start in range(0, clients, BATCH):
+        for i in range(start, min(clients, start + BATCH)):
+            tasks.append(asyncio.create_task(factory(i, forever)))
+        while connection_count() < len(tasks):
+            await asyncio.sleep(0.01)
+    gc.collect()
+    traced_after = tracemalloc.get_traced_memory()[0]
+    rss_after = rss_bytes()
+    tracemalloc.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    forever.cancel()
+    manager.active_connections.clear()
+    return {
+        "path": name,
+        "clients": clients,
+        "traced_bytes_per_connection": (traced_after - traced_before) / clients,
+        "rss_bytes_per_connection": (rss_after - rss_before) / clients,
+    }
+
+
+async def run(clients: int) -> list:
+    await init_db()
+    with sqlite3.connect(get_db_path()) as db:
+        db.execute(
+            "INSERT INTO users (username, email, hashed_password, is_active) VALUES (?, ?, ?, 1)",
+            ("bench", "bench@example.com", get_password_hash("bench-password")),
+        )
+    token = create_access_token({"sub": "bench"})
+    return [
+        await measure("websocket", clients, idle_websocket),
+        await measure("sse", clients, lambda i, forever: idle_sse(token, i, forever)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--json", dest="output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.clients))
+    print(f"{'path':<12}{'clients':>9}{'traced B/conn':>16}{'rss B/conn':>14}")
+    for r in results:
+        print(f"{r['path']:<12}{r['clients']:>9}{r['traced_bytes_per_connection']:>16.0f}{r['rss_bytes_per_connection']:>14.0f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Cold start: time from launching a worker to its first successful request.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup --runs 5 --json startup.json
+    python -m benchmarks.bench_startup --runs 5 --baseline startup.json --tolerance 0.25
+    python -m benchmarks.bench_startup --budget-ms 2500
+
+Each run starts `uvicorn app.main:app` in a fresh process against the same
+temporary database (the first run creates the schema, later runs are warm
+restarts) and polls GET / until it answers. The import time of app.main is
+measured separately. Exits with status 1 when the median time to first
+request exceeds --budget-ms or regresses past the baseline by more than
+--tolerance.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time(env: dict) -> float:
+    """Seconds to import app.main in a fresh interpreter, minus interpreter startup"""
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.check_output([sys.executable, "-c", code], env=env, text=True)
+    return float(out.strip().splitlines()[-1])
+
+
+def time_to_first_request(env: dict, timeout: float) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise SystemExit(f"worker exited during startup:\n{proc.stderr.read().decode()}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.01)
+        raise SystemExit(f"no response within {timeout} s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--budget-ms", type=float, help="fail when the median exceeds this")
+    parser.add_argument("--baseline", help="JSON from an earlier --json run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression over the baseline")
+    parser.add_argument("--json", dest="output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="voting-startup-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'startup.db')}")
+    cold = time_to_first_request(env, args.timeout)
+    warm = [time_to_first_request(env, args.timeout) for _ in range(args.runs)]
+    imports = [import_time(env) for _ in range(args.runs)]
+    results = {
+        "first_boot_ms": cold * 1000,
+        "time_to_first_request_ms": statistics.median(warm) * 1000,
+        "time_to_first_request_ms_max": max(warm) * 1000,
+        "import_app_main_ms": statistics.median(imports) * 1000,
+        "runs": args.runs,
+    }
+    for name, value in results.items():
+        print(f"{name:<32}{value:>10.1f}" if isinstance(value, float) else f"{name:<32}{value:>10}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = False
+    median = results["time_to_first_request_ms"]
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"FAIL: time to first request {median:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["time_to_first_request_ms"]
+        limit = baseline * (1 + args.tolerance)
+        if median > limit:
+            print(f"FAIL: time to first request {median:.1f} ms regressed past {limit:.1f} ms "
+                  f"(baseline {baseline:.1f} ms + {args.tolerance:.0%})")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
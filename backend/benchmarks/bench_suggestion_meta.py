@@ -0,0 +1,86 @@
+"""Memory and lookup cost of the suggestion metadata cache.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_suggestion_meta --suggestions 1000000
+
+Fills app.suggestion_meta with --suggestions entries and reports the bytes
+held by its arrays next to the traced size of an equivalent dict of tuples,
+then times a cached lookup against the SELECT * the vote endpoints used to
+run on an indexed table of the same size.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from app.suggestion_meta import SuggestionMetaCache
+
+STATUSES = ("active", "implemented", "rejected")
+
+
+def fill(cache: SuggestionMetaCache, count: int, rng: random.Random):
+    for suggestion_id in range(1, count + 1):
+        cache.set(suggestion_id, rng.randint(1, 50000), rng.choice(STATUSES), suggestion_id)
+
+
+def dict_bytes(count: int, rng: random.Random) -> int:
+    tracemalloc.start()
+    entries = {i: (rng.randint(1, 50000), rng.choice(STATUSES), i) for i in range(1, count + 1)}
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del entries
+    return size
+
+
+def time_sqlite(count: int, probes) -> float:
+    path = os.path.join(tempfile.mkdtemp(prefix="voting-meta-"), "meta.db")
+    with sqlite3.connect(path) as db:
+        db.execute(
+            "CREATE TABLE suggestions (id INTEGER PRIMARY KEY, title TEXT, description TEXT, category TEXT, "
+            "status TEXT, author_id INTEGER, created_at TIMESTAMP, updated_at TIMESTAMP, version INTEGER)"
+        )
+        db.executemany(
+            "INSERT INTO suggestions VALUES (?, 'A suggestion title', ?, 'General', 'active', 1, "
+            "CURRENT_TIMESTAMP, NULL, ?)",
+            ((i, "A longer description of the suggestion. " * 8, i) for i in range(1, count + 1))
+        )
+        db.commit()
+        start = time.perf_counter()
+        for suggestion_id in probes:
+            db.execute("SELECT * FROM suggestions WHERE id = ?", (suggestion_id,)).fetchone()
+        return (time.perf_counter() - start) / len(probes) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suggestions", type=int, default=1000000)
+    parser.add_argument("--probes", type=int, default=100000)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    cache = SuggestionMetaCache()
+    tracemalloc.start()
+    fill(cache, args.suggestions, rng)
+    cache_traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    baseline = dict_bytes(args.suggestions, rng)
+    print(f"{args.suggestions} suggestions")
+    print(f"  arrays (memory_bytes)      {cache.memory_bytes() / 1e6:>8.1f} MB "
+          f"({cache.memory_bytes() / args.suggestions:.1f} bytes each, traced {cache_traced / 1e6:.1f} MB)")
+    print(f"  dict of tuples (traced)    {baseline / 1e6:>8.1f} MB ({baseline / args.suggestions:.1f} bytes each)")
+
+    probes = [rng.randint(1, args.suggestions) for _ in range(args.probes)]
+    start = time.perf_counter()
+    for suggestion_id in probes:
+        cache.peek(suggestion_id)
+    cached_us = (time.perf_counter() - start) / len(probes) * 1e6
+    sqlite_us = time_sqlite(args.suggestions, probes[:10000])
+    print(f"  cached lookup {cached_us:.2f} us, SELECT * by id {sqlite_us:.2f} us (sync sqlite3, no event loop hop)")
+
+
+if __name__ == "__main__":
+    main()
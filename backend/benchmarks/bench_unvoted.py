@@ -0,0 +1,150 @@
+"""Cost of the "not yet voted" feed for users with many votes.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_unvoted --suggestions 50000 --user-votes 40000
+
+Seeds a temporary database with --suggestions active suggestions and
+--votes background votes, gives one heavy user --user-votes votes, then
+times the first page and a full cursor walk of get_unvoted_suggestions
+against what clients did before: fetch every suggestion, the caller's vote
+map and filter and rank them locally. Single pages are also timed at
+increasing cursor depths; they should cost the same at any depth, as the
+cursor seeks idx_suggestions_status_votes. The other anti-join spellings
+(LEFT JOIN ... IS NULL, NOT IN) are timed on the same data for comparison.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="voting-unvoted-")
+_db_path = os.path.join(_db_dir, "unvoted.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ.setdefault("SLOW_QUERY_MS", "1000000")
+
+from app.crud import get_all_vote_counts, get_unvoted_suggestions, get_user_vote_values  # noqa: E402
+from app.database import RECOUNT_VOTES, connect_db, init_db  # noqa: E402
+
+HEAVY_USER = 1
+
+VARIANTS = {
+    "left join is null": '''
+        SELECT s.id FROM suggestions s
+        LEFT JOIN votes v ON v.suggestion_id = s.id AND v.user_id = ?
+        WHERE s.status = 'active' AND s.author_id != ? AND v.user_id IS NULL
+    ''',
+    "not in": '''
+        SELECT s.id FROM suggestions s
+        WHERE s.status = 'active' AND s.author_id != ?
+          AND s.id NOT IN (SELECT suggestion_id FROM votes WHERE user_id = ?)
+    ''',
+    "not exists": '''
+        SELECT s.id FROM suggestions s
+        WHERE s.status = 'active' AND s.author_id != ?
+          AND NOT EXISTS (SELECT 1 FROM votes v WHERE v.suggestion_id = s.id AND v.user_id = ?)
+    ''',
+}
+
+
+def seed(args):
+    rng = random.Random(42)
+    with sqlite3.connect(_db_path) as db:
+        db.executemany(
+            "INSERT INTO suggestions (id, title, description, category, author_id) "
+            "VALUES (?, 'Suggestion', 'Benchmark suggestion.', 'General', ?)",
+            ((i, rng.randint(2, args.users)) for i in range(1, args.suggestions + 1))
+        )
+        heavy = rng.sample(range(1, args.suggestions + 1), args.user_votes)
+        pairs = {(suggestion_id, HEAVY_USER) for suggestion_id in heavy}
+        while len(pairs) < args.user_votes + args.votes:
+            pairs.add((rng.randint(1, args.suggestions), rng.randint(2, args.users)))
+        db.executemany(
+            "INSERT INTO votes (suggestion_id, user_id, is_upvote, created_at) VALUES (?, ?, ?, 0)",
+            ((suggestion_id, user_id, rng.random() < 0.7) for suggestion_id, user_id in sorted(pairs))
+        )
+        # Votes inserted directly skip the crud path that keeps the tallies current
+        db.execute(RECOUNT_VOTES)
+        db.commit()
+        db.execute("ANALYZE")
+
+
+async def client_scan(db):
+    """The previous approach: everything plus the caller's votes, ranked locally"""
+    cursor = await db.execute("SELECT * FROM suggestions")
+    suggestions = [dict(row) for row in await cursor.fetchall()]
+    voted = await get_user_vote_values(db, HEAVY_USER)
+    counts = await get_all_vote_counts(db)
+    unvoted = [
+        s for s in suggestions
+        if s["status"] == "active" and s["author_id"] != HEAVY_USER and s["id"] not in voted
+    ]
+    unvoted.sort(key=lambda s: (counts.get(s["id"], 0), s["id"]), reverse=True)
+    return unvoted
+
+
+async def walk(db, limit: int, cursors=None) -> int:
+    rows = 0
+    after = None
+    while True:
+        if cursors is not None:
+            cursors.append(after)
+        page = await get_unvoted_suggestions(db, HEAVY_USER, limit=limit, after=after)
+        rows += len(page)
+        if len(page) < limit:
+            return rows
+        after = (page[-1]["vote_count"], page[-1]["id"])
+
+
+async def timed(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+async def run(args):
+    await init_db()
+    print(f"seeding {args.suggestions} suggestions, {args.votes + args.user_votes} votes in {_db_path}")
+    seed(args)
+    async with connect_db() as db:
+        expected = len(await client_scan(db))
+        print(f"heavy user: {args.user_votes} votes, {expected} suggestions left to vote on")
+        print(f"  client scan (old)               {await timed(lambda: client_scan(db), args.repeat):>10.1f} ms")
+        first_page = await timed(lambda: get_unvoted_suggestions(db, HEAVY_USER, limit=args.limit), args.repeat)
+        print(f"  unvoted first page ({args.limit:>3})        {first_page:>10.1f} ms")
+        cursors = []
+        assert await walk(db, args.limit, cursors) == expected
+        print(f"  unvoted full cursor walk        {await timed(lambda: walk(db, args.limit), 1):>10.1f} ms")
+        for share in (0.25, 0.5, 0.75, 1.0):
+            page = min(int(share * len(cursors)), len(cursors) - 1)
+            cost = await timed(lambda: get_unvoted_suggestions(db, HEAVY_USER, limit=args.limit, after=cursors[page]),
+                               args.repeat)
+            print(f"  unvoted page {page + 1:>6} of {len(cursors):<6}     {cost:>10.1f} ms")
+        for name, query in VARIANTS.items():
+            async def variant(query=query):
+                cursor = await db.execute(query, (HEAVY_USER, HEAVY_USER))
+                return await cursor.fetchall()
+            print(f"  anti-join only, {name:<16}{await timed(variant, args.repeat):>10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suggestions", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--votes", type=int, default=500000, help="votes cast by the other users")
+    parser.add_argument("--user-votes", type=int, default=40000, help="votes cast by the heavy user")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Per-user activity: maintained counters vs aggregating on every request.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_user_stats --votes 1000000
+
+Seeds a temporary database with --suggestions suggestions and --votes votes,
+lets init_db backfill user_stats, then times get_user_stats against the
+aggregation it replaces (votes cast plus the net score over every suggestion
+the user wrote) for the most active author and voter, and the first page of
+the "my votes" list.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="voting-user-stats-")
+_db_path = os.path.join(_db_dir, "user_stats.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ.setdefault("SLOW_QUERY_MS", "1000000")
+
+from app.crud import get_user_stats, get_user_votes  # noqa: E402
+from app.database import SCHEMA_VERSION, connect_db, init_db  # noqa: E402
+
+AGGREGATE = '''
+    SELECT
+        (SELECT COUNT(*) FROM suggestions WHERE author_id = :user) AS suggestions,
+        (SELECT COUNT(*) FROM votes WHERE user_id = :user) AS votes_cast,
+        (SELECT COALESCE(SUM(CASE WHEN v.is_upvote THEN 1 ELSE -1 END), 0)
+         FROM suggestions s JOIN votes v ON v.suggestion_id = s.id WHERE s.author_id = :user) AS score_received
+'''
+
+
+def seed(args):
+    rng = random.Random(42)
+    # Skewed authors and voters, a few users do most of the work
+    pick = lambda: min(args.users, int(rng.paretovariate(1.2)))  # noqa: E731
+    with sqlite3.connect(_db_path) as db:
+        db.executemany(
+            "INSERT INTO users (id, username, email, hashed_password) VALUES (?, ?, ?, 'x')",
+            ((i, f"user{i}", f"user{i}@example.com") for i in range(1, args.users + 1))
+        )
+        db.executemany(
+            "INSERT INTO suggestions (id, title, description, category, author_id) "
+            "VALUES (?, 'Suggestion', 'Benchmark suggestion.', 'General', ?)",
+            ((i, pick()) for i in range(1, args.suggestions + 1))
+        )
+        pairs = set()
+        while len(pairs) < args.votes:
+            pairs.add((rng.randint(1, args.suggestions), pick()))
+        db.executemany(
+            "INSERT INTO votes (suggestion_id, user_id, is_upvote, created_at) VALUES (?, ?, ?, ?)",
+            ((s, u, rng.random() < 0.7, rng.randint(0, 10 ** 9)) for s, u in sorted(pairs))
+        )
+        # Rebuild user_stats from the seeded rows on the next init_db
+        db.execute("DROP TABLE user_stats")
+        db.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1}")
+        db.commit()
+
+
+async def timed(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+async def run(args):
+    await init_db()
+    print(f"seeding {args.suggestions} suggestions, {args.votes} votes in {_db_path}")
+    seed(args)
+    start = time.perf_counter()
+    await init_db()
+    print(f"user_stats backfilled in {time.perf_counter() - start:.1f} s")
+    async with connect_db() as db:
+        cursor = await db.execute("SELECT user_id FROM user_stats ORDER BY votes_cast DESC LIMIT 1")
+        voter = (await cursor.fetchone())[0]
+        cursor = await db.execute("SELECT user_id FROM user_stats ORDER BY suggestions DESC LIMIT 1")
+        author = (await cursor.fetchone())[0]
+        for label, user_id in (("top voter", voter), ("top author", author)):
+            stats = await get_user_stats(db, user_id)
+            cursor = await db.execute(AGGREGATE, {"user": user_id})
+            assert tuple(await cursor.fetchone()) == (stats["suggestions"], stats["votes_cast"], stats["score_received"])
+
+            async def aggregate():
+                cursor = await db.execute(AGGREGATE, {"user": user_id})
+                return await cursor.fetchone()
+            print(f"{label} {user_id}: {stats['suggestions']} suggestions, {stats['votes_cast']} votes cast")
+            print(f"  aggregation        {await timed(aggregate, args.repeat):>8.2f} ms")
+            print(f"  user_stats         {await timed(lambda: get_user_stats(db, user_id), args.repeat):>8.2f} ms")
+            print(f"  my votes, page 1   {await timed(lambda: get_user_votes(db, user_id), args.repeat):>8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--suggestions", type=int, default=50000)
+    parser.add_argument("--votes", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
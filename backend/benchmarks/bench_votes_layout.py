@@ -0,0 +1,145 @@
+"""On-disk size and lookup latency of the votes table, old layout vs WITHOUT ROWID.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_votes_layout --votes 5000000
+
+Seeds a temporary database with --votes votes in the old layout (rowid
+table with a surrogate id, UNIQUE(user_id, suggestion_id) and text
+timestamps), measures the table and index pages via dbstat and times the
+lookups the API makes, then lets init_db migrate the table and measures
+again.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp(prefix="voting-votes-")
+_db_path = os.path.join(_db_dir, "votes.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ.setdefault("SLOW_QUERY_MS", "1000000")
+
+from app.crud import get_suggestion_vote_count, get_top_suggestions, get_user_vote, get_user_vote_values  # noqa: E402
+from app.database import connect_db, init_db  # noqa: E402
+
+LEGACY_VOTES = '''
+    CREATE TABLE votes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        suggestion_id INTEGER NOT NULL,
+        is_upvote BOOLEAN NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(user_id, suggestion_id),
+        FOREIGN KEY(user_id) REFERENCES users(id),
+        FOREIGN KEY(suggestion_id) REFERENCES suggestions(id)
+    )
+'''
+
+
+def seed_legacy(votes: int, users: int, suggestions: int):
+    rng = random.Random(42)
+    with sqlite3.connect(_db_path) as db:
+        db.execute("DROP TABLE votes")
+        db.execute(LEGACY_VOTES)
+        db.executemany(
+            "INSERT INTO suggestions (id, title, description, category, author_id) "
+            "VALUES (?, 'Suggestion', 'Benchmark suggestion.', 'General', 1)",
+            ((i,) for i in range(1, suggestions + 1))
+        )
+        pairs = set()
+        while len(pairs) < votes:
+            pairs.add((rng.randint(1, users), rng.randint(1, suggestions)))
+        # Votes arrive in time order, not grouped by suggestion
+        db.executemany(
+            "INSERT INTO votes (user_id, suggestion_id, is_upvote) VALUES (?, ?, ?)",
+            ((user_id, suggestion_id, rng.random() < 0.7) for user_id, suggestion_id in pairs)
+        )
+        db.execute("PRAGMA user_version = 0")
+        db.commit()
+    return sorted(pairs)
+
+
+def storage() -> dict:
+    """Bytes used by the votes table and its indexes, after a VACUUM"""
+    with sqlite3.connect(_db_path) as db:
+        db.execute("VACUUM")
+        db.execute("ANALYZE")
+        rows = db.execute(
+            """
+            SELECT d.name, SUM(d.pgsize) FROM dbstat d
+            JOIN sqlite_master m ON m.name = d.name
+            WHERE m.tbl_name = 'votes' GROUP BY d.name
+            """
+        ).fetchall()
+    sizes = dict(rows)
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+
+async def time_lookups(pairs, repeat: int, probes: int) -> dict:
+    rng = random.Random(7)
+    sample = rng.sample(pairs, probes)
+    async with connect_db() as db:
+        queries = {
+            "user_vote": lambda: [get_user_vote(db, user_id, suggestion_id) for user_id, suggestion_id in sample],
+            "suggestion_tally": lambda: [get_suggestion_vote_count(db, suggestion_id) for _, suggestion_id in sample],
+            "user_votes": lambda: [get_user_vote_values(db, user_id) for user_id, _ in sample],
+        }
+        results = {}
+        for name, make in queries.items():
+            samples = []
+            for _ in range(repeat):
+                calls = make()
+                start = time.perf_counter()
+                for call in calls:
+                    await call
+                samples.append((time.perf_counter() - start) * 1000 / probes)
+            results[name] = statistics.median(samples)
+        start = time.perf_counter()
+        await get_top_suggestions(db, limit=10)
+        results["top_suggestions"] = (time.perf_counter() - start) * 1000
+    return results
+
+
+async def run(args):
+    await init_db()
+    print(f"seeding {args.votes} votes in the old layout in {_db_path}")
+    pairs = seed_legacy(args.votes, args.users, args.suggestions)
+    before_size = storage()
+    before = await time_lookups(pairs, args.repeat, args.probes)
+    start = time.perf_counter()
+    await init_db()
+    migrate_seconds = time.perf_counter() - start
+    after_size = storage()
+    after = await time_lookups(pairs, args.repeat, args.probes)
+
+    print(f"migrated in {migrate_seconds:.1f} s")
+    print("storage (bytes)")
+    for name, size in before_size.items():
+        print(f"  old {name:<34}{size:>14,}")
+    for name, size in after_size.items():
+        print(f"  new {name:<34}{size:>14,}")
+    print(f"  {before_size['total'] / after_size['total']:.2f}x smaller")
+    print(f"{'lookup (ms per call)':<22}{'old':>10}{'new':>10}{'speedup':>10}")
+    for name in before:
+        print(f"{name:<22}{before[name]:>10.3f}{after[name]:>10.3f}{before[name] / after[name]:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--votes", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--suggestions", type=int, default=5000)
+    parser.add_argument("--probes", type=int, default=200, help="lookups per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
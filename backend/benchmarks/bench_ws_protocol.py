@@ -0,0 +1,102 @@
+"""Compare bytes and CPU per event for the JSON and MessagePack WebSocket protocols.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_ws_protocol --events 20000
+
+Sizes are reported raw and after permessage-deflate (raw DEFLATE with context
+takeover, as negotiated by browsers by default).
+"""
+import argparse
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from app.schemas import VoteUpdateMessage, SuggestionUpdateMessage, WebSocketMessage
+from app.ws_protocol import JSON_CODEC, MSGPACK_CODEC, suggestion_delta
+
+
+def sample_suggestion(i: int) -> dict:
+    created = datetime(2024, 1, 1) + timedelta(minutes=i)
+    return {
+        "id": i,
+        "title": f"Suggestion number {i} for the office",
+        "description": "Replace the old coffee machine with one that can make espresso " * 2,
+        "category": "Facilities",
+        "status": "active",
+        "author_id": i % 500,
+        "vote_count": i % 37,
+        "created_at": created,
+        "updated_at": created + timedelta(hours=1),
+        "author": {
+            "id": i % 500,
+            "username": f"user{i % 500}",
+            "email": f"user{i % 500}@example.com",
+            "is_active": True,
+            "created_at": created,
+        },
+    }
+
+
+def build_events(count: int):
+    """Return (json_message, compact_message) pairs for a realistic event mix"""
+    events = []
+    for i in range(count):
+        if i % 10 < 8:
+            data = VoteUpdateMessage(suggestion_id=i % 200, new_vote_count=i % 50, user_vote=bool(i % 2)).model_dump()
+            message = WebSocketMessage(type="vote_update", data=data).model_dump()
+            events.append((message, message))
+        else:
+            before = sample_suggestion(i % 200)
+            after = dict(before, vote_count=before["vote_count"] + 1, updated_at=before["updated_at"] + timedelta(minutes=5))
+            data = SuggestionUpdateMessage(suggestion=after).model_dump()
+            message = WebSocketMessage(type="suggestion_update", data=data).model_dump()
+            previous = SuggestionUpdateMessage(suggestion=before).model_dump()["suggestion"]
+            compact = {"type": "suggestion_delta", "data": {"suggestion": suggestion_delta(previous, data["suggestion"])}}
+            events.append((message, compact))
+    return events
+
+
+def measure(codec, messages):
+    """Encode every message, return bytes and CPU time per event"""
+    start = time.process_time()
+    frames = [codec.encode(m) for m in messages]
+    cpu = time.process_time() - start
+    raw = [f.encode() if isinstance(f, str) else f for f in frames]
+    deflate = zlib.compressobj(wbits=-15)
+    compressed = 0
+    for frame in raw:
+        compressed += len(deflate.compress(frame) + deflate.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return {
+        "codec": codec.name,
+        "events": len(messages),
+        "bytes_per_event": sum(len(f) for f in raw) / len(raw),
+        "deflate_bytes_per_event": compressed / len(raw),
+        "cpu_us_per_event": cpu / len(messages) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--json", dest="output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    events = build_events(args.events)
+    results = [measure(JSON_CODEC, [e[0] for e in events])]
+    if MSGPACK_CODEC is not None:
+        results.append(measure(MSGPACK_CODEC, [e[1] for e in events]))
+    else:
+        print("msgpack is not installed, only the JSON protocol was measured")
+
+    print(f"{'codec':<10}{'bytes/event':>14}{'deflate/event':>16}{'cpu us/event':>16}")
+    for r in results:
+        print(f"{r['codec']:<10}{r['bytes_per_event']:>14.1f}{r['deflate_bytes_per_event']:>16.1f}{r['cpu_us_per_event']:>16.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""HTTP load test for the API hot paths.
+
+Run from the backend directory, either in-process over the ASGI app (a
+temporary database is seeded directly) or against a running server (data is
+seeded through the API):
+
+    python -m benchmarks.loadtest --users 200 --suggestions 2000 --votes 20000 --output before.json
+    python -m benchmarks.loadtest --url http://localhost:8000 --users 50 --suggestions 200 --votes 1000
+    python -m benchmarks.loadtest --compare before.json after.json
+
+Scenarios: login burst, list browsing, top-K polling and a vote storm on a
+few hot suggestions. For every endpoint the report has req/s and
+p50/p95/p99 latency; --output stores it as JSON so runs can be compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+PASSWORD = "loadtest-password"
+CATEGORIES = ["General", "Facilities", "Engineering", "HR", "Events", "Food"]
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Throughput and latency percentiles (ms) for one endpoint"""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+class Recorder:
+    """Collects per-endpoint latencies for one scenario"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = await client.request(method, url, **kwargs)
+            ok = resp.status_code < 400
+        except httpx.HTTPError:
+            resp, ok = None, False
+        self.latencies[label].append((time.perf_counter() - start) * 1000)
+        if not ok:
+            self.errors[label] += 1
+        return resp
+
+
+async def run_scenario(client: httpx.AsyncClient, total: int, concurrency: int,
+                       make_request: Callable[[Recorder, int], "asyncio.Future"]) -> dict:
+    """Issue `total` requests from `concurrency` workers and summarize per endpoint"""
+    recorder = Recorder()
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            await make_request(recorder, i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {label: summarize(values, recorder.errors[label], elapsed) for label, values in recorder.latencies.items()}
+
+
+# Seeding
+def seed_database(db_path: str, users: int, suggestions: int, votes: int, seed: int) -> None:
+    """Fill an empty database directly, much faster than going through the API"""
+    from app.auth import get_password_hash
+    from app.database import RECOUNT_VOTES
+
+    rng = random.Random(seed)
+    hashed = get_password_hash(PASSWORD)
+    with sqlite3.connect(db_path) as db:
+        db.executemany(
+            "INSERT INTO users (username, email, hashed_password, is_active) VALUES (?, ?, ?, 1)",
+            ((f"load{i}", f"load{i}@example.com", hashed) for i in range(users)),
+        )
+        user_ids = [row[0] for row in db.execute("SELECT id FROM users ORDER BY id")]
+        # The first suggestions belong to the first user, they are the hot ones in the vote storm
+        db.executemany(
+            "INSERT INTO suggestions (title, description, category, author_id, status) VALUES (?, ?, ?, ?, 'active')",
+            (
+                (f"Suggestion {i}", f"Load test suggestion number {i}. " * 4, rng.choice(CATEGORIES),
+                 user_ids[0] if i < 10 else rng.choice(user_ids))
+                for i in range(suggestions)
+            ),
+        )
+        rows = db.execute("SELECT id, author_id FROM suggestions").fetchall()
+        seen = set()
+        batch = []
+        attempts = 0
+        while len(batch) < votes and attempts < votes * 4:
+            attempts += 1
+            suggestion_id, author_id = rng.choice(rows)
+            user_id = rng.choice(user_ids)
+            if user_id == author_id or (user_id, suggestion_id) in seen:
+                continue
+            seen.add((user_id, suggestion_id))
+            batch.append((user_id, suggestion_id, rng.random() < 0.7))
+        db.executemany("INSERT INTO votes (user_id, suggestion_id, is_upvote) VALUES (?, ?, ?)", batch)
+        db.execute(RECOUNT_VOTES)
+
+
+async def seed_through_api(client: httpx.AsyncClient, users: int, suggestions: int, votes: int,
+                           seed: int, concurrency: int) -> None:
+    """Seed a running server through the public API"""
+    rng = random.Random(seed)
+    await run_scenario(client, users, concurrency, lambda r, i: r.request(
+        client, "register", "POST", "/api/auth/register",
+        json={"username": f"load{i}", "email": f"load{i}@example.com", "password": PASSWORD}))
+    tokens = await login_all(client, min(users, 50), concurrency)
+    await run_scenario(client, suggestions, concurrency, lambda r, i: r.request(
+        client, "create", "POST", "/api/suggestions/", headers=auth(tokens[0 if i < 10 else i % len(tokens)]),
+        json={"title": f"Suggestion {i}", "description": f"Load test suggestion number {i}.",
+              "category": rng.choice(CATEGORIES)}))
+    await run_scenario(client, votes, concurrency, lambda r, i: r.request(
+        client, "vote", "POST", "/api/votes/", headers=auth(tokens[1 + i % (len(tokens) - 1)]),
+        json={"suggestion_id": rng.randint(1, suggestions), "is_upvote": rng.random() < 0.7}))
+
+
+async def login_all(client: httpx.AsyncClient, users: int, concurrency: int) -> List[str]:
+    tokens: List[Optional[str]] = [None] * users
+
+    async def login(recorder: Recorder, i: int):
+        resp = await recorder.request(client, "login", "POST", "/api/auth/login",
+                                      data={"username": f"load{i}", "password": PASSWORD})
+        if resp is not None and resp.status_code == 200:
+            tokens[i] = resp.json()["access_token"]
+
+    await run_scenario(client, users, concurrency, login)
+    return [t for t in tokens if t]
+
+
+def auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+# Scenarios
+async def run_all(client: httpx.AsyncClient, args) -> dict:
+    results = {}
+    # Login burst also produces the tokens for the other scenarios (user 0 owns the hot suggestions)
+    tokens: List[Optional[str]] = [None] * args.logins
+
+    async def login(recorder: Recorder, i: int):
+        resp = await recorder.request(client, "POST /api/auth/login", "POST", "/api/auth/login",
+                                      data={"username": f"load{i % args.users}", "password": PASSWORD})
+        if resp is not None and resp.status_code == 200:
+            tokens[i] = resp.json()["access_token"]
+
+    results["login_burst"] = await run_scenario(client, args.logins, args.concurrency, login)
+    tokens = [t for t in tokens if t]
+    if len(tokens) < 2:
+        raise SystemExit("login burst did not produce enough tokens, is the data seeded?")
+    rng = random.Random(args.seed)
+    pages = max(1, args.suggestions // 100)
+
+    results["list_browsing"] = await run_scenario(client, args.requests, args.concurrency, lambda r, i: r.request(
+        client, "GET /api/suggestions/", "GET", "/api/suggestions/",
+        params={"skip": rng.randrange(pages) * 100}, headers=auth(tokens[i % len(tokens)])))
+
+    async def poll_top(recorder: Recorder, i: int):
+        if i % 4 == 3:
+            await recorder.request(client, "GET /api/suggestions/categories", "GET", "/api/suggestions/categories",
+                                   headers=auth(tokens[i % len(tokens)]))
+        else:
+            await recorder.request(client, "GET /api/suggestions/top", "GET", "/api/suggestions/top",
+                                   params={"limit": 10}, headers=auth(tokens[i % len(tokens)]))
+
+    results["top_polling"] = await run_scenario(client, args.requests, args.concurrency, poll_top)
+
+    voters = tokens[1:] if args.logins > 1 else tokens
+    results["vote_storm"] = await run_scenario(client, args.requests, args.concurrency, lambda r, i: r.request(
+        client, "POST /api/votes/", "POST", "/api/votes/", headers=auth(voters[i % len(voters)]),
+        json={"suggestion_id": 1 + i % args.hot, "is_upvote": rng.random() < 0.7}))
+    return results
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_in_process(args) -> dict:
+    db_dir = tempfile.mkdtemp(prefix="voting-loadtest-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'loadtest.db')}"
+    from app.database import get_db_path, init_db
+    from app.main import app
+
+    await init_db()
+    seed_database(get_db_path(), args.users, args.suggestions, args.votes, args.seed)
+    await app.router.startup()
+    try:
+        # Unhandled app errors count as 500 responses, like they would behind uvicorn
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            return await run_all(client, args)
+    finally:
+        await app.router.shutdown()
+
+
+async def run_against_server(args) -> dict:
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        if not args.no_seed:
+            await seed_through_api(client, args.users, args.suggestions, args.votes, args.seed, args.concurrency)
+        return await run_all(client, args)
+
+
+def print_report(report: dict) -> None:
+    print(f"{'scenario':<15}{'endpoint':<36}{'req':>7}{'err':>5}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for scenario, endpoints in report["scenarios"].items():
+        for endpoint, r in endpoints.items():
+            print(f"{scenario:<15}{endpoint:<36}{r['requests']:>7}{r['errors']:>5}{r['rps']:>9.1f}"
+                  f"{r['p50_ms'] or 0:>9.2f}{r['p95_ms'] or 0:>9.2f}{r['p99_ms'] or 0:>9.2f}")
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print req/s and p95 changes between two stored runs"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before.get('revision')} -> {after.get('revision')}")
+    print(f"{'scenario':<15}{'endpoint':<36}{'req/s':>18}{'p95 ms':>20}")
+    for scenario, endpoints in after["scenarios"].items():
+        for endpoint, new in endpoints.items():
+            old = before["scenarios"].get(scenario, {}).get(endpoint)
+            if old is None:
+                continue
+            rps_change = (new["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0.0
+            p95_change = (new["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+            print(f"{scenario:<15}{endpoint:<36}{new['rps']:>9.1f} ({rps_change:+5.1f}%)"
+                  f"{new['p95_ms']:>11.2f} ({p95_change:+5.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--no-seed", action="store_true", help="with --url, reuse data seeded by an earlier run")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--suggestions", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--logins", type=int, default=50, help="requests in the login burst")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per read/write scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--hot", type=int, default=3, help="number of hot suggestions in the vote storm")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two stored reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    scenarios = asyncio.run(run_against_server(args) if args.url else run_in_process(args))
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": args.url or "in-process",
+        "python": sys.version.split()[0],
+        "params": {k: getattr(args, k) for k in ("users", "suggestions", "votes", "logins", "requests", "concurrency", "hot", "seed")},
+        "scenarios": scenarios,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
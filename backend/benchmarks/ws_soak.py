@@ -0,0 +1,263 @@
+"""WebSocket fan-out soak test.
+
+Run from the backend directory:
+
+    python -m benchmarks.ws_soak --steps 100,1000,5000 --votes 50 --rate 20
+
+Simulated clients connect to /api/ws/{user_id} through the full ASGI app
+in-process and answer heartbeats. At every step the client count is ramped
+up, votes are cast through the REST API (and delivered by the outbox
+dispatcher), and each frame is timestamped on arrival. The report has
+delivery latency percentiles (vote request sent to frame received), frames
+dropped, RSS per connection and event-loop lag for every step.
+
+Clients share the event loop with the server, so the numbers include the
+cost of receiving the frames; use them to compare ConnectionManager changes,
+not as absolute capacity.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import sqlite3
+import tempfile
+import time
+from typing import List, Tuple
+
+import httpx
+
+# Use a throwaway database before the app reads its settings
+_db_dir = tempfile.mkdtemp(prefix="voting-soak-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'soak.db')}"
+
+from app.auth import create_access_token  # noqa: E402
+from app.database import get_db_path, init_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.outbox import outbox  # noqa: E402
+from app.websocket_manager import manager  # noqa: E402
+
+BATCH = 200
+PONG = json.dumps({"type": "pong"})
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def percentile(values: List[float], fraction: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SoakClient:
+    """One simulated WebSocket client driving the ASGI app directly"""
+
+    def __init__(self, index: int, frames: List[Tuple[float, str]]):
+        self.index = index
+        self.frames = frames
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.inbox.put_nowait({"type": "websocket.connect"})
+        self.task = None
+
+    def start(self):
+        path = f"/api/ws/{self.index}"
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": b"", "headers": [(b"host", b"soak")], "subprotocols": [],
+            "client": ("127.0.0.1", self.index), "server": ("soak", 80),
+        }
+        self.task = asyncio.create_task(app(scope, self.inbox.get, self.send))
+
+    async def send(self, message):
+        text = message.get("text")
+        if text is None:
+            return
+        # Parsing is deferred to the report so clients stay cheap
+        if '"ping"' in text:
+            self.inbox.put_nowait({"type": "websocket.receive", "text": PONG})
+        else:
+            self.frames.append((time.perf_counter(), text))
+
+    async def close(self):
+        self.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self.task, timeout=5)
+        except (asyncio.TimeoutError, Exception):
+            self.task.cancel()
+
+
+class LagMonitor:
+    """Measures how late a periodic timer fires, a proxy for event-loop blocking"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append((time.perf_counter() - start - self.interval) * 1000)
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def connection_count() -> int:
+    return sum(len(c) for c in manager.active_connections.values())
+
+
+def seed(voters: int, hot: int):
+    """One author owning the hot suggestions and one voter per vote, so every
+    vote raises a tally and (suggestion_id, new_vote_count) names one event"""
+    with sqlite3.connect(get_db_path()) as db:
+        db.executemany(
+            "INSERT INTO users (username, email, hashed_password, is_active) VALUES (?, ?, 'unused', 1)",
+            ((f"soak{i}", f"soak{i}@example.com") for i in range(voters + 1)),
+        )
+        db.executemany(
+            "INSERT INTO suggestions (title, description, category, author_id, status) VALUES (?, ?, 'General', 1, 'active')",
+            ((f"Hot suggestion {i}", "Soak test suggestion") for i in range(hot)),
+        )
+
+
+async def drive_votes(client: httpx.AsyncClient, first_voter: int, votes: int, rate: float, hot: int) -> dict:
+    """Cast votes at a fixed rate, returning send times keyed by the event they produce"""
+    sent = {}
+
+    async def cast(voter: int):
+        token = create_access_token({"sub": f"soak{voter}"})
+        start = time.perf_counter()
+        resp = await client.post("/api/votes/", json={"suggestion_id": 1 + voter % hot, "is_upvote": True},
+                                 headers={"Authorization": f"Bearer {token}"})
+        if resp.status_code == 200:
+            body = resp.json()
+            sent[(body["suggestion_id"], body["vote_count"])] = start
+
+    tasks = []
+    for i in range(votes):
+        tasks.append(asyncio.create_task(cast(first_voter + i)))
+        await asyncio.sleep(1 / rate)
+    await asyncio.gather(*tasks)
+    return sent
+
+
+async def wait_for_delivery(frames: list, expected: int, timeout: float):
+    """Wait until all expected frames arrived or nothing new came for `timeout` seconds"""
+    last_count, last_change = len(frames), time.perf_counter()
+    while len(frames) < expected:
+        await asyncio.sleep(0.05)
+        if len(frames) != last_count:
+            last_count, last_change = len(frames), time.perf_counter()
+        elif time.perf_counter() - last_change > timeout:
+            return
+
+
+async def run(steps: List[int], votes: int, rate: float, hot: int, drain_timeout: float) -> list:
+    await init_db()
+    seed(votes * len(steps), hot)
+    await app.router.startup()
+    results = []
+    clients: List[SoakClient] = []
+    frames: List[Tuple[float, str]] = []
+    lag = LagMonitor()
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://soak", timeout=60) as http:
+            for step, target in enumerate(steps):
+                gc.collect()
+                rss_before, added = rss_bytes(), target - len(clients)
+                for start in range(len(clients), target, BATCH):
+                    for i in range(start, min(target, start + BATCH)):
+                        client = SoakClient(i + 1, frames)
+                        client.start()
+                        clients.append(client)
+                    while connection_count() < len(clients):
+                        await asyncio.sleep(0.01)
+                gc.collect()
+                rss_per_connection = (rss_bytes() - rss_before) / added if added > 0 else None
+                frames.clear()
+                failures_before = manager.send_failures_total
+                lag.start()
+                sent = await drive_votes(http, 1 + step * votes, votes, rate, hot)
+                await wait_for_delivery(frames, len(sent) * len(clients), drain_timeout)
+                await lag.stop()
+
+                latencies = []
+                for received_at, text in frames:
+                    message = json.loads(text)
+                    if message.get("type") != "vote_update":
+                        continue
+                    data = message["data"]
+                    started = sent.get((data["suggestion_id"], data["new_vote_count"]))
+                    if started is not None:
+                        latencies.append((received_at - started) * 1000)
+                expected = len(sent) * len(clients)
+                results.append({
+                    "clients": len(clients),
+                    "votes": len(sent),
+                    "frames_expected": expected,
+                    "frames_received": len(latencies),
+                    "frames_dropped": expected - len(latencies),
+                    "send_failures": manager.send_failures_total - failures_before,
+                    "latency_ms_p50": percentile(latencies, 0.50),
+                    "latency_ms_p95": percentile(latencies, 0.95),
+                    "latency_ms_p99": percentile(latencies, 0.99),
+                    "latency_ms_max": max(latencies) if latencies else None,
+                    "rss_bytes_per_connection": rss_per_connection,
+                    "loop_lag_ms_p99": percentile(lag.samples, 0.99),
+                    "loop_lag_ms_max": max(lag.samples) if lag.samples else None,
+                    "outbox": outbox.stats(),
+                })
+            await asyncio.gather(*(c.close() for c in clients))
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", default="100,1000,5000", help="comma separated client counts to ramp through")
+    parser.add_argument("--votes", type=int, default=50, help="votes cast at every step")
+    parser.add_argument("--rate", type=float, default=20.0, help="votes per second")
+    parser.add_argument("--hot", type=int, default=3, help="number of suggestions receiving the votes")
+    parser.add_argument("--drain-timeout", type=float, default=5.0,
+                        help="seconds without new frames before counting the rest as dropped")
+    parser.add_argument("--json", dest="output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    steps = [int(s) for s in args.steps.split(",")]
+    results = asyncio.run(run(steps, args.votes, args.rate, args.hot, args.drain_timeout))
+    print(f"{'clients':>8}{'votes':>7}{'dropped':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'B/conn':>9}{'lag p99':>9}{'lag max':>9}")
+    for r in results:
+        print(f"{r['clients']:>8}{r['votes']:>7}{r['frames_dropped']:>9}"
+              f"{fmt(r['latency_ms_p50'], '.1f'):>9}{fmt(r['latency_ms_p95'], '.1f'):>9}"
+              f"{fmt(r['latency_ms_p99'], '.1f'):>9}{fmt(r['latency_ms_max'], '.1f'):>9}"
+              f"{fmt(r['rss_bytes_per_connection'], '.0f'):>9}"
+              f"{fmt(r['loop_lag_ms_p99'], '.1f'):>9}{fmt(r['loop_lag_ms_max'], '.1f'):>9}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
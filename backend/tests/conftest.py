@@ -0,0 +1,52 @@
+import asyncio
+import os
+import tempfile
+import pytest
+
+# Point the app at a throwaway database before app.config is imported
+_db_dir = tempfile.mkdtemp(prefix="voting-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_tables():
+    """Create the schema once, the ASGI test clients do not run startup hooks"""
+    from app.database import init_db
+    asyncio.run(init_db())
+
+
+async def get_auth_token(ac, username, email, password):
+    await ac.post("/api/auth/register", json={
+        "username": username,
+        "email": email,
+        "password": password
+    })
+    resp = await ac.post("/api/auth/login", data={
+        "username": username,
+        "password": password
+    })
+    return resp.json()["access_token"]
+
+
+@pytest.fixture
+def login():
+    """Register (if needed) and log in a user, returning its Authorization headers"""
+    async def login(ac, username: str) -> dict:
+        token = await get_auth_token(ac, username, f"{username}@example.com", f"{username}pass")
+        return {"Authorization": f"Bearer {token}"}
+    return login
+
+
+@pytest.fixture
+def create_suggestion():
+    """Create a suggestion through the API, returning the response body"""
+    async def create(ac, headers: dict, title: str = "Test Suggestion",
+                     description: str = "Test description.", category: str = "General") -> dict:
+        resp = await ac.post("/api/suggestions/", json={
+            "title": title,
+            "description": description,
+            "category": category
+        }, headers=headers)
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+    return create
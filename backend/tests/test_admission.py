@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from fastapi.middleware.cors import CORSMiddleware
+from app.admission import AdmissionMiddleware, ConcurrencyLimiter, Overloaded, TokenBucket, classify
+from app.config import settings
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_then_sheds():
+    limiter = ConcurrencyLimiter("test", limit=1, queue=1, timeout=0.05)
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as exc:
+        await limiter.acquire()
+    assert exc.value.reason == "queue_full"
+    with pytest.raises(Overloaded) as exc:
+        await waiter
+    assert exc.value.reason == "timeout"
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    await limiter.release()
+    await waiter
+    assert limiter.active == 1 and limiter.waiting == 0
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket()
+    assert bucket.take(1, rate=1, burst=2) == 0
+    assert bucket.take(1, rate=1, burst=2) == 0
+    assert bucket.take(1, rate=1, burst=2) > 0
+    assert bucket.take(2, rate=1, burst=2) == 0
+
+
+def test_only_password_checks_use_the_auth_class():
+    def route_class(method, path):
+        return classify({"type": "http", "method": method, "path": path})
+    assert route_class("POST", "/api/auth/login") == "auth"
+    assert route_class("POST", "/api/auth/register") == "auth"
+    assert route_class("POST", "/api/auth/refresh") == "write"
+    assert route_class("POST", "/api/auth/logout") == "write"
+    assert route_class("GET", "/api/auth/me") == "read"
+    assert route_class("OPTIONS", "/api/auth/login") is None
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.mark.asyncio
+async def test_saturated_route_class_gets_503(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_READ_LIMIT", 0)
+    monkeypatch.setattr(settings, "ADMISSION_READ_QUEUE", 0)
+    shedding_app = AdmissionMiddleware(ok_app)
+    async with AsyncClient(app=shedding_app, base_url="http://test") as ac:
+        resp = await ac.get("/api/suggestions/")
+        assert resp.status_code == 503
+        assert resp.headers["retry-after"] == "1"
+        # Writes have their own limit, unlimited paths always pass
+        resp = await ac.post("/api/votes/")
+        assert resp.status_code == 200
+        resp = await ac.get("/metrics")
+        assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_shed_responses_carry_cors_headers(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_READ_LIMIT", 0)
+    monkeypatch.setattr(settings, "ADMISSION_READ_QUEUE", 0)
+    # Same order as main.py, CORS is registered last and wraps admission
+    assert app.user_middleware[0].cls is CORSMiddleware
+    origin = settings.CORS_ORIGINS[0]
+    shedding_app = CORSMiddleware(AdmissionMiddleware(ok_app), allow_origins=settings.CORS_ORIGINS,
+                                  allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+    async with AsyncClient(app=shedding_app, base_url="http://test") as ac:
+        resp = await ac.get("/api/suggestions/", headers={"Origin": origin})
+        assert resp.status_code == 503
+        assert resp.headers["access-control-allow-origin"] == origin
+        # Preflights are never shed
+        resp = await ac.options("/api/suggestions/", headers={
+            "Origin": origin, "Access-Control-Request-Method": "GET"})
+        assert resp.status_code == 200
+        resp = await ac.options("/api/suggestions/")
+        assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_votes_are_rate_limited_per_user(monkeypatch, login, create_suggestion):
+    monkeypatch.setattr(settings, "VOTE_RATE_PER_SECOND", 0.01)
+    monkeypatch.setattr(settings, "VOTE_RATE_BURST", 1)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        author = await login(ac, "admit1")
+        headers = await login(ac, "admit2")
+        suggestion_id = (await create_suggestion(ac, author, "Rate Limited Suggestion", "Token bucket test."))["id"]
+        resp = await ac.post("/api/votes/", json={"suggestion_id": suggestion_id, "is_upvote": True}, headers=headers)
+        assert resp.status_code == 200
+        resp = await ac.post("/api/votes/", json={"suggestion_id": suggestion_id, "is_upvote": False}, headers=headers)
+        assert resp.status_code == 429
+        assert int(resp.headers["retry-after"]) >= 1
@@ -0,0 +1,130 @@
+import random
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.crud import create_or_update_vote, delete_vote
+from app.database import connect_db
+from app.main import app
+from app.outbox import outbox
+from app.schemas import VoteCreate
+from app import analytics
+from app.analytics import (
+    REMOVED, _merge, _empty_columns, category_participation, suggestion_metrics, voter_overlap
+)
+
+
+def columns_from(votes):
+    """Sorted columns from a {(suggestion_id, user_id): (is_upvote, created_at)} dict"""
+    rows = sorted(votes.items())
+    return (np.array([k[0] for k, _ in rows], np.int32), np.array([k[1] for k, _ in rows], np.int32),
+            np.array([v[0] for _, v in rows], np.int8), np.array([v[1] for _, v in rows], np.uint32))
+
+
+def test_merge_matches_a_rebuild():
+    rng = random.Random(3)
+    votes = {(rng.randint(1, 50), rng.randint(1, 40)): (rng.randint(0, 1), rng.randint(0, 100)) for _ in range(500)}
+    columns = columns_from(votes)
+    pending = []
+    for _ in range(300):
+        key = (rng.randint(1, 60), rng.randint(1, 40))
+        if rng.random() < 0.3:
+            pending.append((*key, REMOVED, 0))
+            votes.pop(key, None)
+        else:
+            value = (rng.randint(0, 1), rng.randint(100, 200))
+            pending.append((*key, *value))
+            votes[key] = value
+    dropped = [7, 55]
+    votes = {k: v for k, v in votes.items() if k[0] not in dropped}
+    merged = _merge(columns, pending, dropped)
+    for got, expected in zip(merged, columns_from(votes)):
+        assert np.array_equal(got, expected)
+    assert all(len(c) == 0 for c in _merge(_empty_columns(), [(1, 1, REMOVED, 0)], []))
+
+
+def test_metrics(monkeypatch):
+    votes = {(1, u): (1, 0) for u in range(1, 11)}
+    votes.update({(2, u): (u % 2, 0) for u in range(1, 11)})
+    votes.update({(3, 1): (1, 0), (3, 2): (0, 50)})
+    columns = columns_from(votes)
+    metrics = suggestion_metrics(columns)
+    assert list(metrics["votes"][1:4]) == [10, 10, 2]
+    assert list(metrics["upvotes"][1:4]) == [10, 5, 1]
+    # 10/10 upvotes: Wilson lower bound ~0.722
+    assert abs(metrics["wilson"][1] - 0.7225) < 1e-3
+    assert metrics["controversy"][1] == 0 and metrics["controversy"][2] == 10
+    assert metrics["wilson"][0] == 0
+    # Only votes at or after t=50
+    assert list(suggestion_metrics(columns, since=50)["votes"][1:4]) == [0, 0, 1]
+
+    participation = category_participation(columns, {1: "A", 2: "B", 3: "B", 4: "C"})
+    assert participation == [
+        {"category": "A", "suggestions": 1, "votes": 10, "voters": 10, "participation": 1.0},
+        {"category": "B", "suggestions": 2, "votes": 12, "voters": 10, "participation": 1.0},
+        {"category": "C", "suggestions": 1, "votes": 0, "voters": 0, "participation": 0.0},
+    ]
+    # Sorting fallback for inputs too large for the bitmap gives the same counts
+    monkeypatch.setattr(analytics, "BITMAP_MAX_CELLS", 0)
+    assert category_participation(columns, {1: "A", 2: "B", 3: "B", 4: "C"}) == participation
+
+    overlap = voter_overlap(columns, 3, 5)
+    assert [o["suggestion_id"] for o in overlap] == [1, 2]
+    assert overlap[0] == {"suggestion_id": 1, "shared_voters": 2, "jaccard": 0.2}
+    assert voter_overlap(columns, 99, 5) == []
+
+
+@pytest.mark.asyncio
+async def test_analytics_endpoints_follow_the_vote_path(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        author = await login(ac, "stats1")
+        await outbox.drain()
+        voters = [await login(ac, f"stats{i}") for i in range(2, 5)]
+        ids = []
+        for i in range(2):
+            suggestion = await create_suggestion(ac, author, f"Analytics {i}", "Analytics test.", "AnalyticsTest")
+            ids.append(suggestion["id"])
+        resp = await ac.get("/api/analytics/suggestions", headers=author)
+        assert resp.status_code == status.HTTP_200_OK
+
+        # Votes cast after the arrays were loaded are merged before the next query
+        for headers in voters:
+            await ac.post("/api/votes/", json={"suggestion_id": ids[0], "is_upvote": True}, headers=headers)
+        await ac.post("/api/votes/", json={"suggestion_id": ids[1], "is_upvote": True}, headers=voters[0])
+        await ac.post("/api/votes/", json={"suggestion_id": ids[1], "is_upvote": False}, headers=voters[1])
+        await ac.delete(f"/api/votes/{ids[0]}", headers=voters[2])
+        # Every worker, the writing one included, applies votes from the outbox
+        await outbox.drain()
+
+        resp = await ac.get("/api/analytics/suggestions", params={"sort": "controversy", "limit": 500},
+                            headers=author)
+        rows = {row["suggestion_id"]: row for row in resp.json()}
+        assert (rows[ids[0]]["upvotes"], rows[ids[0]]["downvotes"]) == (2, 0)
+        assert (rows[ids[1]]["upvotes"], rows[ids[1]]["downvotes"]) == (1, 1)
+        assert rows[ids[1]]["controversy"] == 2.0
+
+        resp = await ac.get("/api/analytics/categories", headers=author)
+        category = next(c for c in resp.json() if c["category"] == "AnalyticsTest")
+        assert (category["suggestions"], category["votes"], category["voters"]) == (2, 4, 2)
+
+        resp = await ac.get(f"/api/analytics/overlap/{ids[0]}", headers=author)
+        assert resp.json()[0] == {"suggestion_id": ids[1], "shared_voters": 2, "jaccard": 1.0}
+
+        await ac.delete(f"/api/suggestions/{ids[1]}", headers=author)
+        await outbox.drain()
+        resp = await ac.get(f"/api/analytics/overlap/{ids[0]}", headers=author)
+        assert ids[1] not in [row["suggestion_id"] for row in resp.json()]
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_votes_stay_out_of_the_columns(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        author = await login(ac, "stats5")
+        suggestion = await create_suggestion(ac, author, "Analytics rollback", "Analytics test.", "AnalyticsTest")
+    await analytics.vote_columns.ensure_loaded()
+    pending = list(analytics.vote_columns._pending)
+    async with connect_db() as db:
+        await create_or_update_vote(db, VoteCreate(suggestion_id=suggestion["id"], is_upvote=True), 1, commit=False)
+        await delete_vote(db, 2, suggestion["id"], commit=False)
+        await db.rollback()
+    assert analytics.vote_columns._pending == pending
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.main import app
+from app.archive import archive_closed_suggestions
+from app.database import connect_db
+
+
+@pytest.mark.asyncio
+async def test_closed_suggestions_move_to_archive(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers1 = await login(ac, "archive1")
+        headers2 = await login(ac, "archive2")
+        headers3 = await login(ac, "archive3")
+        closed = await create_suggestion(ac, headers1, "Archive Closed", "Archive test.", "Archive")
+        recent = await create_suggestion(ac, headers1, "Archive Recent", "Archive test.", "Archive")
+        await ac.post("/api/votes/", json={"suggestion_id": closed["id"], "is_upvote": True}, headers=headers3)
+        await ac.post("/api/votes/", json={"suggestion_id": closed["id"], "is_upvote": True}, headers=headers2)
+        await ac.post("/api/votes/", json={"suggestion_id": recent["id"], "is_upvote": True}, headers=headers2)
+        for suggestion in (closed, recent):
+            await ac.patch(f"/api/suggestions/{suggestion['id']}/status", params={"new_status": "implemented"},
+                           headers=headers1)
+
+        # Only the suggestion closed before the grace period moves
+        async with connect_db() as db:
+            await db.execute("UPDATE suggestions SET updated_at = datetime('now', '-10 days') WHERE id = ?",
+                             (closed["id"],))
+            await db.commit()
+            cursor = await db.execute("SELECT version FROM sync_state WHERE id = 1")
+            since = (await cursor.fetchone())[0]
+            totals = await archive_closed_suggestions(db, grace_days=7, chunk_size=1)
+            assert totals == {"suggestions": 1, "votes": 2}
+            cursor = await db.execute("SELECT COUNT(*) FROM votes WHERE suggestion_id = ?", (closed["id"],))
+            assert (await cursor.fetchone())[0] == 0
+
+        resp = await ac.get(f"/api/suggestions/{closed['id']}", headers=headers1)
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+        resp = await ac.get(f"/api/suggestions/{closed['id']}", params={"include_archived": True}, headers=headers1)
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.json()["archived"] is True
+        assert resp.json()["vote_count"] == 2
+
+        resp = await ac.get("/api/suggestions/", params={"category": "Archive"}, headers=headers1)
+        assert [s["id"] for s in resp.json()] == [recent["id"]]
+        resp = await ac.get("/api/suggestions/", params={"category": "Archive", "include_archived": True},
+                            headers=headers1)
+        assert {s["id"]: s["archived"] for s in resp.json()} == {closed["id"]: True, recent["id"]: False}
+        # Hot rows read their stored tally, archived rows the final one
+        assert {s["id"]: s["vote_count"] for s in resp.json()} == {closed["id"]: 2, recent["id"]: 1}
+        resp = await ac.get("/api/suggestions/categories", params={"include_archived": True}, headers=headers1)
+        assert {"category": "Archive", "count": 2} in resp.json()
+
+        # Delta-sync clients see the archived suggestion leave the hot set
+        resp = await ac.get("/api/suggestions/changes", params={"since": since}, headers=headers1)
+        assert closed["id"] in resp.json()["deleted"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_archivers_move_each_suggestion_once(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers = await login(ac, "archive4")
+        closed = await create_suggestion(ac, headers, "Archive Race", "Archive test.", "Archive")
+        await ac.patch(f"/api/suggestions/{closed['id']}/status", params={"new_status": "rejected"},
+                       headers=headers)
+
+    async with connect_db() as db:
+        await db.execute("UPDATE suggestions SET updated_at = datetime('now', '-10 days') WHERE id = ?",
+                         (closed["id"],))
+        await db.commit()
+
+    # Two workers pick the same chunk, only the first one to take the write lock moves it
+    async def worker():
+        async with connect_db() as db:
+            return await archive_closed_suggestions(db, grace_days=7)
+    results = await asyncio.gather(worker(), worker())
+    assert sum(totals["suggestions"] for totals in results) >= 1
+
+    async with connect_db() as db:
+        cursor = await db.execute(
+            "SELECT COUNT(*) FROM outbox_events "
+            "WHERE event_type = 'suggestion_deleted' AND json_extract(payload, '$.id') = ?",
+            (closed["id"],)
+        )
+        assert (await cursor.fetchone())[0] == 1
@@ -0,0 +1,51 @@
+import sqlite3
+import pytest
+from httpx import AsyncClient
+from app.backup import create_backup, list_backups, prune_backups, restore_backup
+from app.config import settings
+from app.main import app
+
+
+def test_backup_retention_and_restore(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "BACKUP_PAGES_PER_STEP", 2)
+    monkeypatch.setattr(settings, "BACKUP_STEP_SLEEP", 0)
+    db_path = str(tmp_path / "live.db")
+    backup_dir = str(tmp_path / "backups")
+    with sqlite3.connect(db_path) as db:
+        db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, body TEXT)")
+        db.executemany("INSERT INTO items (body) VALUES (?)", (("x" * 500,) for _ in range(200)))
+
+    plain = create_backup(db_path, backup_dir, compress=False)
+    assert plain["steps"] > 1 and plain["mode"] == "stepped"
+    compressed = create_backup(db_path, backup_dir, compress=True)
+    assert compressed["file"].endswith(".db.gz")
+    assert compressed["size"] < plain["size"]
+    third = create_backup(db_path, backup_dir, compress=True)
+    assert [b["file"] for b in list_backups(backup_dir, db_path)] == [third["file"], compressed["file"], plain["file"]]
+    assert prune_backups(2, backup_dir, db_path) == [plain["file"]]
+
+    with sqlite3.connect(db_path) as db:
+        db.execute("DELETE FROM items")
+    previous = restore_backup(compressed["path"], db_path)
+    with sqlite3.connect(db_path) as db:
+        assert db.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 200
+    with sqlite3.connect(previous) as db:
+        assert db.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+
+@pytest.mark.asyncio
+async def test_backup_endpoint_is_admin_only(monkeypatch, tmp_path, login):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", "backupadmin")
+    monkeypatch.setattr(settings, "BACKUP_DIR", str(tmp_path))
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        admin = await login(ac, "backupadmin")
+        user = await login(ac, "backupuser")
+        resp = await ac.post("/api/admin/backup", headers=user)
+        assert resp.status_code == 403
+        resp = await ac.post("/api/admin/backup", headers=admin)
+        assert resp.status_code == 200
+        backup = resp.json()
+        resp = await ac.get("/api/admin/backups", headers=admin)
+        assert [b["file"] for b in resp.json()] == [backup["file"]]
+        resp = await ac.get("/metrics")
+        assert 'db_backups_total{result="success"}' in resp.text
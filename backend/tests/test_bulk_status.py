@@ -0,0 +1,91 @@
+import json
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.config import settings
+from app.crud import update_suggestion_statuses
+from app.main import app
+from app.database import connect_db
+from app.websocket_manager import ConnectionManager
+
+
+@pytest.mark.asyncio
+async def test_bulk_status_transitions(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers1 = await login(ac, "bulk1")
+        headers2 = await login(ac, "bulk2")
+        own = []
+        for i in range(3):
+            own.append(await create_suggestion(ac, headers1, f"Bulk {i}", "Bulk moderation test."))
+        other = await create_suggestion(ac, headers2, "Not mine", "Bulk moderation test.")
+
+        resp = await ac.patch("/api/suggestions/status", json={"transitions": [
+            {"id": own[0]["id"], "status": "implemented"},
+            {"id": own[1]["id"], "status": "rejected"},
+            {"id": own[2]["id"], "status": "archived"},
+            {"id": other["id"], "status": "rejected"},
+            {"id": 10 ** 9, "status": "rejected"},
+            {"id": own[0]["id"], "status": "rejected"},
+        ]}, headers=headers1)
+        assert resp.status_code == status.HTTP_200_OK
+        body = resp.json()
+        assert body["applied"] == 2 and body["failed"] == 4
+        assert [r["status_code"] for r in body["results"]] == [200, 200, 400, 403, 404, 400]
+        assert body["results"][0]["suggestion"]["status"] == "implemented"
+        assert body["results"][1]["suggestion"]["author"]["username"] == "bulk1"
+        # Each changed suggestion gets its own change version
+        assert body["results"][0]["suggestion"]["version"] != body["results"][1]["suggestion"]["version"]
+
+        resp = await ac.get(f"/api/suggestions/{own[2]['id']}", headers=headers1)
+        assert resp.json()["status"] == "active"
+        resp = await ac.patch("/api/suggestions/status", json={"transitions": [
+            {"id": own[0]["id"], "status": "rejected"}
+        ]}, headers=headers1)
+        assert resp.json()["results"][0]["detail"] == "Only active suggestions can be updated"
+
+    # Both applied transitions went out as one event
+    async with connect_db() as db:
+        cursor = await db.execute(
+            "SELECT event_type, payload FROM outbox_events WHERE event_type = 'suggestion_update' ORDER BY id DESC LIMIT 1"
+        )
+        row = await cursor.fetchone()
+    payload = json.loads(row["payload"])
+    assert [s["id"] for s in payload["suggestions"]] == [own[0]["id"], own[1]["id"]]
+
+    manager = ConnectionManager()
+    await manager.dispatch(row["event_type"], payload, 1)
+    event_id, message, suggestion_id = manager.recent_events[-1]
+    assert message["type"] == "suggestion_update" and len(message["data"]["suggestions"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_statuses_only_change_active_suggestions(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers = await login(ac, "bulk3")
+        first = await create_suggestion(ac, headers, "Bulk race 1", "Bulk moderation test.")
+        second = await create_suggestion(ac, headers, "Bulk race 2", "Bulk moderation test.")
+    async with connect_db() as db:
+        # Closed by another request after the batch was validated
+        await db.execute("UPDATE suggestions SET status = 'rejected' WHERE id = ?", (second["id"],))
+        await db.commit()
+        updated = await update_suggestion_statuses(db, {first["id"]: "implemented", second["id"]: "implemented"})
+        cursor = await db.execute("SELECT status FROM suggestions WHERE id = ?", (second["id"],))
+        assert (await cursor.fetchone())["status"] == "rejected"
+    assert list(updated) == [first["id"]] and updated[first["id"]]["status"] == "implemented"
+
+
+@pytest.mark.asyncio
+async def test_admins_may_move_any_suggestion_one_at_a_time(monkeypatch, login, create_suggestion):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", "bulkadmin")
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        author = await login(ac, "bulk4")
+        other = await login(ac, "bulk5")
+        admin = await login(ac, "bulkadmin")
+        suggestion = await create_suggestion(ac, author, "Bulk admin", "Bulk moderation test.")
+        resp = await ac.patch(f"/api/suggestions/{suggestion['id']}/status", params={"new_status": "rejected"},
+                              headers=other)
+        assert resp.status_code == status.HTTP_403_FORBIDDEN
+        resp = await ac.patch(f"/api/suggestions/{suggestion['id']}/status", params={"new_status": "rejected"},
+                              headers=admin)
+        assert resp.status_code == status.HTTP_200_OK
+        assert resp.json()["status"] == "rejected"
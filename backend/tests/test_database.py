@@ -0,0 +1,114 @@
+import asyncio
+import sqlite3
+import pytest
+from app.config import settings
+from app.database import SCHEMA_VERSION, connect_db, init_db
+
+
+@pytest.mark.asyncio
+async def test_init_db_skips_ddl_when_schema_is_current(monkeypatch, tmp_path):
+    path = tmp_path / "schema.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{path}")
+    await init_db()
+    with sqlite3.connect(path) as db:
+        assert db.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        db.execute("DROP TABLE outbox_events")
+
+    # Warm restart: the version matches, so the DDL is not run again
+    await init_db()
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT name FROM sqlite_master WHERE name = 'outbox_events'").fetchone() is None
+        db.execute("PRAGMA user_version = 0")
+
+    # An older schema version runs the DDL again
+    await init_db()
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT name FROM sqlite_master WHERE name = 'outbox_events'").fetchone() is not None
+
+
+@pytest.mark.asyncio
+async def test_init_db_migrates_votes_to_without_rowid(monkeypatch, tmp_path):
+    path = tmp_path / "votes.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{path}")
+    with sqlite3.connect(path) as db:
+        db.execute('''
+            CREATE TABLE votes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                suggestion_id INTEGER NOT NULL,
+                is_upvote BOOLEAN NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(user_id, suggestion_id)
+            )
+        ''')
+        db.execute("INSERT INTO votes (user_id, suggestion_id, is_upvote, created_at) "
+                   "VALUES (1, 7, 1, '2024-01-02 03:04:05'), (2, 7, 0, '2024-01-02 03:04:06')")
+    await init_db()
+    with sqlite3.connect(path) as db:
+        columns = [row[1] for row in db.execute("PRAGMA table_info(votes)")]
+        assert columns == ["suggestion_id", "user_id", "is_upvote", "created_at"]
+        sql = db.execute("SELECT sql FROM sqlite_master WHERE name = 'votes'").fetchone()[0]
+        assert "WITHOUT ROWID" in sql
+        assert db.execute("SELECT * FROM votes ORDER BY user_id").fetchall() == [
+            (7, 1, 1, 1704164645), (7, 2, 0, 1704164646)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_init_db_resumes_an_interrupted_votes_migration(monkeypatch, tmp_path):
+    path = tmp_path / "legacy.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{path}")
+    # An upgrade that died after renaming the old table and creating the new one
+    with sqlite3.connect(path) as db:
+        db.execute('''
+            CREATE TABLE votes_legacy (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                suggestion_id INTEGER NOT NULL,
+                is_upvote BOOLEAN NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(user_id, suggestion_id)
+            )
+        ''')
+        db.execute("INSERT INTO votes_legacy (user_id, suggestion_id, is_upvote, created_at) "
+                   "VALUES (1, 7, 1, '2024-01-02 03:04:05'), (2, 7, 0, '2024-01-02 03:04:06')")
+        db.execute("CREATE TABLE votes (suggestion_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+                   "is_upvote BOOLEAN NOT NULL, created_at INTEGER NOT NULL, "
+                   "PRIMARY KEY (suggestion_id, user_id)) WITHOUT ROWID")
+    await init_db()
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT name FROM sqlite_master WHERE name = 'votes_legacy'").fetchone() is None
+        assert db.execute("SELECT * FROM votes ORDER BY user_id").fetchall() == [
+            (7, 1, 1, 1704164645), (7, 2, 0, 1704164646)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_workers_starting_together_upgrade_once(monkeypatch, tmp_path):
+    path = tmp_path / "workers.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{path}")
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE votes (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, "
+                   "suggestion_id INTEGER NOT NULL, is_upvote BOOLEAN NOT NULL, created_at TIMESTAMP)")
+        db.execute("INSERT INTO votes (user_id, suggestion_id, is_upvote, created_at) "
+                   "VALUES (1, 7, 1, '2024-01-02 03:04:05')")
+    await asyncio.gather(*(init_db() for _ in range(4)))
+    with sqlite3.connect(path) as db:
+        assert db.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert db.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert db.execute("SELECT * FROM votes").fetchall() == [(7, 1, 1, 1704164645)]
+
+
+@pytest.mark.asyncio
+async def test_after_commit_callbacks_skip_rolled_back_transactions():
+    calls = []
+    async with connect_db() as db:
+        await db.execute("UPDATE sync_state SET version = version WHERE id = 1")
+        db.after_commit(lambda: calls.append("rolled back"))
+        await db.rollback()
+        await db.execute("UPDATE sync_state SET version = version WHERE id = 1")
+        db.after_commit(lambda: calls.append("committed"))
+        assert calls == []
+        await db.commit()
+        await db.commit()
+    assert calls == ["committed"]
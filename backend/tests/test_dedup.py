@@ -0,0 +1,125 @@
+import sqlite3
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.crud import create_suggestion as create_suggestion_row
+from app.database import connect_db
+from app.main import app
+from app.outbox import outbox, record_event
+from app.schemas import SuggestionCreate
+from app import dedup
+from app.dedup import SimilarityIndex, shingles, jaccard
+
+
+TEXTS = {
+    1: ("Install a standing desk in every meeting room", "Long meetings would be easier standing up."),
+    2: ("Put standing desks in all the meeting rooms", "Long meetings would be easier standing up."),
+    3: ("Quarterly hackathon", "Two days every quarter to build anything that helps the team."),
+    4: ("Start a book club", "Read one engineering book a month and discuss it on Fridays."),
+}
+
+
+@pytest.mark.asyncio
+async def test_index_merges_like_a_rebuild(tmp_path, monkeypatch):
+    path = str(tmp_path / "dedup.db")
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE suggestions (id INTEGER PRIMARY KEY, title TEXT, description TEXT)")
+        db.executemany("INSERT INTO suggestions VALUES (?, ?, ?)", [(i, *t) for i, t in TEXTS.items() if i != 2])
+    monkeypatch.setattr(dedup, "get_db_path", lambda: path)
+    index = SimilarityIndex()
+    await index.ensure_loaded()
+    assert len(index) == 3
+    assert index.candidates(*TEXTS[2]) == [1]
+
+    # Pending changes override the arrays until they are merged
+    index.add(2, *TEXTS[2])
+    index.add(1, *TEXTS[3])
+    index.forget([4])
+    assert index.candidates(*TEXTS[2], exclude_id=2) == []
+    assert index.candidates(*TEXTS[3]) == [1, 3]
+    assert index.candidates(*TEXTS[4]) == []
+    before = {i: index.candidates(*TEXTS[i]) for i in TEXTS}
+    index.merge_pending()
+    assert index._pending == {} and index._buckets == {}
+    assert len(index) == 3
+    assert {i: index.candidates(*TEXTS[i]) for i in TEXTS} == before
+
+
+def test_shingle_similarity():
+    assert jaccard(shingles(*TEXTS[1]), shingles(*TEXTS[1])) == 1.0
+    # Case and punctuation do not matter
+    assert shingles("Standing DESKS!", "") == shingles("standing desks", "")
+    assert jaccard(shingles(*TEXTS[1]), shingles(*TEXTS[2])) > 0.4
+    assert jaccard(shingles(*TEXTS[3]), shingles(*TEXTS[4])) < 0.1
+    assert shingles("ab", "") == {b"ab   "}
+
+
+@pytest.mark.asyncio
+async def test_create_reports_likely_duplicates(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers = await login(ac, "dedup1")
+        await outbox.drain()
+        first = await create_suggestion(
+            ac, headers, "Replace the espresso machine on floor three",
+            "The espresso machine on floor three has been broken for weeks.", "DedupTest"
+        )
+        assert first["possible_duplicates"] == []
+        # Every worker, the writing one included, indexes new text from the outbox
+        await outbox.drain()
+
+        second = await create_suggestion(
+            ac, headers, "Replace the broken espresso machine on the third floor",
+            "The espresso machine on floor three has been broken for weeks!", "DedupTest"
+        )
+        assert [d["id"] for d in second["possible_duplicates"]] == [first["id"]]
+        assert second["possible_duplicates"][0]["similarity"] >= 0.5
+        await outbox.drain()
+
+        resp = await ac.get(f"/api/suggestions/{first['id']}/similar", headers=headers)
+        assert [d["id"] for d in resp.json()] == [second["id"]]
+
+        # Editing the text away from the original updates the index
+        await ac.put(f"/api/suggestions/{second['id']}", json={
+            "title": "Add bike racks", "description": "There is nowhere to lock a bike near the entrance."
+        }, headers=headers)
+        await outbox.drain()
+        resp = await ac.get(f"/api/suggestions/{first['id']}/similar", headers=headers)
+        assert resp.json() == []
+
+        await ac.delete(f"/api/suggestions/{first['id']}", headers=headers)
+        resp = await ac.get(f"/api/suggestions/{first['id']}/similar", headers=headers)
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_create_stays_out_of_the_index():
+    index = dedup.similarity_index
+    await index.ensure_loaded()
+    pending = dict(index._pending)
+    async with connect_db() as db:
+        created = await create_suggestion_row(db, SuggestionCreate(
+            title="Rolled back idea", description="This suggestion never commits.", category="DedupTest"
+        ), author_id=1, commit=False)
+        await db.rollback()
+    assert index._pending == pending
+    assert created["id"] not in index.candidates("Rolled back idea", "This suggestion never commits.")
+
+
+@pytest.mark.asyncio
+async def test_index_follows_events_from_other_workers():
+    index = dedup.similarity_index
+    await index.ensure_loaded()
+    await outbox.drain()
+    text = ("Cross worker idea", "Recorded by a different worker process.")
+    # Rows written by another worker only reach this one through the outbox
+    async with connect_db() as db:
+        await record_event(db, "new_suggestion", {"id": 987654, "title": text[0], "description": text[1]})
+        await db.commit()
+    await outbox.drain()
+    assert 987654 in index.candidates(*text)
+
+    async with connect_db() as db:
+        await record_event(db, "suggestion_deleted", {"id": 987654})
+        await db.commit()
+    await outbox.drain()
+    assert 987654 not in index.candidates(*text)
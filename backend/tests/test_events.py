@@ -0,0 +1,56 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.main import app
+from app.schemas import VoteUpdateMessage
+from app.websocket_manager import ConnectionManager, SSEChannel
+from app.ws_protocol import SSE_CODEC
+
+
+@pytest.mark.asyncio
+async def test_events_requires_token():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        resp = await ac.get("/api/events")
+        assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_sse_channel_gets_filtered_broadcasts():
+    manager = ConnectionManager()
+    channel = SSEChannel(max_queue=10)
+    connection = await manager.connect(channel, 1, SSE_CODEC)
+    connection.topics = frozenset({"vote_update"})
+    manager.subscribe(channel, 1, [7])
+    await manager.broadcast_vote_update(VoteUpdateMessage(suggestion_id=7, new_vote_count=2), event_id=10)
+    await manager.broadcast_vote_update(VoteUpdateMessage(suggestion_id=8, new_vote_count=1), event_id=11)
+    await manager.broadcast_new_suggestion({"id": 9, "title": "t"}, event_id=12)
+    frame = await channel.next_frame(timeout=1)
+    assert frame.startswith("id: 10\nevent: vote_update\ndata: ")
+    assert channel.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_replay_after_last_event_id():
+    manager = ConnectionManager()
+    manager.recent_events = type(manager.recent_events)(maxlen=3)
+    for event_id in range(1, 5):
+        await manager.broadcast_vote_update(VoteUpdateMessage(suggestion_id=event_id, new_vote_count=1), event_id=event_id)
+    frames = manager.replay(2)
+    assert [frame.split("\n")[0] for frame in frames] == ["id: 3", "id: 4"]
+    assert manager.replay(4) == []
+    assert manager.replay(2, suggestion_ids=frozenset({4})) == [frames[1]]
+    # Event 1 fell out of the buffer, the client must refetch
+    assert manager.replay(0) is None
+
+
+@pytest.mark.asyncio
+async def test_replay_after_restart_needs_resync():
+    # The outbox held events up to 20 when this process started
+    manager = ConnectionManager()
+    manager.start_after(20)
+    assert manager.replay(20) == []
+    for event_id in (21, 22):
+        await manager.broadcast_vote_update(VoteUpdateMessage(suggestion_id=event_id, new_vote_count=1), event_id=event_id)
+    assert [frame.split("\n")[0] for frame in manager.replay(20)] == ["id: 21", "id: 22"]
+    # Events 16-20 were sent by the previous process and are not buffered here
+    assert manager.replay(15) is None
@@ -0,0 +1,93 @@
+import asyncio
+import sqlite3
+import time
+from datetime import datetime
+import pytest
+from app.config import settings
+from app.database import init_db
+from app.maintenance import (
+    MaintenanceScheduler, MaintenanceTask, RequestLoadMiddleware, analyze, checkpoint, in_window,
+    incremental_vacuum, is_idle
+)
+
+
+def test_in_window():
+    assert in_window("", datetime(2026, 1, 1, 12, 0))
+    assert in_window("02:00-05:00", datetime(2026, 1, 1, 2, 0))
+    assert not in_window("02:00-05:00", datetime(2026, 1, 1, 5, 0))
+    assert in_window("22:00-04:00", datetime(2026, 1, 1, 23, 30))
+    assert in_window("22:00-04:00", datetime(2026, 1, 1, 3, 59))
+    assert not in_window("22:00-04:00", datetime(2026, 1, 1, 12, 0))
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_and_incremental_vacuum(monkeypatch, tmp_path):
+    path = tmp_path / "maintenance.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{path}")
+    monkeypatch.setattr(settings, "MAINTENANCE_VACUUM_MIN_FREE_PAGES", 10)
+    await init_db()
+    with sqlite3.connect(path) as db:
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        db.execute("CREATE TABLE filler (body TEXT)")
+        db.executemany("INSERT INTO filler VALUES (?)", (("x" * 1000,) for _ in range(2000)))
+        db.commit()
+        db.execute("DELETE FROM filler")
+        db.commit()
+
+    scheduler = MaintenanceScheduler()
+    scheduler.add(MaintenanceTask("checkpoint", checkpoint, 60))
+    scheduler.add(MaintenanceTask("incremental_vacuum", incremental_vacuum, 60, heavy=True))
+
+    # Small WAL: a PASSIVE checkpoint leaves the file in place
+    stats = await scheduler.run_task("checkpoint")
+    assert stats["last_result"]["mode"] == "PASSIVE"
+    assert stats["last_result"]["wal_bytes_before"] > 0
+
+    monkeypatch.setattr(settings, "MAINTENANCE_WAL_TRUNCATE_BYTES", 1)
+    stats = await scheduler.run_task("checkpoint")
+    assert stats["last_result"]["mode"] == "TRUNCATE"
+    assert stats["last_result"]["wal_bytes_after"] == 0
+
+    stats = await scheduler.run_task("incremental_vacuum")
+    assert stats["last_result"]["freed_pages"] > 0
+    assert stats["runs"] == 1 and stats["last_error"] is None
+
+
+@pytest.mark.asyncio
+async def test_heavy_tasks_wait_for_the_window(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'window.db'}")
+    await init_db()
+    scheduler = MaintenanceScheduler()
+    scheduler.add(MaintenanceTask("checkpoint", checkpoint, 60))
+    scheduler.add(MaintenanceTask("analyze", analyze, 60, heavy=True))
+    later = time.time() + 120
+
+    hour = datetime.now().hour
+    monkeypatch.setattr(settings, "MAINTENANCE_WINDOW", f"{(hour + 2) % 24:02d}:00-{(hour + 3) % 24:02d}:00")
+    assert await scheduler.run_due(later) == ["checkpoint"]
+    monkeypatch.setattr(settings, "MAINTENANCE_WINDOW", "")
+    assert "analyze" in await scheduler.run_due(later)
+    assert scheduler.stats()["analyze"]["runs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_event_streams_do_not_count_as_load(monkeypatch):
+    monkeypatch.setattr(settings, "MAINTENANCE_MAX_IN_FLIGHT", 0)
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+    middleware = RequestLoadMiddleware(slow_app)
+
+    def request(path):
+        return asyncio.create_task(middleware({"type": "http", "method": "GET", "path": path}, None, None))
+
+    stream = request("/api/events")
+    await asyncio.sleep(0)
+    assert is_idle()
+    read = request("/api/suggestions/")
+    await asyncio.sleep(0)
+    assert not is_idle()
+    release.set()
+    await asyncio.gather(stream, read)
+    assert is_idle()
@@ -0,0 +1,81 @@
+import logging
+import pytest
+from httpx import AsyncClient
+from app.config import settings
+from app.database import connect_db
+from app.main import app
+from starlette.routing import Route
+from app.metrics import Histogram, normalize_statement, db_slow_queries, route_label
+
+
+def test_normalize_statement_collapses_literals():
+    sql = """
+        SELECT * FROM votes
+        WHERE user_id = 12 AND suggestion_id IN (?, ?, ?) AND status = 'active'
+    """
+    assert normalize_statement(sql) == \
+        "SELECT * FROM votes WHERE user_id = ? AND suggestion_id IN (...) AND status = ?"
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test histogram", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    lines = histogram.samples()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+
+
+def test_route_label_includes_router_prefix():
+    # Newer FastAPI versions match the router's own route, without the include_router prefix
+    included = Route("/suggestions/{suggestion_id}", lambda request: None)
+    assert route_label({"route": included, "path": "/api/suggestions/3"}) == "/api/suggestions/{suggestion_id}"
+    flattened = Route("/api/votes/{suggestion_id}", lambda request: None)
+    assert route_label({"route": flattened, "path": "/api/votes/3"}) == "/api/votes/{suggestion_id}"
+    assert route_label({"path": "/missing"}) == "unmatched"
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_queries_per_route(login):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        resp = await ac.get("/api/suggestions/top", headers=await login(ac, "metrics1"))
+        assert resp.status_code == 200
+        resp = await ac.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert '# TYPE db_query_duration_seconds histogram' in body
+    assert 'http_request_db_queries_count{method="GET",route="/api/suggestions/top"} ' in body
+    assert "db_connections_open 0" in body
+    assert "ws_connections " in body
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_are_logged_with_plan(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0)
+    caplog.set_level(logging.WARNING, logger="app.database")
+    async with connect_db() as db:
+        await db.execute("SELECT id FROM suggestions WHERE category = ?", ("General",))
+    statement = "SELECT id FROM suggestions WHERE category = ?"
+    assert db_slow_queries.values[(statement,)] >= 1
+    assert any(statement in r.getMessage() and "SCAN" in r.getMessage() for r in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_breaks_down_stages(login):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        # Posted directly, the test needs the response headers
+        resp = await ac.post("/api/suggestions/", json={
+            "title": "Timed Suggestion",
+            "description": "Server-Timing test.",
+            "category": "General"
+        }, headers=await login(ac, "timing1"))
+        assert resp.status_code == 200
+        stages = {entry.split(";")[0].strip() for entry in resp.headers["server-timing"].split(",")}
+        assert {"auth", "db", "handler", "broadcast", "serialize", "total"} <= stages
+        resp = await ac.get("/metrics")
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/suggestions/",status="200"} ' in resp.text
+    assert 'http_request_stage_seconds_count{route="/api/suggestions/",stage="auth"} ' in resp.text
@@ -0,0 +1,73 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.main import app
+from app.database import connect_db
+from app.outbox import outbox, OutboxDispatcher, record_event, purge_events
+from app.websocket_manager import manager
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, frame):
+        self.frames.append(frame)
+
+
+@pytest.mark.asyncio
+async def test_events_are_dispatched_in_commit_order(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers1 = await login(ac, "outbox1")
+        headers2 = await login(ac, "outbox2")
+        await outbox.drain()
+        suggestion = await create_suggestion(ac, headers1, "Outbox Suggestion", "Outbox test.")
+        for is_upvote in (True, False, True):
+            resp = await ac.post("/api/votes/", json={
+                "suggestion_id": suggestion["id"],
+                "is_upvote": is_upvote
+            }, headers=headers2)
+            assert resp.status_code == status.HTTP_200_OK
+    assert outbox.stats()["depth"] == 4
+
+    socket = RecordingSocket()
+    await manager.connect(socket, 99)
+    try:
+        assert await outbox.drain() == 4
+    finally:
+        manager.disconnect(socket, 99)
+    assert '"type":"new_suggestion"' in socket.frames[0]
+    counts = [frame.split('"new_vote_count":')[1].split(",")[0] for frame in socket.frames[1:]]
+    assert counts == ["1", "-1", "1"]
+    # Who voted is only for the workers' indexes, clients never see it
+    assert all('"user_id"' not in frame for frame in socket.frames[1:])
+    stats = outbox.stats()
+    assert stats["depth"] == 0
+    assert stats["latency_ms_p99"] is not None
+
+
+@pytest.mark.asyncio
+async def test_every_worker_dispatches_every_event():
+    workers = [OutboxDispatcher(), OutboxDispatcher()]
+    for worker in workers:
+        await worker.drain()
+    async with connect_db() as db:
+        await record_event(db, "new_suggestion", {"id": 123456, "title": "Every worker", "description": "Outbox test."})
+        await db.commit()
+    socket = RecordingSocket()
+    await manager.connect(socket, 98)
+    try:
+        # Neither worker consumes the event for the other one
+        assert [await worker.drain() for worker in workers] == [1, 1]
+        assert [await worker.drain() for worker in workers] == [0, 0]
+    finally:
+        manager.disconnect(socket, 98)
+    assert len(socket.frames) == 2
+
+    # Rows stay until they are older than the retention period
+    async with connect_db() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM outbox_events")
+        assert (await cursor.fetchone())[0] > 0
+        await purge_events(db, older_than=float("inf"))
+        cursor = await db.execute("SELECT COUNT(*) FROM outbox_events")
+        assert (await cursor.fetchone())[0] == 0
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import time
+import pytest
+from httpx import AsyncClient
+from app.auth import verify_token
+from app.config import settings
+from app.main import app
+from app.profiling import LoopWatchdog, loop_blocked
+from app.sessions import session_store
+
+
+@pytest.mark.asyncio
+async def test_profile_header_is_admin_only(monkeypatch, login):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", "profadmin")
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        admin = await login(ac, "profadmin")
+        user = await login(ac, "profuser")
+        resp = await ac.get("/api/suggestions/top", headers={**user, "X-Profile": "1"})
+        assert resp.status_code == 200
+        assert isinstance(resp.json(), list)
+        resp = await ac.get("/api/suggestions/top", headers={**admin, "X-Profile": "1"})
+        assert resp.status_code == 200
+        assert resp.headers["x-profiled-status"] == "200"
+        assert "Ordered by: cumulative time" in resp.text
+        # A revoked admin token no longer turns profiling on
+        token_data = verify_token(admin["Authorization"].split()[1])
+        await session_store.revoke(token_data.jti, time.time() + 60)
+        resp = await ac.get("/api/suggestions/top", headers={**admin, "X-Profile": "1"})
+        assert "x-profiled-status" not in resp.headers
+
+
+@pytest.mark.asyncio
+async def test_sampling_profile_endpoint(monkeypatch, login):
+    monkeypatch.setattr(settings, "ADMIN_USERNAMES", "profadmin2")
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        admin = await login(ac, "profadmin2")
+        user = await login(ac, "profuser2")
+        resp = await ac.post("/api/admin/profile?seconds=0.2", headers=user)
+        assert resp.status_code == 403
+        resp = await ac.post("/api/admin/profile?seconds=0.2&interval=0.002", headers=admin)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["samples"] > 0
+    assert data["top"] and data["folded"]
+
+
+@pytest.mark.asyncio
+async def test_loop_watchdog_logs_blocking_call(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "LOOP_BLOCK_THRESHOLD_MS", 50)
+    caplog.set_level(logging.WARNING, logger="app.profiling")
+    watchdog = LoopWatchdog()
+    before = loop_blocked.values.get((), 0)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)
+        await asyncio.sleep(0.05)
+    finally:
+        watchdog.stop()
+    assert loop_blocked.values.get((), 0) == before + 1
+    assert any("test_loop_watchdog_logs_blocking_call" in r.getMessage() for r in caplog.records)
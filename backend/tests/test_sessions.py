@@ -0,0 +1,89 @@
+import time
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.database import connect_db
+from app.main import app
+from app.sessions import MemorySessionStore, SessionStore, logins, refreshes
+
+
+@pytest.mark.asyncio
+async def test_refresh_rotates_and_logout_revokes():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await ac.post("/api/auth/register", json={
+            "username": "session1",
+            "email": "session1@example.com",
+            "password": "session1pass"
+        })
+        logins_before = logins.values.get(("success",), 0)
+        resp = await ac.post("/api/auth/login", data={"username": "session1", "password": "session1pass"})
+        assert resp.status_code == status.HTTP_200_OK
+        first = resp.json()
+        assert first["refresh_token"]
+        assert logins.values[("success",)] == logins_before + 1
+
+        refreshes_before = refreshes.values.get(("success",), 0)
+        resp = await ac.post("/api/auth/refresh", json={"refresh_token": first["refresh_token"]})
+        assert resp.status_code == status.HTTP_200_OK
+        second = resp.json()
+        assert second["refresh_token"] != first["refresh_token"]
+        assert refreshes.values[("success",)] == refreshes_before + 1
+        headers = {"Authorization": f"Bearer {second['access_token']}"}
+        resp = await ac.get("/api/auth/me", headers=headers)
+        assert resp.json()["username"] == "session1"
+
+        # Refresh tokens are single use
+        resp = await ac.post("/api/auth/refresh", json={"refresh_token": first["refresh_token"]})
+        assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+
+        resp = await ac.post("/api/auth/logout", json={"refresh_token": second["refresh_token"]}, headers=headers)
+        assert resp.status_code == status.HTTP_200_OK
+        resp = await ac.get("/api/auth/me", headers=headers)
+        assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+        resp = await ac.post("/api/auth/refresh", json={"refresh_token": second["refresh_token"]})
+        assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_refresh_rejects_inactive_user():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await ac.post("/api/auth/register", json={
+            "username": "session2",
+            "email": "session2@example.com",
+            "password": "session2pass"
+        })
+        resp = await ac.post("/api/auth/login", data={"username": "session2", "password": "session2pass"})
+        tokens = resp.json()
+        async with connect_db() as db:
+            await db.execute("UPDATE users SET is_active = 0 WHERE username = ?", ("session2",))
+            await db.commit()
+        try:
+            resp = await ac.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+            assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+        finally:
+            async with connect_db() as db:
+                await db.execute("UPDATE users SET is_active = 1 WHERE username = ?", ("session2",))
+                await db.commit()
+        # The failed attempt still consumed the refresh token
+        resp = await ac.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_session_store_requires_storage_methods():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+@pytest.mark.asyncio
+async def test_memory_store_expires_sessions_and_revocations():
+    store = MemorySessionStore()
+    token = await store.create(1, "alice")
+    await store.revoke("old-jti", time.time() - 1)
+    await store.revoke("live-jti", time.time() + 60)
+    assert await store.is_revoked("live-jti")
+    assert await store.purge_expired() == 1
+    assert not await store.is_revoked("old-jti")
+    session, rotated = await store.refresh(token)
+    assert session == {"user_id": 1, "username": "alice"}
+    assert await store.refresh(token) is None
+    assert await store.refresh(rotated) is not None
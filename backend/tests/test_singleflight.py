@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.main import app
+from app.api.suggestions import categories_flight, top_flight
+from app.singleflight import SingleFlight, flight_calls
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_execution():
+    flight = SingleFlight("test_share")
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    results = await asyncio.gather(*(flight.do("k", compute) for _ in range(10)))
+    assert len(runs) == 1
+    assert all(r is results[0] for r in results)
+    assert flight_calls.values[("test_share", "executed")] == 1
+    assert flight_calls.values[("test_share", "coalesced")] == 9
+    assert flight.in_flight() == 0
+
+    # Different keys and later calls run again
+    await asyncio.gather(flight.do("k", compute), flight.do("other", compute))
+    assert len(runs) == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_cancelled_leader_hands_over():
+    flight = SingleFlight("test_errors")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.ensure_future(flight.do("k", slow))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flight.do("k", slow))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await follower == "done"
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_top_requests_are_coalesced(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers = await login(ac, "flight1")
+        await create_suggestion(ac, headers, "Flight", "Single-flight test.")
+        before = flight_calls.values.get((top_flight.name, "executed"), 0)
+        responses = await asyncio.gather(*(
+            ac.get("/api/suggestions/top", params={"limit": 7}, headers=headers) for _ in range(8)
+        ))
+        assert all(r.status_code == status.HTTP_200_OK for r in responses)
+        assert all(r.json() == responses[0].json() for r in responses)
+        executed = flight_calls.values[(top_flight.name, "executed")] - before
+        assert 1 <= executed < 8
+
+
+@pytest.mark.asyncio
+async def test_concurrent_category_requests_are_coalesced(login):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers = await login(ac, "flight2")
+        before = flight_calls.values.get((categories_flight.name, "executed"), 0)
+        responses = await asyncio.gather(*(
+            ac.get("/api/suggestions/categories", headers=headers) for _ in range(8)
+        ))
+        assert all(r.json() == responses[0].json() for r in responses)
+        executed = flight_calls.values[(categories_flight.name, "executed")] - before
+        assert 1 <= executed < 8
@@ -0,0 +1,95 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.crud import delete_suggestion, update_suggestion_statuses
+from app.database import connect_db
+from app.main import app
+from app.suggestion_meta import SuggestionMeta, SuggestionMetaCache, suggestion_meta
+
+
+def test_cache_set_grow_and_remove():
+    cache = SuggestionMetaCache()
+    cache.set(3, 7, "active", 10)
+    cache.set(1000, 8, "rejected", 11)
+    assert cache.peek(3) == SuggestionMeta(7, "active", 10)
+    assert cache.peek(1000) == SuggestionMeta(8, "rejected", 11)
+    assert cache.peek(4) is None and cache.peek(5000) is None
+    cache.set_version(3, 12)
+    assert cache.peek(3).version == 12
+    cache.remove(3)
+    assert cache.peek(3) is None
+    cache.set_version(3, 13)
+    assert cache.peek(3) is None
+    assert cache.memory_bytes() >= 1001 * 13
+
+
+def test_cache_follows_outbox_events():
+    cache = SuggestionMetaCache()
+    cache.set(3, 7, "active", 10)
+    cache.apply_event("suggestion_update", {"id": 3, "author_id": 7, "status": "rejected", "version": 12})
+    assert cache.peek(3) == SuggestionMeta(7, "rejected", 12)
+    # Older events and suggestions this worker never loaded are left alone
+    cache.apply_event("suggestion_update", {"suggestions": [
+        {"id": 3, "author_id": 7, "status": "active", "version": 11},
+        {"id": 4, "author_id": 8, "status": "active", "version": 13},
+    ]})
+    assert cache.peek(3).status == "rejected" and cache.peek(4) is None
+    cache.apply_event("suggestion_deleted", {"id": 3})
+    assert cache.peek(3) is None
+
+
+@pytest.mark.asyncio
+async def test_vote_path_uses_cached_metadata(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers1 = await login(ac, "meta1")
+        headers2 = await login(ac, "meta2")
+        suggestion = await create_suggestion(ac, headers1, "Meta", "Meta test.")
+        meta = suggestion_meta.peek(suggestion["id"])
+        assert meta is not None and meta.author_id == suggestion["author_id"]
+
+        resp = await ac.post("/api/votes/", json={"suggestion_id": suggestion["id"], "is_upvote": True},
+                             headers=headers1)
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+        resp = await ac.post("/api/votes/", json={"suggestion_id": suggestion["id"], "is_upvote": True},
+                             headers=headers2)
+        assert resp.status_code == status.HTTP_200_OK
+        assert suggestion_meta.peek(suggestion["id"]).version > meta.version
+
+        await ac.patch(f"/api/suggestions/{suggestion['id']}/status", params={"new_status": "rejected"},
+                       headers=headers1)
+        assert suggestion_meta.peek(suggestion["id"]).status == "rejected"
+        await ac.delete(f"/api/suggestions/{suggestion['id']}", headers=headers1)
+        assert suggestion_meta.peek(suggestion["id"]) is None
+        resp = await ac.get(f"/api/votes/{suggestion['id']}", headers=headers2)
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_writes_leave_cache_alone(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers = await login(ac, "meta3")
+        suggestion = await create_suggestion(ac, headers, "Meta rollback", "Meta rollback test.")
+    before = suggestion_meta.peek(suggestion["id"])
+    async with connect_db() as db:
+        await update_suggestion_statuses(db, {suggestion["id"]: "rejected"}, commit=False)
+        await delete_suggestion(db, suggestion["id"], commit=False)
+        assert suggestion_meta.peek(suggestion["id"]) == before
+        await db.rollback()
+    assert suggestion_meta.peek(suggestion["id"]) == before
+
+
+@pytest.mark.asyncio
+async def test_vote_rechecks_suggestion_deleted_elsewhere(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        author = await login(ac, "meta4")
+        voter = await login(ac, "meta5")
+        suggestion = await create_suggestion(ac, author, "Meta elsewhere", "Deleted by another worker.")
+        # Another worker's delete, before its outbox event reached this one
+        async with connect_db() as db:
+            await db.execute("DELETE FROM suggestions WHERE id = ?", (suggestion["id"],))
+            await db.commit()
+        assert suggestion_meta.peek(suggestion["id"]) is not None
+        resp = await ac.post("/api/votes/", json={"suggestion_id": suggestion["id"], "is_upvote": True},
+                             headers=voter)
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+        assert suggestion_meta.peek(suggestion["id"]) is None
@@ -0,0 +1,37 @@
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_changes_since_version(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        headers1 = await login(ac, "sync1")
+        headers2 = await login(ac, "sync2")
+        resp = await ac.get("/api/suggestions/changes", headers=headers1)
+        assert resp.status_code == status.HTTP_200_OK
+        since = resp.json()["version"]
+        while resp.json()["has_more"]:
+            resp = await ac.get("/api/suggestions/changes", params={"since": since}, headers=headers1)
+            since = resp.json()["version"]
+
+        first = await create_suggestion(ac, headers1, "Sync One", "Sync test.")
+        second = await create_suggestion(ac, headers1, "Sync Two", "Sync test.")
+        resp = await ac.get("/api/suggestions/changes", params={"since": since}, headers=headers1)
+        data = resp.json()
+        assert [s["id"] for s in data["changed"]] == [first["id"], second["id"]]
+        assert [s["author"]["username"] for s in data["changed"]] == ["sync1", "sync1"]
+        since = data["version"]
+
+        # A vote changes the tally, a delete leaves a tombstone
+        await ac.post("/api/votes/", json={"suggestion_id": first["id"], "is_upvote": True}, headers=headers2)
+        await ac.delete(f"/api/suggestions/{second['id']}", headers=headers1)
+        resp = await ac.get("/api/suggestions/changes", params={"since": since}, headers=headers1)
+        data = resp.json()
+        assert [(s["id"], s["vote_count"]) for s in data["changed"]] == [(first["id"], 1)]
+        assert data["deleted"] == [second["id"]]
+        assert data["has_more"] is False
+
+        resp = await ac.get("/api/suggestions/changes", params={"since": data["version"]}, headers=headers1)
+        assert resp.json() == {"version": data["version"], "has_more": False, "changed": [], "deleted": []}
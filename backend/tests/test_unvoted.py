@@ -0,0 +1,87 @@
+import sqlite3
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.config import settings
+from app.database import connect_db, init_db
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_unvoted_feed_excludes_own_and_voted_suggestions(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        author = await login(ac, "feed1")
+        reader = await login(ac, "feed2")
+        voter = await login(ac, "feed3")
+        created = []
+        for i in range(4):
+            created.append(await create_suggestion(ac, author, f"Feed {i}", "Unvoted feed test."))
+        own = await create_suggestion(ac, reader, "Reader's own", "Unvoted feed test.")
+        ids = [s["id"] for s in created]
+        await ac.post("/api/votes/", json={"suggestion_id": ids[0], "is_upvote": True}, headers=reader)
+        await ac.post("/api/votes/", json={"suggestion_id": ids[2], "is_upvote": True}, headers=voter)
+        await ac.patch(f"/api/suggestions/{ids[3]}/status", params={"new_status": "rejected"}, headers=author)
+
+        # Walk the feed one item per page
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 1}
+            if cursor:
+                params["cursor"] = cursor
+            resp = await ac.get("/api/suggestions/unvoted", params=params, headers=reader)
+            assert resp.status_code == status.HTTP_200_OK
+            body = resp.json()
+            seen.extend(body["items"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        seen_ids = [s["id"] for s in seen]
+        assert ids[0] not in seen_ids and ids[3] not in seen_ids and own["id"] not in seen_ids
+        assert len(seen_ids) == len(set(seen_ids))
+        # The upvoted suggestion ranks ahead of the unvoted one
+        assert seen_ids.index(ids[2]) < seen_ids.index(ids[1])
+        mine = [s for s in seen if s["id"] in ids]
+        assert mine[0]["vote_count"] == 1 and mine[0]["author"]["username"] == "feed1"
+        scores = [(s["vote_count"], s["id"]) for s in seen]
+        assert scores == sorted(scores, reverse=True)
+
+        resp = await ac.get("/api/suggestions/unvoted", params={"cursor": "bogus"}, headers=reader)
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_vote_writes_keep_the_stored_tally_current(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        author = await login(ac, "feed4")
+        voters = [await login(ac, f"feed{i}") for i in (5, 6)]
+        suggestion = await create_suggestion(ac, author, "Feed tally", "Unvoted feed test.")
+
+        async def stored():
+            async with connect_db() as db:
+                cursor = await db.execute("SELECT vote_count FROM suggestions WHERE id = ?", (suggestion["id"],))
+                return (await cursor.fetchone())[0]
+
+        await ac.post("/api/votes/", json={"suggestion_id": suggestion["id"], "is_upvote": True}, headers=voters[0])
+        await ac.post("/api/votes/", json={"suggestion_id": suggestion["id"], "is_upvote": True}, headers=voters[1])
+        assert await stored() == 2
+        await ac.post("/api/votes/", json={"suggestion_id": suggestion["id"], "is_upvote": False}, headers=voters[1])
+        assert await stored() == 0
+        await ac.delete(f"/api/votes/{suggestion['id']}", headers=voters[0])
+        assert await stored() == -1
+
+
+@pytest.mark.asyncio
+async def test_stored_tally_is_backfilled_on_upgrade(monkeypatch, tmp_path):
+    path = tmp_path / "tally.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{path}")
+    await init_db()
+    with sqlite3.connect(path) as db:
+        db.execute("DROP INDEX idx_suggestions_status_votes")
+        db.execute("ALTER TABLE suggestions DROP COLUMN vote_count")
+        db.execute("INSERT INTO suggestions (id, title, description, category, author_id) VALUES (1, 't', 'd', 'c', 1)")
+        db.execute("INSERT INTO votes (suggestion_id, user_id, is_upvote) VALUES (1, 2, 1), (1, 3, 1), (1, 4, 0)")
+        db.execute("PRAGMA user_version = 5")
+    await init_db()
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT vote_count FROM suggestions WHERE id = 1").fetchone()[0] == 1
@@ -0,0 +1,87 @@
+import sqlite3
+import pytest
+from httpx import AsyncClient
+from fastapi import status
+from app.config import settings
+from app.archive import archive_closed_suggestions
+from app.database import connect_db, init_db
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_user_activity_endpoints_and_counters(login, create_suggestion):
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        author = await login(ac, "activity1")
+        voter = await login(ac, "activity2")
+        other = await login(ac, "activity3")
+        ids = []
+        for i in range(3):
+            ids.append((await create_suggestion(ac, author, f"Activity {i}", "Activity test."))["id"])
+
+        await ac.post("/api/votes/", json={"suggestion_id": ids[0], "is_upvote": True}, headers=voter)
+        await ac.post("/api/votes/", json={"suggestion_id": ids[1], "is_upvote": True}, headers=voter)
+        # Changing a vote moves the author's score by two, casting it again changes nothing
+        await ac.post("/api/votes/", json={"suggestion_id": ids[1], "is_upvote": False}, headers=voter)
+        await ac.post("/api/votes/", json={"suggestion_id": ids[1], "is_upvote": False}, headers=voter)
+        await ac.post("/api/votes/", json={"suggestion_id": ids[2], "is_upvote": True}, headers=other)
+        await ac.post("/api/votes/", json={"suggestion_id": ids[0], "is_upvote": True}, headers=other)
+        await ac.delete(f"/api/votes/{ids[0]}", headers=other)
+
+        resp = await ac.get("/api/users/me/stats", headers=author)
+        assert resp.status_code == status.HTTP_200_OK
+        stats = resp.json()
+        assert (stats["suggestions"], stats["votes_cast"], stats["score_received"]) == (3, 0, 1)
+        voter_stats = (await ac.get("/api/users/me/stats", headers=voter)).json()
+        assert voter_stats["votes_cast"] == 2 and voter_stats["score_received"] == 0
+        resp = await ac.get(f"/api/users/{stats['user_id']}/stats", headers=voter)
+        assert resp.json() == stats
+        resp = await ac.get("/api/users/1000000000/stats", headers=voter)
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+        # Deleting a suggestion takes its tally with it
+        await ac.delete(f"/api/suggestions/{ids[2]}", headers=author)
+        stats = (await ac.get("/api/users/me/stats", headers=author)).json()
+        assert (stats["suggestions"], stats["score_received"]) == (2, 0)
+
+        resp = await ac.get("/api/users/me/suggestions", headers=author)
+        assert [s["id"] for s in resp.json()] == [ids[1], ids[0]]
+        assert [s["vote_count"] for s in resp.json()] == [-1, 1]
+        assert resp.json()[0]["author"]["username"] == "activity1"
+        resp = await ac.get("/api/users/me/suggestions", params={"limit": 1, "skip": 1}, headers=author)
+        assert [s["id"] for s in resp.json()] == [ids[0]]
+
+        resp = await ac.get("/api/users/me/votes", headers=voter)
+        votes = resp.json()
+        assert {v["suggestion_id"]: v["is_upvote"] for v in votes} == {ids[0]: True, ids[1]: False}
+
+        # Archived votes still count as cast, the list shows them when asked to
+        await ac.patch(f"/api/suggestions/{ids[0]}/status", params={"new_status": "implemented"}, headers=author)
+        async with connect_db() as db:
+            await db.execute("UPDATE suggestions SET updated_at = datetime('now', '-10 days') WHERE id = ?",
+                             (ids[0],))
+            await db.commit()
+            await archive_closed_suggestions(db, grace_days=7)
+        assert (await ac.get("/api/users/me/stats", headers=voter)).json()["votes_cast"] == 2
+        resp = await ac.get("/api/users/me/votes", headers=voter)
+        assert [v["suggestion_id"] for v in resp.json()] == [ids[1]]
+        resp = await ac.get("/api/users/me/votes", params={"include_archived": True}, headers=voter)
+        assert {v["suggestion_id"]: v["archived"] for v in resp.json()} == {ids[0]: True, ids[1]: False}
+
+
+@pytest.mark.asyncio
+async def test_user_stats_are_backfilled_on_upgrade(monkeypatch, tmp_path):
+    path = tmp_path / "stats.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{path}")
+    await init_db()
+    with sqlite3.connect(path) as db:
+        db.execute("DROP TABLE user_stats")
+        db.execute("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'a', 'a@x', 'h'), (2, 'b', 'b@x', 'h')")
+        db.execute("INSERT INTO suggestions (id, title, description, category, author_id) VALUES (1, 't', 'd', 'c', 1)")
+        db.execute("INSERT INTO suggestions_archive (id, title, description, category, status, author_id, vote_count) "
+                   "VALUES (2, 't', 'd', 'c', 'implemented', 1, 5)")
+        db.execute("INSERT INTO votes (suggestion_id, user_id, is_upvote) VALUES (1, 2, 0)")
+        db.execute("INSERT INTO votes_archive (suggestion_id, user_id, is_upvote) VALUES (2, 2, 1)")
+        db.execute("PRAGMA user_version = 4")
+    await init_db()
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT * FROM user_stats ORDER BY user_id").fetchall() == [(1, 2, 0, 4), (2, 0, 2, 0)]
@@ -0,0 +1,190 @@
+import asyncio
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.heartbeat import TimingWheel
+from app.main import app
+from app.snapshot import TallySnapshot
+from app.schemas import SuggestionBatchUpdateMessage, SuggestionUpdateMessage
+from app.websocket_manager import ConnectionManager
+from app.ws_protocol import MSGPACK_CODEC, MSGPACK_SUBPROTOCOL, _expand, suggestion_delta
+
+
+def test_json_is_default_protocol():
+    client = TestClient(app)
+    with client.websocket_connect("/api/ws/1") as ws:
+        message = ws.receive_json()
+        assert message["type"] == "connection_established"
+        ws.send_json({"type": "ping", "timestamp": 5})
+        assert ws.receive_json() == {"type": "pong", "timestamp": 5, "user_id": 1}
+
+
+def test_msgpack_subprotocol():
+    client = TestClient(app)
+    with client.websocket_connect("/api/ws/2", subprotocols=[MSGPACK_SUBPROTOCOL]) as ws:
+        assert ws.accepted_subprotocol == MSGPACK_SUBPROTOCOL
+        frame = msgpack.unpackb(ws.receive_bytes())
+        assert frame["t"] == 1
+        assert frame["uid"] == 2
+        ws.send_bytes(msgpack.packb({"t": 9, "ts": 7}))
+        assert msgpack.unpackb(ws.receive_bytes()) == {"t": 2, "ts": 7, "uid": 2}
+
+
+def test_suggestion_delta_only_contains_changes():
+    before = {"id": 3, "title": "A", "vote_count": 1, "version": 4, "author": {"id": 1}}
+    after = {"id": 3, "title": "A", "vote_count": 2, "version": 5, "author": {"id": 1}}
+    assert suggestion_delta(before, after) == {"id": 3, "vote_count": 2, "version": 5, "base_version": 4}
+    assert suggestion_delta(None, after) == after
+
+
+class BinarySocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_bytes(self, frame: bytes):
+        self.frames.append(_expand(msgpack.unpackb(frame)))
+
+
+@pytest.mark.asyncio
+async def test_deltas_only_go_to_clients_holding_the_base_version():
+    manager = ConnectionManager()
+    suggestion = {"id": 3, "title": "A", "description": "d", "category": "c", "status": "active",
+                  "author_id": 1, "vote_count": 0, "created_at": "2024-01-01T00:00:00", "version": 4,
+                  "author": {"id": 1, "username": "u", "email": "u@example.com", "is_active": True,
+                             "created_at": "2024-01-01T00:00:00"}}
+    early = BinarySocket()
+    await manager.connect(early, 1, MSGPACK_CODEC)
+    await manager.broadcast_suggestion_update(SuggestionUpdateMessage(suggestion=suggestion))
+    # A client connecting later, or served by another worker before, never saw version 4
+    late = BinarySocket()
+    await manager.connect(late, 2, MSGPACK_CODEC)
+    await manager.broadcast_suggestion_update(SuggestionUpdateMessage(suggestion={**suggestion, "vote_count": 1, "version": 5}))
+    assert "title" in early.frames[0]["data"]["suggestion"]
+    delta = early.frames[1]["data"]["suggestion"]
+    assert delta["base_version"] == 4 and "title" not in delta
+    full = late.frames[0]["data"]["suggestion"]
+    assert "base_version" not in full and full["title"] == "A" and full["vote_count"] == 1
+    # Now both hold version 5 and get the same delta frame
+    await manager.broadcast_suggestion_updates(SuggestionBatchUpdateMessage(
+        suggestions=[{**suggestion, "status": "rejected", "vote_count": 1, "version": 6}]))
+    assert early.frames[-1] == late.frames[-1]
+    assert early.frames[-1]["data"]["suggestions"][0]["base_version"] == 5
+
+
+def test_timing_wheel_expires_items_in_order():
+    wheel = TimingWheel(tick=1, slots=4)
+    wheel.schedule("a", 1)
+    wheel.schedule("b", 6)
+    assert wheel.advance() == ["a"]
+    due = [wheel.advance() for _ in range(5)]
+    assert due == [[], [], [], [], ["b"]]
+    wheel.schedule("c", 2)
+    wheel.cancel("c")
+    assert len(wheel) == 0
+
+
+class DeadSocket:
+    def __init__(self):
+        self.closed = False
+
+    async def send_text(self, frame):
+        raise RuntimeError("connection lost")
+
+    async def close(self, code=1000):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_dead_connections_are_reaped():
+    manager = ConnectionManager()
+    dead = DeadSocket()
+    await manager.connect(dead, 1)
+    await manager.broadcast({"type": "vote_update", "data": {}})
+    assert dead.closed
+    stats = manager.stats()
+    assert stats["connections"] == 0
+    assert stats["reaped_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_idle_connections_are_reaped_by_heartbeat():
+    manager = ConnectionManager()
+    dead = DeadSocket()
+    connection = await manager.connect(dead, 1)
+    connection.last_seen -= settings.WS_IDLE_TIMEOUT
+    for _ in range(len(manager._wheel.slots)):
+        await manager.check_heartbeats()
+    assert manager.stats()["connections"] == 0
+    assert dead.closed
+
+
+def test_snapshot_on_connect():
+    client = TestClient(app)
+    client.post("/api/auth/register", json={
+        "username": "wssnap", "email": "wssnap@example.com", "password": "wssnappass"
+    })
+    resp = client.post("/api/auth/login", data={"username": "wssnap", "password": "wssnappass"})
+    token = resp.json()["access_token"]
+    user_id = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"}).json()["id"]
+
+    with client.websocket_connect(f"/api/ws/{user_id}?snapshot=1&access_token={token}") as ws:
+        assert ws.receive_json()["type"] == "connection_established"
+        message = ws.receive_json()
+        assert message["type"] == "snapshot"
+        assert isinstance(message["data"]["tallies"], list)
+        assert isinstance(message["data"]["user_votes"], list)
+
+    # Another user's id, or no token, only gets the shared tallies
+    for path in (f"/api/ws/{user_id + 1}?snapshot=1&access_token={token}", f"/api/ws/{user_id}?snapshot=1"):
+        with client.websocket_connect(path) as ws:
+            ws.receive_json()
+            message = ws.receive_json()
+            assert isinstance(message["data"]["tallies"], list)
+            assert "user_votes" not in message["data"]
+        with client.websocket_connect(path.split("?")[0]) as ws:
+            ws.receive_json()
+            ws.send_json({"type": "subscribe", "snapshot": True})
+            ws.receive_json()
+            assert "user_votes" not in ws.receive_json()["data"]
+
+
+def test_snapshot_tallies_are_updated_incrementally():
+    tallies = TallySnapshot()
+    tallies.set_tally(1, 3)
+    tallies.set_tally(2, -1)
+    assert tallies.pairs() == [[1, 3], [2, -1]]
+    tallies.set_tally(1, 4)
+    tallies.remove(2)
+    assert tallies.pairs() == [[1, 4]]
+    assert tallies.pairs([1, 5]) == [[1, 4]]
+
+
+class StuckSocket:
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+
+    async def send_text(self, frame: str):
+        await asyncio.sleep(3600)
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+class TextSocket(StuckSocket):
+    async def send_text(self, frame: str):
+        self.frames.append(frame)
+
+
+@pytest.mark.asyncio
+async def test_stalled_client_is_dropped_after_send_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "WS_SEND_TIMEOUT", 0.05)
+    manager = ConnectionManager()
+    stuck, healthy = StuckSocket(), TextSocket()
+    await manager.connect(stuck, 1)
+    await manager.connect(healthy, 2)
+    await asyncio.wait_for(manager.broadcast({"type": "new_suggestion", "data": {"id": 1}}), timeout=2)
+    assert len(healthy.frames) == 1
+    assert stuck.closed and manager.reaped_total == 1
+    assert 1 not in manager.active_connections
@@ -1,5 +1,5 @@
 import { useEffect, useRef, useCallback, useState } from 'react';
-import { WebSocketMessage, VoteUpdateMessage, SuggestionUpdateMessage } from '../types';
+import { WebSocketMessage, VoteUpdateMessage, SuggestionUpdateMessage, SuggestionBatchUpdateMessage } from '../types';
 import { API_BASE_URL } from '../lib/api';
 
 interface UseWebSocketOptions {
@@ -45,11 +45,22 @@ export const useWebSocket = (userId?: number, options: UseWebSocketOptions = {})
             options.onVoteUpdate?.(message.data as VoteUpdateMessage);
             break;
           case 'suggestion_update':
-            options.onSuggestionUpdate?.(message.data as SuggestionUpdateMessage);
+            if ('suggestions' in message.data) {
+              // Bulk moderation sends every changed suggestion in one message
+              (message.data as SuggestionBatchUpdateMessage).suggestions.forEach(suggestion =>
+                options.onSuggestionUpdate?.({ suggestion })
+              );
+            } else {
+              options.onSuggestionUpdate?.(message.data as SuggestionUpdateMessage);
+            }
             break;
           case 'new_suggestion':
             options.onNewSuggestion?.(message.data);
             break;
+          case 'ping':
+            // Answer server heartbeats so the connection is not reaped
+            ws.current?.send(JSON.stringify({ type: 'pong', timestamp: message.timestamp }));
+            break;
           case 'connection_established':
             console.log('WebSocket connected:', message.message);
             break;
@@ -29,12 +29,48 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// One refresh at a time, refresh tokens are single use
+let refreshing: Promise<string> | null = null;
+
+const refreshAccessToken = (refreshToken: string): Promise<string> => {
+  if (!refreshing) {
+    refreshing = axios
+      .post<AuthResponse>(`${API_BASE_URL}/auth/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        localStorage.setItem('access_token', response.data.access_token);
+        if (response.data.refresh_token) {
+          localStorage.setItem('refresh_token', response.data.refresh_token);
+        }
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
 // Response interceptor to handle auth errors
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (error.response?.status === 401 && refreshToken && original && !original._retry
+        && !original.url?.startsWith('/auth/')) {
+      // Expired access token: get a new one instead of sending the user to the login page
+      original._retry = true;
+      try {
+        const accessToken = await refreshAccessToken(refreshToken);
+        original.headers.Authorization = `Bearer ${accessToken}`;
+        return api(original);
+      } catch {
+        // Refresh token expired or revoked, fall through to logout
+      }
+    }
     if (error.response?.status === 401) {
       localStorage.removeItem('access_token');
+      localStorage.removeItem('refresh_token');
       localStorage.removeItem('user');
       window.location.href = '/login';
     }
@@ -64,6 +100,13 @@ export const authAPI = {
     const response = await api.get('/auth/me');
     return response.data;
   },
+
+  logout: async (refreshToken: string, accessToken: string): Promise<void> => {
+    // Tokens are passed explicitly, the caller clears localStorage right away
+    await api.post('/auth/logout', { refresh_token: refreshToken }, {
+      headers: { Authorization: `Bearer ${accessToken}` }
+    });
+  },
 };
 
 // Suggestions API
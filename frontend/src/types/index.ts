@@ -19,8 +19,19 @@ export interface Suggestion {
   author: User;
 }
 
-export interface Vote {
+export interface SimilarSuggestion {
   id: number;
+  title: string;
+  category: string;
+  status: string;
+  similarity: number;
+}
+
+export interface SuggestionCreated extends Suggestion {
+  possible_duplicates: SimilarSuggestion[];
+}
+
+export interface Vote {
   user_id: number;
   suggestion_id: number;
   is_upvote: boolean;
@@ -30,6 +41,7 @@ export interface Vote {
 export interface AuthResponse {
   access_token: string;
   token_type: string;
+  refresh_token?: string;
 }
 
 export interface LoginForm {
@@ -58,6 +70,7 @@ export interface WebSocketMessage {
   message: any;
   type: string;
   data: any;
+  timestamp?: number;
 }
 
 export interface VoteUpdateMessage {
@@ -70,6 +83,10 @@ export interface SuggestionUpdateMessage {
   suggestion: Suggestion;
 }
 
+export interface SuggestionBatchUpdateMessage {
+  suggestions: Suggestion[];
+}
+
 export interface CategoryStats {
   category: string;
   count: number;